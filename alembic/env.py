@@ -29,6 +29,8 @@ import app.task.models
 import app.signature.models
 import app.announcement.models
 import app.model_invoice.models
+import app.mail.models
+import app.jobs.models
 # import app.order.models  <-- Example for future modules
 
 # ------------------------------------------------------------------------
@@ -0,0 +1,50 @@
+"""Unique announcement views
+
+Revision ID: 3e9a1c7d5b20
+Revises: 752325877f2f
+Create Date: 2026-10-17 11:02:18.530941
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e9a1c7d5b20'
+down_revision: Union[str, None] = '752325877f2f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the first view of every (announcement, user) pair
+    op.execute(
+        "DELETE FROM announcement_view a USING announcement_view b "
+        "WHERE a.announcement_id = b.announcement_id AND a.user_id = b.user_id AND a.id > b.id"
+    )
+    # The unique index serves the same lookups as the plain composite one
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_announcement_view_announcement_id_user_id', 'announcement_view',
+            ['announcement_id', 'user_id'], unique=True,
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_announcement_view_announcement_id_user_id', table_name='announcement_view',
+            postgresql_concurrently=True, if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_announcement_view_announcement_id_user_id', 'announcement_view',
+            ['announcement_id', 'user_id'], unique=False,
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index(
+            'uq_announcement_view_announcement_id_user_id', table_name='announcement_view',
+            postgresql_concurrently=True, if_exists=True,
+        )
@@ -0,0 +1,49 @@
+"""Composite indexes for hot queries
+
+Revision ID: 752325877f2f
+Revises: c8e254bb4c84
+Create Date: 2026-10-17 09:12:41.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '752325877f2f'
+down_revision: Union[str, None] = 'c8e254bb4c84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns, partial WHERE clause)
+INDEXES = [
+    ('ix_task_assignee_id_created_at', 'task', ['assignee_id', 'created_at'], None),
+    ('ix_task_created_at_id', 'task', ['created_at', 'id'], None),
+    ('ix_task_chat_task_id_id', 'task_chat', ['task_id', 'id'], None),
+    ('ix_content_vault_uploader_id_created_at', 'content_vault', ['uploader_id', 'created_at'], None),
+    ('ix_announcement_view_announcement_id_user_id', 'announcement_view', ['announcement_id', 'user_id'], None),
+    ('ix_announcement_reaction_announcement_id_user_id', 'announcement_reaction', ['announcement_id', 'user_id'], None),
+    ('ix_model_invoice_user_id_invoice_date', 'model_invoice', ['user_id', 'invoice_date'], None),
+    ('ix_user_manager_id_active', 'user', ['manager_id'], 'is_deleted = false'),
+    ('ix_user_role_active', 'user', ['role'], 'is_deleted = false'),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,105 @@
+# app/Shared/auth_context.py
+"""
+Request-scoped authentication context.
+
+The access token (Bearer header first, then the `access_token` cookie) is
+decoded and verified once per request or WebSocket handshake and stored on
+`request.state.auth`. Every auth layer (the root `authorization`
+dependency, `protected_view`, `get_menu_context`, `get_current_user` and the
+WebSocket endpoints) reads it from there.
+
+Recently verified tokens are kept in a bounded LRU keyed by the SHA-256 of
+the token, so repeat requests with the same token skip the HMAC check. An
+entry is never served past the token's own `exp`.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import jwt
+from starlette.requests import HTTPConnection
+
+JWT_SECRET = os.getenv("JWT_SECRET", "secret")
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "2048"))
+
+_verified: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+_lock = threading.Lock()  # sync dependencies run in the threadpool
+
+class AuthContext:
+    def __init__(self, token: Optional[str] = None, from_header: bool = False):
+        self.token = token
+        self.from_header = from_header
+        self.claims: Optional[dict] = None
+        self.error: Optional[str] = None  # "expired" | "invalid" | "error"
+
+    @property
+    def user_id(self) -> Optional[int]:
+        if not self.claims:
+            return None
+        sub = self.claims.get("sub")
+        if isinstance(sub, dict):
+            sub = sub.get("user_id")
+        user_id = sub or self.claims.get("user_id")
+        try:
+            return int(user_id)
+        except (TypeError, ValueError):
+            return None
+
+def verify_token(token: str) -> dict:
+    """jwt.decode with an LRU in front. Raises the same jwt exceptions."""
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    with _lock:
+        cached = _verified.get(key)
+        if cached:
+            claims, expires = cached
+            if expires > time.time():
+                _verified.move_to_end(key)
+                return claims
+            del _verified[key]
+
+    claims = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+    expires = float(claims.get("exp", time.time() + 60))
+
+    with _lock:
+        _verified[key] = (claims, expires)
+        while len(_verified) > TOKEN_CACHE_SIZE:
+            _verified.popitem(last=False)
+    return claims
+
+def _read_token(conn: HTTPConnection) -> Tuple[Optional[str], bool]:
+    # Priority 1: Authorization header (Mobile App / Postman)
+    scheme, _, credentials = conn.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        return credentials.strip(), True
+
+    # Priority 2: Cookie (Web Dashboard, WebSockets)
+    token = conn.cookies.get("access_token")
+    if token and token.startswith("Bearer "):
+        token = token.split(" ")[1]
+    return token or None, False
+
+def get_auth_context(conn: HTTPConnection) -> AuthContext:
+    """Decodes the token on first use; later calls in the same request reuse it."""
+    context = getattr(conn.state, "auth", None)
+    if context is not None:
+        return context
+
+    token, from_header = _read_token(conn)
+    context = AuthContext(token, from_header)
+    if token:
+        try:
+            context.claims = verify_token(token)
+        except jwt.ExpiredSignatureError:
+            context.error = "expired"
+        except jwt.InvalidTokenError:
+            context.error = "invalid"
+        except Exception:
+            context.error = "error"
+
+    conn.state.auth = context
+    if context.claims:
+        conn.state.user = context.claims  # read by the HTML views
+    return context
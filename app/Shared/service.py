@@ -1,4 +1,5 @@
 # app/Shared/service.py
+import logging
 from datetime import datetime, timedelta
 from typing import Optional, Tuple, List
 import sqlalchemy.orm as _orm
@@ -7,14 +8,12 @@ import app.user.models as _models
 import app.Shared.schema as _schemas
 import app.core.db.session as _database
 from app.Shared import helpers as _helpers
+import app.core.passwords as _passwords
 
-# DB dependency
-def get_db():
-    db = _database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+logger = logging.getLogger("uvicorn.error")
+
+# DB dependency (one shared session per request)
+get_db = _database.get_db
 
 # ============================================================================
 #  HELPERS
@@ -70,8 +69,12 @@ def login_with_email(db: _orm.Session, email: str, password: str):
     if user.account_status != _models.AccountStatus.active:
         raise HTTPException(status_code=403, detail=f"Account is {user.account_status}")
 
-    if not user.password_hash or not user.verify_password(password):
+    valid, new_hash = _passwords.verify_and_update(password, user.password_hash)
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash:
+        # Stored with an outdated BCRYPT_ROUNDS; saved with the commit below
+        user.password_hash = new_hash
     
     # --- FIX START: Create Dictionary Payload for Token ---
 
@@ -83,16 +86,12 @@ def login_with_email(db: _orm.Session, email: str, password: str):
         "name": user.full_name or user.username,  # <--- NEW
         "picture": user.profile_picture_url       # <--- NEW
     }
-    print(f"Token data being used: {token_data}")  # Debug print
+    logger.debug(f"Issuing access token for user {user.id} ({token_data['role']})")
     # Pass Dictionary (not int) to helpers
     access_token = _helpers.create_access_token(data=token_data)
     # --- FIX END ---
 
-    refresh_token = _helpers.create_refresh_token(user.id)
-    
-    # Save Refresh Token
-    rt = _models.RefreshToken(user_id=user.id, token=refresh_token)
-    db.add(rt)
+    refresh_token = issue_refresh_token(db, user.id)
     
     # Update Stats
     user.last_login = datetime.utcnow()
@@ -161,24 +160,46 @@ def reset_password_using_otp(db: _orm.Session, email: str, otp_value: str, new_p
 #  TOKEN MANAGEMENT
 # ============================================================================
 
-def refresh_access_token(db: _orm.Session, refresh_token: str) -> str:
-    record = db.query(_models.RefreshToken).filter(
-        _models.RefreshToken.token == refresh_token,
-        _models.RefreshToken.revoked == False
-    ).first()
-    
-    if not record:
-        raise HTTPException(status_code=401, detail="Invalid refresh token")
-    
+def issue_refresh_token(db: _orm.Session, user_id: int) -> str:
+    """Creates a refresh token and adds its hash to the session (caller commits)."""
+    refresh_token = _helpers.create_refresh_token(user_id)
+    db.add(_models.RefreshToken(
+        user_id=user_id,
+        token_hash=_helpers.hash_token(refresh_token),
+        expires_at=datetime.utcnow() + timedelta(seconds=_helpers.REFRESH_TOKEN_EXPIRE_SECONDS)
+    ))
+    return refresh_token
+
+def revoke_refresh_token(db: _orm.Session, refresh_token: str) -> bool:
+    """
+    Marks a live token as used in one UPDATE (caller commits). Returns False
+    if it was unknown, expired or already used, so a token rotates only once
+    even when two requests race with it.
+    """
+    now = datetime.utcnow()
+    revoked = db.query(_models.RefreshToken).filter(
+        _models.RefreshToken.token_hash == _helpers.hash_token(refresh_token),
+        _models.RefreshToken.revoked == False,
+        _models.RefreshToken.expires_at > now
+    ).update({"revoked": True, "expires_at": now}, synchronize_session=False)
+    return revoked > 0
+
+def refresh_access_token(db: _orm.Session, refresh_token: str) -> Tuple[str, str]:
+    """Returns (access_token, refresh_token). The presented refresh token is rotated out."""
     payload = _helpers.decode_token(refresh_token)
     if not payload or payload.get("type") != "refresh":
         raise HTTPException(status_code=401, detail="Invalid token type")
+
+    if not revoke_refresh_token(db, refresh_token):
+        db.rollback()
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
     
     user_id = payload.get("sub")
     
     # Fetch user to get current role/email for the new token
     user = db.query(_models.User).filter(_models.User.id == int(user_id)).first()
     if not user:
+        db.rollback()
         raise HTTPException(status_code=401, detail="User not found")
 
     # --- FIX START: Create Dictionary Payload for Token ---
@@ -191,16 +212,16 @@ def refresh_access_token(db: _orm.Session, refresh_token: str) -> str:
         "name": user.full_name or user.username,  # <--- NEW
         "picture": user.profile_picture_url       # <--- NEW
     }
-    return _helpers.create_access_token(data=token_data)
+    access_token = _helpers.create_access_token(data=token_data)
     # --- FIX END ---
 
+    new_refresh_token = issue_refresh_token(db, user.id)
+    db.commit()
+    return access_token, new_refresh_token
+
 def logout_user(db: _orm.Session, refresh_token: Optional[str] = None) -> bool:
-    if refresh_token:
-        record = db.query(_models.RefreshToken).filter(_models.RefreshToken.token == refresh_token).first()
-        if record:
-            record.revoked = True
-            db.add(record)
-            db.commit()
+    if refresh_token and revoke_refresh_token(db, refresh_token):
+        db.commit()
     return True
 
 def get_all_countries(db: _orm.Session):
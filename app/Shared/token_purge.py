@@ -0,0 +1,81 @@
+# app/Shared/token_purge.py
+"""
+Deletes expired and revoked refresh tokens so auth_refresh_tokens only holds
+live sessions.
+
+Revoking a token also moves its `expires_at` to now, so one indexed range
+(`expires_at < now`) finds everything to delete. Rows go in batches of
+REFRESH_PURGE_BATCH, each in its own short transaction, so a large backlog
+never holds locks for long. Runs every REFRESH_PURGE_SECONDS from the app
+lifespan, or once from the command line:
+
+    python -m app.Shared.token_purge
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete, select
+
+import app.core.db.session as _database
+from app.user.models import RefreshToken
+
+logger = logging.getLogger("uvicorn.error")
+
+REFRESH_PURGE_SECONDS = float(os.getenv("REFRESH_PURGE_SECONDS", "3600"))
+REFRESH_PURGE_BATCH = int(os.getenv("REFRESH_PURGE_BATCH", "1000"))
+
+async def purge_refresh_tokens(engine=None, batch_size: int = REFRESH_PURGE_BATCH) -> int:
+    """Deletes every expired/revoked row; returns how many were removed."""
+    engine = engine or _database.async_engine
+    now = datetime.utcnow()
+    total = 0
+    while True:
+        batch = (
+            select(RefreshToken.id)
+            .where(RefreshToken.expires_at < now)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        async with engine.begin() as conn:
+            result = await conn.execute(delete(RefreshToken).where(RefreshToken.id.in_(batch)))
+        deleted = result.rowcount or 0
+        total += deleted
+        if deleted < batch_size:
+            return total
+        await asyncio.sleep(0)  # let requests in between batches
+
+class RefreshTokenPurger:
+    def __init__(self, interval: float = REFRESH_PURGE_SECONDS):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                deleted = await purge_refresh_tokens()
+                if deleted:
+                    logger.info(f"Purged {deleted} expired/revoked refresh tokens")
+            except Exception:
+                logger.exception("Refresh token purge failed; will retry")
+            await asyncio.sleep(self.interval)
+
+token_purger = RefreshTokenPurger()
+
+if __name__ == "__main__":
+    print(f"Purged {asyncio.run(purge_refresh_tokens())} refresh tokens")
@@ -1,103 +1,88 @@
 # app/announcement/announcement.py
-from fastapi import APIRouter, Depends, HTTPException, Body, WebSocket, WebSocketDisconnect, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Body, WebSocket, Query, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import json
 
+import anyio.from_thread
+
 import app.core.db.session as _database
+import app.core.db.replicas as _replicas
 import app.user.user as _user_auth
-from app.announcement import service, schema
+from app.announcement import service, schema, link_preview
 from app.user.models import User
-# IMPORTANT: Ensure this import exists for the manual auth fix
-from app.Shared.helpers import decode_token 
+from app.core.websocket import ConnectionManager
+from app.core import metrics as _metrics
+from app.core.pubsub import pubsub
+from app.Shared.auth_context import get_auth_context
 
 # --- 1. WebSocket Connection Manager ---
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: dict):
-        # Iterate over a copy to avoid modification errors
-        for connection in self.active_connections[:]:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                self.disconnect(connection)
-
+# Per-connection send queues; see app/core/websocket.py
 manager = ConnectionManager()
+_metrics.watch_websockets("announcement", lambda: len(manager.active_connections))
+
+# Events go through the shared pub/sub backend so that every worker,
+# not only the one that handled the request, pushes them to its sockets.
+FEED_CHANNEL = "announcement_feed"
+pubsub.subscribe(FEED_CHANNEL, manager.broadcast)
+
+get_db = _database.get_db
 
-def get_db():
-    db = _database.SessionLocal()
-    try: yield db
-    finally: db.close()
+def publish_from_thread(message: dict):
+    """For sync endpoints: they run in the threadpool, pubsub on the event loop."""
+    anyio.from_thread.run(pubsub.publish, FEED_CHANNEL, message)
 
 ws_router = APIRouter()
 router = APIRouter()
 
 # --- 2. WebSocket Endpoint (FIXED) ---
 @ws_router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket, db: Session = Depends(get_db)):
+async def websocket_endpoint(websocket: WebSocket):
     """
     Real-time feed connection.
-    Fixes HTTPBearer error by manually reading the token from cookies.
+    Fixes HTTPBearer error by reading the token from cookies.
+    No DB connection is held once the handshake is done.
     """
-    # 1. Manual Auth via Cookie (Browser sends cookies, but not headers for WS)
-    token = websocket.cookies.get("access_token")
+    # 1. Auth from the cookie (Browser sends cookies, but not headers for WS),
+    # decoded once via the shared auth context
     user = None
+    user_id = get_auth_context(websocket).user_id
     
-    if token:
-        try:
-            # Clean token if it has "Bearer " prefix
-            if token.startswith("Bearer "): 
-                token = token.split(" ")[1]
-            
-            # Decode using your helper
-            payload = decode_token(token)
-            user_id = payload.get("sub") or payload.get("user_id")
-            
-            if user_id:
-                user = db.query(User).filter(User.id == user_id).first()
-        except Exception:
-            pass # Invalid token
+    if user_id:
+        # Short-lived session: released before the socket starts listening
+        async with _database.AsyncSessionLocal() as db:
+            user = await _user_auth.get_user_record(db, user_id)
 
     # 2. Reject if not authenticated
     if not user:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
 
-    # 3. Connect
+    # 3. Connect (heartbeat + idle timeout handled by the manager)
+    await pubsub.start()
     await manager.connect(websocket)
-    try:
-        while True:
-            # Keep connection alive
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        manager.disconnect(websocket)
+    await manager.serve(websocket)
 
 # --- 3. REST Endpoints (Broadcasts Added) ---
 
 @router.post("/preview-link")
-def preview_link(
+async def preview_link(
     body: dict = Body(...),
     current_user = Depends(_user_auth.get_current_user)
 ):
     url = body.get("url")
-    return service.fetch_url_metadata(url) if url else {}
+    return await link_preview.get_preview(url) if url else {}
+
+# Endpoints on the sync Session are plain `def`, so their queries run in the
+# threadpool instead of blocking the event loop
 
 @router.post("/", response_model=schema.AnnouncementResponse)
-async def create_post(
+def create_post(
     data: schema.AnnouncementCreate,
     db: Session = Depends(get_db),
     current_user = Depends(_user_auth.get_current_user)
 ):
+    # A missing link preview is filled in by the announcement.fill_link_preview job
     new_post = service.create_announcement(db, data, current_user)
     
     # Broadcast New Post
@@ -109,7 +94,7 @@ async def create_post(
     if post_data.get('created_at'): 
         post_data['created_at'] = str(post_data['created_at'])
     
-    await manager.broadcast({"type": "new_post", "data": post_data})
+    publish_from_thread({"type": "new_post", "data": post_data})
     
     return new_post
 
@@ -117,13 +102,15 @@ async def create_post(
 def get_feed(
     last_id: Optional[int] = Query(None, description="ID of the last loaded post"),
     limit: int = 20,
-    db: Session = Depends(get_db),
+    # Sync session on a replica; get_current_user's async session only checks
+    # out a primary connection on a user-cache miss, which is accepted here
+    db: Session = Depends(_replicas.get_read_db),
     current_user = Depends(_user_auth.get_current_user)
 ):
-    return service.get_feed(db, last_id, limit)
+    return service.get_feed(db, current_user, last_id, limit)
 
 @router.delete("/{id}")
-async def delete_post(
+def delete_post(
     id: int,
     db: Session = Depends(get_db),
     current_user = Depends(_user_auth.get_current_user)
@@ -131,7 +118,7 @@ async def delete_post(
     result = service.delete_announcement(db, id, current_user)
     
     # Broadcast Deletion
-    await manager.broadcast({"type": "delete_post", "id": id})
+    publish_from_thread({"type": "delete_post", "id": id})
     
     return result
 
@@ -146,12 +133,11 @@ def react_to_post(
     return service.toggle_reaction(db, id, reaction.emoji, current_user)
 
 @router.post("/{id}/view")
-def mark_viewed(
+async def mark_viewed(
     id: int,
-    db: Session = Depends(get_db),
     current_user = Depends(_user_auth.get_current_user)
 ):
-    return service.mark_as_viewed(db, id, current_user)
+    return service.mark_as_viewed(id, current_user)
 
 @router.get("/{id}/viewers", response_model=list[schema.ViewerResponse])
 def get_viewers(
@@ -0,0 +1,12 @@
+# app/announcement/jobs.py
+from app.announcement import link_preview
+from app.announcement.announcement import FEED_CHANNEL
+from app.core.pubsub import pubsub
+from app.jobs import job
+
+@job("announcement.fill_link_preview")
+async def fill_link_preview(announcement_id: int, url: str):
+    """Enqueued by create_announcement; pushes the preview to the feed once resolved."""
+    data = await link_preview.fill_announcement(announcement_id, url)
+    if data:
+        await pubsub.publish(FEED_CHANNEL, {"type": "link_preview", "id": announcement_id, "data": data})
@@ -0,0 +1,153 @@
+# app/announcement/link_preview.py
+"""
+Link previews for announcements, kept off the request path.
+
+- Metadata is cached per URL in `link_preview` (TTL, shorter for failures).
+- Fetches go through the shared pooled client (app/core/http.py), read at
+  most PREVIEW_MAX_BYTES and stop as soon as `</head>` has arrived.
+- Concurrent requests for the same URL share one fetch.
+- create_post stores only link_url; fill_announcement() runs afterwards in
+  the announcement.fill_link_preview job and the feed is told over the
+  WebSocket.
+"""
+import asyncio
+import logging
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from bs4 import BeautifulSoup
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+import app.core.db.session as _database
+from app.announcement.models import Announcement, LinkPreview
+from app.core.http import get_http_client
+
+logger = logging.getLogger("uvicorn.error")
+
+PREVIEW_TTL_SECONDS = int(os.getenv("PREVIEW_TTL_SECONDS", str(7 * 24 * 3600)))
+PREVIEW_ERROR_TTL_SECONDS = int(os.getenv("PREVIEW_ERROR_TTL_SECONDS", "3600"))
+PREVIEW_MAX_BYTES = int(os.getenv("PREVIEW_MAX_BYTES", str(256 * 1024)))
+
+PREVIEW_FIELDS = ("link_title", "link_description", "link_image")
+PREVIEW_FIELD_LENGTHS = {"link_title": 255, "link_image": 500}  # column sizes
+HEAD_END = re.compile(rb"</head\s*>", re.IGNORECASE)
+
+_inflight: Dict[str, asyncio.Future] = {}
+
+def extract_url(text: str):
+    url_regex = r'(https?://[^\s]+)'
+    match = re.search(url_regex, text)
+    return match.group(0) if match else None
+
+def parse_metadata(url: str, html: bytes) -> dict:
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.find("meta", property="og:title")
+    description = soup.find("meta", property="og:description")
+    image = soup.find("meta", property="og:image")
+    return {
+        "link_title": title["content"] if title else (soup.title.string if soup.title else None),
+        "link_description": description["content"] if description else None,
+        "link_image": image["content"] if image else None,
+        "link_url": url
+    }
+
+async def fetch_metadata(url: str) -> dict:
+    """Reads the page up to `</head>` (or the byte cap). Never raises."""
+    try:
+        client = get_http_client()
+        async with client.stream("GET", url) as response:
+            if response.status_code != 200 or "html" not in response.headers.get("content-type", "html"):
+                return {"link_url": url}
+            head = bytearray()
+            async for chunk in response.aiter_bytes():
+                # Search only the tail that could hold a tag split across chunks
+                start = max(len(head) - 16, 0)
+                head.extend(chunk)
+                if HEAD_END.search(head, start) or len(head) >= PREVIEW_MAX_BYTES:
+                    break
+        return {**_clip(parse_metadata(url, bytes(head[:PREVIEW_MAX_BYTES]))), "link_url": url}
+    except Exception as e:
+        logger.info(f"Link preview fetch failed for {url}: {e}")
+        return {"link_url": url}
+
+def _clip(metadata: dict) -> dict:
+    values = {}
+    for field in PREVIEW_FIELDS:
+        value = metadata.get(field)
+        if isinstance(value, str):
+            value = value.strip()[:PREVIEW_FIELD_LENGTHS.get(field)] or None
+        values[field] = value
+    return values
+
+def _as_dict(row: LinkPreview) -> dict:
+    return {**{field: getattr(row, field) for field in PREVIEW_FIELDS}, "link_url": row.url}
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def get_cached(db: Session, url: str) -> Optional[dict]:
+    """Fresh cache entry for `url` (sync, for the announcement service)."""
+    row = db.query(LinkPreview).filter(LinkPreview.url == url, LinkPreview.expires_at > _now()).first()
+    return _as_dict(row) if row else None
+
+async def _get_cached_async(url: str) -> Optional[dict]:
+    async with _database.AsyncSessionLocal() as db:
+        row = (await db.execute(
+            select(LinkPreview).filter(LinkPreview.url == url, LinkPreview.expires_at > _now())
+        )).scalars().first()
+        return _as_dict(row) if row else None
+
+async def _store(metadata: dict):
+    ttl = PREVIEW_TTL_SECONDS if metadata.get("link_title") else PREVIEW_ERROR_TTL_SECONDS
+    values = {
+        "url": metadata["link_url"],
+        **{field: metadata.get(field) for field in PREVIEW_FIELDS},
+        "fetched_at": _now(),
+        "expires_at": _now() + timedelta(seconds=ttl),
+    }
+    stmt = _database.dialect_insert(LinkPreview, _database.async_engine.dialect.name).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[LinkPreview.url],
+        set_={key: value for key, value in values.items() if key != "url"}
+    )
+    async with _database.async_engine.begin() as conn:
+        await conn.execute(stmt)
+
+async def _fetch_and_store(url: str) -> dict:
+    metadata = await fetch_metadata(url)
+    try:
+        await _store(metadata)
+    except Exception:
+        logger.exception(f"Failed to cache link preview for {url}")
+    return metadata
+
+async def get_preview(url: str) -> dict:
+    """Cache first; otherwise one shared fetch per URL across concurrent callers."""
+    url = url[:500]
+    cached = await _get_cached_async(url)
+    if cached:
+        return cached
+
+    if url not in _inflight:
+        task = asyncio.ensure_future(_fetch_and_store(url))
+        _inflight[url] = task
+        task.add_done_callback(lambda _: _inflight.pop(url, None))
+    return await asyncio.shield(_inflight[url])
+
+async def fill_announcement(announcement_id: int, url: str) -> Optional[dict]:
+    """
+    Job step after create_post: resolves the preview and writes it
+    onto the post. Returns the fields for the WebSocket update, or None if
+    there is nothing to show.
+    """
+    metadata = await get_preview(url)
+    if not any(metadata.get(field) for field in PREVIEW_FIELDS):
+        return None
+    values = {field: metadata.get(field) for field in PREVIEW_FIELDS}
+    async with _database.AsyncSessionLocal() as db:
+        await db.execute(update(Announcement).where(Announcement.id == announcement_id).values(**values))
+        await db.commit()
+    return {**values, "link_url": url}
@@ -30,9 +30,8 @@ class Announcement(_database.Base):
     reactions = relationship("AnnouncementReaction", back_populates="announcement", cascade="all, delete-orphan")
     views = relationship("AnnouncementView", back_populates="announcement", cascade="all, delete-orphan")
 
-    @property
-    def view_count(self):
-        return len(self.views)
+    # view_count / reaction_counts / my_reaction are filled in by
+    # service.get_feed from grouped queries, never by loading the rows
 
 class AnnouncementAttachment(_database.Base):
     __tablename__ = "announcement_attachment"
@@ -50,6 +49,9 @@ class AnnouncementAttachment(_database.Base):
 
 class AnnouncementReaction(_database.Base):
     __tablename__ = "announcement_reaction"
+    __table_args__ = (
+        _sql.Index("ix_announcement_reaction_announcement_id_user_id", "announcement_id", "user_id"),
+    )
 
     id = _sql.Column(_sql.Integer, primary_key=True, index=True)
     announcement_id = _sql.Column(_sql.Integer, _sql.ForeignKey("announcement.id"), nullable=False)
@@ -64,6 +66,10 @@ class AnnouncementReaction(_database.Base):
 # --- NEW: View Tracking Model ---
 class AnnouncementView(_database.Base):
     __tablename__ = "announcement_view"
+    __table_args__ = (
+        # One row per viewer; view_buffer inserts with ON CONFLICT DO NOTHING
+        _sql.Index("uq_announcement_view_announcement_id_user_id", "announcement_id", "user_id", unique=True),
+    )
     
     id = _sql.Column(_sql.Integer, primary_key=True, index=True)
     announcement_id = _sql.Column(_sql.Integer, _sql.ForeignKey("announcement.id"), nullable=False)
@@ -71,4 +77,19 @@ class AnnouncementView(_database.Base):
     viewed_at = _sql.Column(_sql.DateTime(timezone=True), server_default=func.now())
 
     announcement = relationship("Announcement", back_populates="views")
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+
+
+# --- Link Preview Cache (URL -> metadata, shared by all posts) ---
+class LinkPreview(_database.Base):
+    __tablename__ = "link_preview"
+
+    id = _sql.Column(_sql.Integer, primary_key=True, index=True)
+    url = _sql.Column(_sql.String(500), nullable=False, unique=True)
+    
+    link_title = _sql.Column(_sql.String(255), nullable=True)
+    link_description = _sql.Column(_sql.Text, nullable=True)
+    link_image = _sql.Column(_sql.String(500), nullable=True)
+    
+    fetched_at = _sql.Column(_sql.DateTime(timezone=True), server_default=func.now())
+    expires_at = _sql.Column(_sql.DateTime(timezone=True), nullable=False)
@@ -41,6 +41,10 @@ class ReactionResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ReactionCount(BaseModel):
+    emoji: str
+    count: int
+
 class ViewerResponse(BaseModel):
     user_id: int
     viewed_at: datetime
@@ -65,8 +69,11 @@ class AnnouncementResponse(BaseModel):
     
     # Related Data
     attachments: List[AttachmentResponse]
-    reactions: List[ReactionResponse]
-    view_count: int  # Total views
+    
+    # Engagement (aggregated, see service.get_feed)
+    reaction_counts: List[ReactionCount] = []
+    my_reaction: Optional[str] = None
+    view_count: int = 0  # Total views
 
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -1,42 +1,59 @@
 # app/announcement/service.py
-import requests
-from bs4 import BeautifulSoup
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload, selectinload
 from fastapi import HTTPException
 from app.announcement.models import Announcement, AnnouncementAttachment, AnnouncementReaction, AnnouncementView
 from app.announcement.schema import AnnouncementCreate
+from app.announcement.view_buffer import view_buffer
+from app.announcement import link_preview
+import app.jobs.outbox as _jobs
 from app.user.models import User, UserRole
-import re
-from typing import Optional
+from typing import Dict, List, Optional
 
-# ... [Keep your existing helper functions: extract_url, fetch_url_metadata] ...
-def extract_url(text: str):
-    url_regex = r'(https?://[^\s]+)'
-    match = re.search(url_regex, text)
-    return match.group(0) if match else None
+# --- Service Logic ---
 
-def fetch_url_metadata(url: str):
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0'} # Simplified for brevity
-        response = requests.get(url, headers=headers, timeout=3)
-        if response.status_code != 200: return {"link_url": url}
-        soup = BeautifulSoup(response.content, "html.parser")
-        title = soup.find("meta", property="og:title")
-        description = soup.find("meta", property="og:description")
-        image = soup.find("meta", property="og:image")
-        return {
-            "link_title": title["content"] if title else (soup.title.string if soup.title else None),
-            "link_description": description["content"] if description else None,
-            "link_image": image["content"] if image else None,
-            "link_url": url
-        }
-    except Exception:
-        return {"link_url": url}
+def get_engagement(db: Session, posts: List[Announcement], current_user: User):
+    """
+    Fills view_count, reaction_counts and my_reaction on a page of posts
+    with three grouped queries, so the cost does not grow with the number
+    of views/reactions a post has collected.
+    """
+    post_ids = [post.id for post in posts]
+    if not post_ids:
+        return posts
 
-# --- Service Logic ---
+    view_counts = dict(
+        db.query(AnnouncementView.announcement_id, func.count())
+        .filter(AnnouncementView.announcement_id.in_(post_ids))
+        .group_by(AnnouncementView.announcement_id)
+        .all()
+    )
+
+    reaction_counts: Dict[int, list] = {}
+    rows = db.query(AnnouncementReaction.announcement_id, AnnouncementReaction.emoji, func.count())\
+        .filter(AnnouncementReaction.announcement_id.in_(post_ids))\
+        .group_by(AnnouncementReaction.announcement_id, AnnouncementReaction.emoji)\
+        .order_by(func.count().desc())\
+        .all()
+    for post_id, emoji, count in rows:
+        reaction_counts.setdefault(post_id, []).append({"emoji": emoji, "count": count})
 
-# --- REPLACE THIS FUNCTION ---
-def get_feed(db: Session, last_id: Optional[int] = None, limit: int = 20):
+    my_reactions = dict(
+        db.query(AnnouncementReaction.announcement_id, AnnouncementReaction.emoji)
+        .filter(
+            AnnouncementReaction.announcement_id.in_(post_ids),
+            AnnouncementReaction.user_id == current_user.id
+        )
+        .all()
+    )
+
+    for post in posts:
+        post.view_count = view_counts.get(post.id, 0)
+        post.reaction_counts = reaction_counts.get(post.id, [])
+        post.my_reaction = my_reactions.get(post.id)
+    return posts
+
+def get_feed(db: Session, current_user: User, last_id: Optional[int] = None, limit: int = 20):
     """
     Fetches posts using Cursor Pagination.
     - If last_id is provided, fetches posts with ID < last_id (Older posts).
@@ -45,17 +62,17 @@ def get_feed(db: Session, last_id: Optional[int] = None, limit: int = 20):
     query = db.query(Announcement)\
         .options(
             joinedload(Announcement.author),
-            joinedload(Announcement.attachments),
-            joinedload(Announcement.reactions)
+            selectinload(Announcement.attachments)
         )
     
     # Cursor Logic: Get older messages
     if last_id:
         query = query.filter(Announcement.id < last_id)
         
-    return query.order_by(Announcement.id.desc())\
-                .limit(limit)\
-                .all()
+    posts = query.order_by(Announcement.id.desc())\
+                 .limit(limit)\
+                 .all()
+    return get_engagement(db, posts, current_user)
 
 def create_announcement(db: Session, data: AnnouncementCreate, current_user: User):
     if current_user.role not in [UserRole.admin, UserRole.manager]:
@@ -67,11 +84,16 @@ def create_announcement(db: Session, data: AnnouncementCreate, current_user: Use
             "content": data.content
         }
 
+        # Link preview: cached metadata if we have it, otherwise filled in
+        # afterwards by the announcement.fill_link_preview job (never fetched here)
+        preview_pending = False
         if data.content:
-            url = extract_url(data.content)
+            url = link_preview.extract_url(data.content)
             if url:
-                metadata = fetch_url_metadata(url)
-                announcement_data.update(metadata)
+                url = url[:500]
+                cached = link_preview.get_cached(db, url)
+                announcement_data.update(cached or {"link_url": url})
+                preview_pending = cached is None
 
         new_announcement = Announcement(**announcement_data)
         db.add(new_announcement)
@@ -81,6 +103,11 @@ def create_announcement(db: Session, data: AnnouncementCreate, current_user: Use
             attachment = AnnouncementAttachment(announcement_id=new_announcement.id, **file.dict())
             db.add(attachment)
 
+        if preview_pending:
+            # Same transaction as the post: no post without its job, and vice versa
+            _jobs.enqueue(db, "announcement.fill_link_preview",
+                          announcement_id=new_announcement.id, url=new_announcement.link_url)
+
         db.commit()
         db.refresh(new_announcement)
         return new_announcement
@@ -104,18 +131,10 @@ def delete_announcement(db: Session, announcement_id: int, current_user: User):
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete post: {str(e)}")
 
-def mark_as_viewed(db: Session, announcement_id: int, current_user: User):
-    exists = db.query(AnnouncementView).filter_by(announcement_id=announcement_id, user_id=current_user.id).first()
-    if exists: return {"status": "already_viewed"}
-    try:
-        view = AnnouncementView(announcement_id=announcement_id, user_id=current_user.id)
-        db.add(view)
-        db.commit()
-        return {"status": "viewed"}
-    except Exception:
-        db.rollback()
-        # Silent fail is okay for view counting
-        return {"status": "error"}
+def mark_as_viewed(announcement_id: int, current_user: User):
+    # Buffered and written in batches; see app/announcement/view_buffer.py
+    view_buffer.add(announcement_id, current_user.id)
+    return {"status": "viewed"}
 
 def toggle_reaction(db: Session, announcement_id: int, emoji: str, current_user: User):
     try:
@@ -0,0 +1,103 @@
+# app/announcement/view_buffer.py
+"""
+Write-behind buffer for announcement views.
+
+POST /{id}/view only records the (announcement_id, user_id) pair in memory.
+A background task flushes the pending pairs every VIEW_FLUSH_SECONDS in
+batched `INSERT ... ON CONFLICT DO NOTHING` statements (the unique index on
+announcement_view makes repeats free), and once more on shutdown.
+"""
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+import app.core.db.session as _database
+from app.announcement.models import Announcement, AnnouncementView
+
+logger = logging.getLogger("uvicorn.error")
+
+VIEW_FLUSH_SECONDS = float(os.getenv("VIEW_FLUSH_SECONDS", "3"))
+VIEW_FLUSH_BATCH = int(os.getenv("VIEW_FLUSH_BATCH", "1000"))
+VIEW_BUFFER_MAX = int(os.getenv("VIEW_BUFFER_MAX", "10000"))  # pending pairs before an early flush
+VIEW_SEEN_MAX = int(os.getenv("VIEW_SEEN_MAX", "50000"))      # recently flushed pairs remembered
+
+Pair = Tuple[int, int]
+
+class ViewBuffer:
+    def __init__(self, engine, interval: float = VIEW_FLUSH_SECONDS):
+        self.engine = engine
+        self.interval = interval
+        self.pending: Set[Pair] = set()
+        self.seen: "OrderedDict[Pair, None]" = OrderedDict()  # LRU of pairs already in the table
+        self._flusher: Optional[asyncio.Task] = None
+        self._early_flush: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def add(self, announcement_id: int, user_id: int):
+        """Records a view. Must be called from the event loop."""
+        pair = (announcement_id, user_id)
+        if pair in self.seen:
+            self.seen.move_to_end(pair)
+            return
+        self.pending.add(pair)
+        self.start()
+        if len(self.pending) >= VIEW_BUFFER_MAX and (self._early_flush is None or self._early_flush.done()):
+            self._early_flush = asyncio.create_task(self.flush())
+
+    def start(self):
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            if not self.pending:
+                return
+            pairs, self.pending = list(self.pending), set()
+            try:
+                await self._write(pairs)
+            except Exception:
+                logger.exception(f"Failed to flush {len(pairs)} announcement views; will retry")
+                # Put them back (bounded, so a dead DB cannot grow memory forever)
+                room = max(VIEW_BUFFER_MAX - len(self.pending), 0)
+                self.pending.update(pairs[:room])
+                return
+            for pair in pairs:
+                self.seen[pair] = None
+            while len(self.seen) > VIEW_SEEN_MAX:
+                self.seen.popitem(last=False)
+
+    async def _write(self, pairs: List[Pair]):
+        async with self.engine.begin() as conn:
+            # Posts deleted since the view was recorded would fail the FK
+            post_ids = {announcement_id for announcement_id, _ in pairs}
+            existing = set((await conn.execute(
+                select(Announcement.id).filter(Announcement.id.in_(post_ids))
+            )).scalars())
+            rows = [
+                {"announcement_id": announcement_id, "user_id": user_id}
+                for announcement_id, user_id in pairs if announcement_id in existing
+            ]
+            stmt = _database.dialect_insert(AnnouncementView, self.engine.dialect.name).on_conflict_do_nothing()
+            for i in range(0, len(rows), VIEW_FLUSH_BATCH):
+                await conn.execute(stmt, rows[i:i + VIEW_FLUSH_BATCH])
+
+view_buffer = ViewBuffer(_database.async_engine)
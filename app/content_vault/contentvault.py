@@ -4,6 +4,7 @@ from typing import Optional
 from datetime import date
 
 import app.core.db.session as _database
+import app.core.db.replicas as _replicas
 import app.user.user as _user_auth
 import app.user.models as _user_models
 import app.content_vault.schema as _schemas
@@ -11,16 +12,13 @@ import app.content_vault.service as _services
 
 router = APIRouter()
 
-def get_db():
-    db = _database.SessionLocal()
-    try: yield db
-    finally: db.close()
+get_db = _database.get_db
 
 # --- 1. Root: Get Folders (Users) ---
 @router.get("/folders", response_model=_schemas.FolderListResponse, tags=["CONTENT VAULT"])
 def get_drive_folders(
     current_user: _user_models.User = Depends(_user_auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(_replicas.get_read_db)
 ):
     """
     Get list of 'Folders'. Each folder represents a User who has uploaded content.
@@ -0,0 +1,188 @@
+# app/core/db/outbox.py
+"""
+Leased outbox worker, shared by the email outbox (app/mail/outbox.py) and
+the job outbox (app/jobs/outbox.py).
+
+An outbox table has `status` (pending | failed), `attempts`, a due-time
+column, `locked_until` and `last_error`. The worker loop:
+
+- claims up to batch_size due, unleased rows in one statement
+  (`FOR UPDATE SKIP LOCKED` on Postgres, so concurrent workers never get
+  the same row), leasing them for lease_seconds: a worker that dies
+  mid-batch leaves rows that come back once the lease ends;
+- hands them to deliver(), which returns one (id, error or None, permanent)
+  per row it tried, and leaves out rows it did not get to;
+- deletes delivered rows; counts an attempt for each failure and
+  reschedules it with jittered exponential backoff, or marks it `failed`
+  when permanent or out of attempts. Rows left out are released for a
+  later pass without counting an attempt, so nothing is given up on
+  without having been tried.
+
+It runs on the event loop, wakes at once when wake() is called (from any
+thread) and otherwise polls every poll_interval. Subclasses set the class
+attributes and implement deliver().
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, or_, select, update
+
+import app.core.db.session as _database
+
+logger = logging.getLogger("uvicorn.error")
+
+# (id, error or None, permanent)
+DeliveryResult = Tuple[int, Optional[str], bool]
+
+def backoff_delay(attempts: int, base: float, maximum: float) -> float:
+    """base, 2*base, 4*base ... capped at maximum, with +/-20% jitter."""
+    delay = min(base * 2 ** max(attempts - 1, 0), maximum)
+    return delay * random.uniform(0.8, 1.2)
+
+class LeasedOutboxWorker:
+    model = None           # the outbox table's mapped class
+    due_column = ""        # column holding when a row is next due
+    claim_columns = ()     # extra columns deliver() needs, besides id, attempts and locked_until
+    lease_seconds = 300
+    max_attempts = 5
+    retry_base_seconds = 10.0
+    retry_max_seconds = 3600.0
+    label = "Outbox"       # for log lines
+
+    def __init__(self, engine=None, batch_size: int = 50, poll_interval: float = 5.0):
+        self.engine = engine or _database.async_engine
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # --- Hooks ---
+
+    async def deliver(self, rows: list) -> List[DeliveryResult]:
+        """Results for the rows tried; `row.attempts` counts the earlier tries."""
+        raise NotImplementedError
+
+    def gives_up(self, attempts: int) -> bool:
+        return attempts >= self.max_attempts
+
+    def retry_delay(self, attempts: int) -> float:
+        return backoff_delay(attempts, self.retry_base_seconds, self.retry_max_seconds)
+
+    async def close(self):
+        """Releases what deliver() holds open; called by stop()."""
+
+    # --- Loop ---
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _start_loop(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.close()
+
+    def wake(self):
+        """Called after an enqueue commits; safe from threadpool endpoints and any thread."""
+        if self._loop is not None and self._wake is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self):
+        while True:
+            try:
+                # Keep draining while full batches come back
+                while await self.run_once() >= self.batch_size:
+                    pass
+            except Exception:
+                logger.exception(f"{self.label} worker pass failed; will retry")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def run_once(self) -> int:
+        """Claims, delivers and settles one batch. Returns how many were claimed."""
+        rows = await self._claim()
+        if not rows:
+            return 0
+        results = await self.deliver(rows)
+        await self._settle(rows, results)
+        return len(rows)
+
+    # --- Claim / settle ---
+
+    async def _claim(self) -> list:
+        model = self.model
+        due_at = getattr(model, self.due_column)
+        now = datetime.utcnow()
+        due = (
+            select(model.id)
+            .where(
+                model.status == "pending",
+                due_at <= now,
+                or_(model.locked_until.is_(None), model.locked_until < now),
+            )
+            .order_by(model.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(model)
+            .where(model.id.in_(due.scalar_subquery()))
+            .values(locked_until=now + timedelta(seconds=self.lease_seconds))
+            .returning(model.id, model.attempts, model.locked_until,
+                       *(getattr(model, name) for name in self.claim_columns))
+        )
+        async with self.engine.begin() as conn:
+            rows = (await conn.execute(stmt)).all()
+        # RETURNING order is not guaranteed
+        return sorted(rows, key=lambda row: row.id)
+
+    async def _settle(self, rows: list, results: List[DeliveryResult]):
+        model = self.model
+        earlier = {row.id: row.attempts for row in rows}
+        # Only while this batch's lease holds: a row whose lease ran out may
+        # have been claimed by another worker since, which now owns its state
+        leased = {row.id: model.locked_until == row.locked_until for row in rows}
+        done = [row_id for row_id, error, _ in results if error is None]
+        untried = set(earlier) - {row_id for row_id, _, _ in results}
+        now = datetime.utcnow()
+        async with self.engine.begin() as conn:
+            if done:
+                await conn.execute(delete(model).where(model.id.in_(done)))
+            for row_id, error, permanent in results:
+                if error is None:
+                    continue
+                attempts = earlier[row_id] + 1
+                if permanent or self.gives_up(attempts):
+                    logger.error(f"{self.label} {row_id} failed permanently: {error}")
+                    values = {"status": "failed"}
+                else:
+                    values = {self.due_column: now + timedelta(seconds=self.retry_delay(attempts))}
+                await conn.execute(
+                    update(model).where(model.id == row_id, leased[row_id])
+                    .values(attempts=attempts, last_error=error, locked_until=None, **values)
+                )
+            for row_id in sorted(untried):
+                # Backs off like a failure (whatever stopped the batch is likely
+                # still there) but keeps its attempt count
+                delay = self.retry_delay(max(earlier[row_id], 1))
+                await conn.execute(
+                    update(model).where(model.id == row_id, leased[row_id])
+                    .values(locked_until=None, **{self.due_column: now + timedelta(seconds=delay)})
+                )
@@ -0,0 +1,160 @@
+# app/core/db/query_stats.py
+"""
+Per-request SQL accounting.
+
+Engine event hooks time every statement and add it to the stats of the
+request that ran it (a ContextVar, so it follows the request into the
+threadpool and into async sessions). QueryStatsMiddleware then:
+
+- adds `Server-Timing: db;dur=<ms>;desc="<n> queries", app;dur=<ms>` to
+  the response, so the browser dev tools show DB time per call;
+- logs one line per request with the statement count and DB time (fields
+  `queries`, `db_ms`, `duration_ms` in the JSON log);
+- warns when one statement ran N_PLUS_ONE_THRESHOLD or more times in a
+  request (same SQL, different parameters: usually a lazy relationship
+  loaded per row).
+
+Statements slower than SLOW_QUERY_MS are logged on their own, with the
+shape of their parameters (types and sizes, never the values).
+"""
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("uvicorn.error")
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS_ENABLED", "true").lower() == "true"
+STATEMENT_LOG_CHARS = 300
+
+class RequestQueryStats:
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Dict[str, int] = {}
+
+    def add(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[tuple]:
+        """[(statement, times)] run at least `threshold` times, most repeated first."""
+        repeated = [(sql, times) for sql, times in self.statements.items() if times >= threshold]
+        return sorted(repeated, key=lambda item: -item[1])
+
+_current: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+def current_stats() -> Optional[RequestQueryStats]:
+    return _current.get()
+
+def _clip(statement: str) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= STATEMENT_LOG_CHARS else statement[:STATEMENT_LOG_CHARS] + "..."
+
+def _value_shape(value) -> str:
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return f"{type(value).__name__}[{len(value)}]"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}({len(value)})"
+    return type(value).__name__
+
+def parameter_shape(parameters, executemany: bool = False) -> str:
+    """Types and sizes of the bound parameters, never their values."""
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = parameter_shape(parameters[0]) if parameters else "-"
+        return f"{len(parameters)} x {first}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {_value_shape(value)}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(_value_shape(value) for value in parameters) + ")"
+    return _value_shape(parameters)
+
+# --- Engine hooks ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    seconds = time.perf_counter() - starts.pop()
+
+    stats = _current.get()
+    if stats is not None:
+        stats.add(statement, seconds)
+
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            f"Slow query ({seconds * 1000:.1f} ms): {_clip(statement)} "
+            f"params={parameter_shape(parameters, executemany)}"
+        )
+
+def instrument(engine: Engine):
+    """Attaches the hooks to a sync Engine (for async engines pass `.sync_engine`)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+# --- Middleware ---
+
+class QueryStatsMiddleware:
+    """Pure ASGI, so the ContextVar set here is the one the endpoint sees."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not QUERY_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                timing = (
+                    f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries", '
+                    f"app;dur={elapsed_ms:.1f}"
+                )
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"server-timing", timing.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self._report(scope, stats, status_code, time.perf_counter() - started)
+
+    def _report(self, scope, stats: RequestQueryStats, status_code: int, seconds: float):
+        route = scope.get("route")
+        path = getattr(route, "path", None) or scope.get("path", "")
+        method = scope.get("method", "")
+        if stats.count:
+            logger.info(
+                f"{method} {path} {status_code}: {stats.count} queries, "
+                f"{stats.seconds * 1000:.1f} ms in DB of {seconds * 1000:.1f} ms",
+                extra={"fields": {
+                    "method": method, "route": path, "status": status_code,
+                    "queries": stats.count, "db_ms": round(stats.seconds * 1000, 2),
+                    "duration_ms": round(seconds * 1000, 2),
+                }},
+            )
+        for statement, times in stats.repeated():
+            logger.warning(f"Probable N+1 in {method} {path}: ran {times}x {_clip(statement)}")
@@ -0,0 +1,227 @@
+# app/core/db/replicas.py
+"""
+Read-replica routing.
+
+DATABASE_REPLICA_URLS is a comma-separated list of replicas of DATABASE_URL
+(same form, e.g. postgresql://...). Endpoints that only read opt in by
+depending on get_read_db / get_async_read_db instead of the usual get_db;
+those sessions go to the replicas in turn, skipping any that are ejected:
+
+- passively, for REPLICA_EJECT_SECONDS, when a connection to it drops or
+  cannot be made;
+- actively, by ReplicaMonitor, which checks every replica each
+  REPLICA_CHECK_SECONDS and ejects those that fail or lag behind the
+  primary by more than REPLICA_MAX_LAG_SECONDS (re-admitting them once
+  they are back).
+
+With every replica ejected, or none configured, reads go to the primary.
+
+Read-your-writes: after a successful non-GET request, the user's reads go
+to the primary for REPLICA_STICKY_SECONDS, so nobody misses their own
+change because a replica has not replayed it yet. The deadline is kept
+per user in this worker and in a cookie, which carries it to the other
+workers.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+import sqlalchemy as _sql
+import sqlalchemy.ext.asyncio as _asyncio
+from fastapi import Request
+from sqlalchemy import event
+
+import app.core.db.session as _database
+from app.core import metrics as _metrics
+from app.core.db import query_stats as _query_stats
+from app.Shared.auth_context import get_auth_context
+
+logger = logging.getLogger("uvicorn.error")
+
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+REPLICA_EJECT_SECONDS = float(os.getenv("REPLICA_EJECT_SECONDS", "30"))
+REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", "5"))
+REPLICA_CHECK_TIMEOUT_SECONDS = float(os.getenv("REPLICA_CHECK_TIMEOUT_SECONDS", "2"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+
+STICKY_COOKIE = "db_primary_until"
+STICKY_MAX_USERS = 10000
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# 0 when the replica has replayed everything it received; NULL on a primary
+PG_LAG_SQL = """
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END
+"""
+
+class Replica:
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine = _sql.create_engine(url, **_database.engine_options(url))
+        async_url = _database.get_async_database_url(url)
+        self.async_engine = _asyncio.create_async_engine(async_url, **_database.engine_options(async_url, is_async=True))
+        self.ejected_until = 0.0
+        self.lag: Optional[float] = None
+
+        for engine, label in ((self.engine, name), (self.async_engine.sync_engine, f"{name}_async")):
+            _query_stats.instrument(engine)
+            _metrics.instrument_engine(engine, label)
+            event.listen(engine, "handle_error", self._on_error)
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    def eject(self, reason: str):
+        if self.healthy:
+            logger.warning(f"Ejecting read replica {self.name} for {REPLICA_EJECT_SECONDS:g}s: {reason}")
+        self.ejected_until = time.monotonic() + REPLICA_EJECT_SECONDS
+
+    def readmit(self):
+        if not self.healthy:
+            logger.info(f"Read replica {self.name} is healthy again")
+        self.ejected_until = 0.0
+
+    def _on_error(self, context):
+        if context.is_disconnect:
+            self.eject(f"connection lost ({type(context.original_exception).__name__})")
+
+    async def check(self):
+        """Ejects or re-admits the replica based on a round trip and its replay lag."""
+        lag_sql = PG_LAG_SQL if self.async_engine.dialect.name == "postgresql" else "SELECT 0"
+        try:
+            async with self.async_engine.connect() as conn:
+                lag = await asyncio.wait_for(conn.scalar(_sql.text(lag_sql)), REPLICA_CHECK_TIMEOUT_SECONDS)
+        except Exception as e:
+            self.eject(f"health check failed ({type(e).__name__}: {e})")
+            return
+        self.lag = float(lag or 0)
+        if self.lag > REPLICA_MAX_LAG_SECONDS:
+            self.eject(f"replication lag {self.lag:.1f}s")
+        else:
+            self.readmit()
+
+    async def dispose(self):
+        self.engine.dispose()
+        await self.async_engine.dispose()
+
+class ReplicaRouter:
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(f"replica{index}", url) for index, url in enumerate(urls)]
+        self._turn = itertools.count()
+        self._writes: Dict[int, float] = {}  # user id -> epoch until which reads stay on the primary
+        self._task: Optional[asyncio.Task] = None
+
+    def pick(self) -> Optional[Replica]:
+        """Next healthy replica in round-robin order, None if there is none."""
+        count = len(self.replicas)
+        start = next(self._turn)
+        for offset in range(count):
+            replica = self.replicas[(start + offset) % count]
+            if replica.healthy:
+                return replica
+        return None
+
+    # --- Read-your-writes ---
+
+    def record_write(self, user_id: Optional[int]) -> float:
+        until = time.time() + REPLICA_STICKY_SECONDS
+        if user_id is not None:
+            if len(self._writes) >= STICKY_MAX_USERS:
+                now = time.time()
+                self._writes = {key: value for key, value in self._writes.items() if value > now}
+            self._writes[user_id] = until
+        return until
+
+    def is_sticky(self, request: Request) -> bool:
+        now = time.time()
+        try:
+            if float(request.cookies.get(STICKY_COOKIE, 0)) > now:
+                return True
+        except ValueError:
+            pass
+        user_id = get_auth_context(request).user_id
+        return user_id is not None and self._writes.get(user_id, 0) > now
+
+    def _route(self, request: Request) -> Optional[Replica]:
+        if not self.replicas or self.is_sticky(request):
+            return None
+        return self.pick()
+
+    def engine_for(self, request: Request):
+        replica = self._route(request)
+        return replica.engine if replica else _database.engine
+
+    def async_engine_for(self, request: Request):
+        replica = self._route(request)
+        return replica.async_engine if replica else _database.async_engine
+
+    # --- Health monitor ---
+
+    def start(self):
+        if self.replicas and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.dispose()
+
+    async def _run(self):
+        while True:
+            await asyncio.gather(*(replica.check() for replica in self.replicas))
+            await asyncio.sleep(REPLICA_CHECK_SECONDS)
+
+replica_router = ReplicaRouter(DATABASE_REPLICA_URLS)
+
+# --- Dependencies ---
+
+def get_read_db(request: Request):
+    """Like get_db, on a replica when one is usable. Never write through it."""
+    db = _database.SessionLocal(bind=replica_router.engine_for(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db(request: Request):
+    async with _database.AsyncSessionLocal(bind=replica_router.async_engine_for(request)) as db:
+        yield db
+
+# --- Middleware ---
+
+class ReadYourWritesMiddleware:
+    """Starts the primary-only window after every successful write request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not replica_router.replicas:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                user_id = get_auth_context(Request(scope)).user_id
+                until = replica_router.record_write(user_id)
+                cookie = (
+                    f"{STICKY_COOKIE}={until:.3f}; Max-Age={int(REPLICA_STICKY_SECONDS) + 1}; "
+                    f"Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,102 @@
+# app/core/db/scan_check.py
+"""
+Reports which hot service queries still fall back to a sequential scan.
+
+    python -m app.core.db.scan_check
+
+Each query below mirrors a filter used by a service module. It is EXPLAINed
+with `enable_seqscan = off`, so a `Seq Scan` left in the plan means no index
+can serve the query at all (on small tables Postgres would otherwise pick a
+seq scan anyway). The pg_stat_user_tables counters are printed as well, to
+show what production traffic has actually been doing.
+"""
+import json
+import datetime
+from sqlalchemy import select, desc, text
+from sqlalchemy.dialects import postgresql
+
+from app.core.db.session import engine
+import app.user.models as _user_models
+import app.task.models as _task_models
+import app.announcement.models as _announcement_models
+import app.model_invoice.models as _invoice_models
+
+User = _user_models.User
+
+# (label, statement) - sample parameter values only need the right type
+HOT_QUERIES = [
+    ("task.get_all_tasks (assignee)", select(_task_models.Task)
+        .filter(_task_models.Task.assignee_id == 1)
+        .order_by(desc(_task_models.Task.created_at)).limit(10)),
+    ("task.get_all_tasks (keyset)", select(_task_models.Task)
+        .order_by(desc(_task_models.Task.created_at), desc(_task_models.Task.id)).limit(10)),
+    ("task.get_chat_history", select(_task_models.TaskChat)
+        .filter(_task_models.TaskChat.task_id == 1)
+        .order_by(desc(_task_models.TaskChat.id)).limit(10)),
+    ("content_vault.get_vault_files", select(_task_models.ContentVault)
+        .filter(_task_models.ContentVault.uploader_id == 1)
+        .order_by(desc(_task_models.ContentVault.created_at)).limit(20)),
+    ("announcement.get_post_viewers", select(_announcement_models.AnnouncementView)
+        .filter_by(announcement_id=1)),
+    ("announcement.toggle_reaction", select(_announcement_models.AnnouncementReaction)
+        .filter_by(announcement_id=1, user_id=1)),
+    ("model_invoice.get_creator_report", select(_invoice_models.ModelInvoice)
+        .filter(_invoice_models.ModelInvoice.user_id == 1,
+                _invoice_models.ModelInvoice.invoice_date >= datetime.date(2024, 1, 1),
+                _invoice_models.ModelInvoice.invoice_date <= datetime.date(2024, 12, 31))),
+    ("user.get_all_users (manager)", select(User)
+        .filter(User.manager_id == 1, User.is_deleted == False)),
+    ("user.get_available_users (role)", select(User)
+        .filter(User.role == _user_models.UserRole.manager, User.is_deleted == False)),
+    ("Shared.refresh_access_token", select(_user_models.RefreshToken)
+        .filter(_user_models.RefreshToken.token_hash == "0" * 64)),
+    ("Shared.purge_refresh_tokens", select(_user_models.RefreshToken.id)
+        .filter(_user_models.RefreshToken.expires_at < datetime.datetime(2024, 1, 1)).limit(1000)),
+]
+
+def _seq_scanned_tables(plan: dict) -> list:
+    tables = []
+    if plan.get("Node Type") == "Seq Scan":
+        tables.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        tables.extend(_seq_scanned_tables(child))
+    return tables
+
+def check_queries(conn) -> list:
+    """Returns [(label, [seq scanned tables])] for every hot query."""
+    report = []
+    conn.execute(text("SET LOCAL enable_seqscan = off"))
+    for label, stmt in HOT_QUERIES:
+        sql = stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+        plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        report.append((label, _seq_scanned_tables(plan[0]["Plan"])))
+    return report
+
+def table_scan_stats(conn) -> list:
+    return conn.execute(text(
+        "SELECT relname, seq_scan, idx_scan, seq_tup_read, n_live_tup "
+        "FROM pg_stat_user_tables ORDER BY seq_tup_read DESC"
+    )).all()
+
+def main():
+    with engine.connect() as conn:
+        with conn.begin():
+            report = check_queries(conn)
+        stats = table_scan_stats(conn)
+
+    print("Hot queries (enable_seqscan = off):")
+    for label, tables in report:
+        status = f"SEQ SCAN on {', '.join(tables)}" if tables else "index"
+        print(f"  {label:<40} {status}")
+
+    print("\nTable counters (pg_stat_user_tables):")
+    print(f"  {'table':<28}{'seq_scan':>10}{'idx_scan':>10}{'seq_tup_read':>14}{'rows':>10}")
+    for relname, seq_scan, idx_scan, seq_tup_read, live in stats:
+        print(f"  {relname:<28}{seq_scan or 0:>10}{idx_scan or 0:>10}{seq_tup_read or 0:>14}{live or 0:>10}")
+
+    return 1 if any(tables for _, tables in report) else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
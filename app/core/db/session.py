@@ -1,18 +1,76 @@
+import asyncio
+import logging
 import os
+import time
+import uuid
 import sqlalchemy as _sql
 import sqlalchemy.orm as _orm
 import sqlalchemy.ext.declarative as _declarative
+import sqlalchemy.ext.asyncio as _asyncio
+from sqlalchemy.dialects import postgresql as _postgresql, sqlite as _sqlite
 from dotenv import load_dotenv
+from app.core.db import query_stats as _query_stats
+from app.core import metrics as _metrics
 
 load_dotenv()
 
+logger = logging.getLogger("uvicorn.error")
+
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Session-level features (LISTEN for pub/sub) need a real server connection;
+# behind PgBouncer, point this at Postgres itself
+DIRECT_DATABASE_URL = os.getenv("DIRECT_DATABASE_URL")
+
+# --- Pool configuration ---
+# Per engine and per worker: a worker can hold up to
+# DB_POOL_SIZE + DB_MAX_OVERFLOW connections on each of the sync and async engines.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", str(DB_POOL_SIZE)))  # connections opened at startup
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 = server default
+# PgBouncer in transaction mode: server connections change between
+# transactions, so no cached prepared statements and no startup `options`
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """create_engine / create_async_engine keyword arguments for `url`."""
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    backend = _sql.engine.make_url(url).get_backend_name()
+    if backend == "sqlite":
+        return options  # SQLite picks its own pool class; size limits do not apply
+
+    options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    connect_args = {}
+    if backend == "postgresql":
+        if DB_PGBOUNCER:
+            if is_async:
+                connect_args.update(
+                    statement_cache_size=0,
+                    prepared_statement_cache_size=0,
+                    prepared_statement_name_func=lambda: f"__asyncpg_{uuid.uuid4()}__",
+                )
+            if DB_STATEMENT_TIMEOUT_MS:
+                logger.warning(
+                    "DB_STATEMENT_TIMEOUT_MS is ignored with DB_PGBOUNCER; "
+                    "set statement_timeout on the database role instead"
+                )
+        elif DB_STATEMENT_TIMEOUT_MS:
+            if is_async:
+                connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+            else:
+                connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
 
 engine = _sql.create_engine(
     DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=True  # turn off in production
+    # Statement logging costs a formatted record per query; opt in with SQL_ECHO=true
+    echo=os.getenv("SQL_ECHO", "false").lower() == "true",
+    **engine_options(DATABASE_URL),
 )
 
 SessionLocal = _orm.sessionmaker(
@@ -21,4 +79,135 @@ SessionLocal = _orm.sessionmaker(
     bind=engine
 )
 
+# --- Async Engine (asyncpg) ---
+# Same database as the sync engine, reached through an async driver so that
+# `async def` endpoints do not hold a threadpool slot while waiting on Postgres.
+ASYNC_DRIVERS = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgresql+psycopg": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def get_async_database_url(url: str) -> str:
+    """Maps a sync DATABASE_URL onto its async driver (e.g. psycopg2 -> asyncpg)."""
+    parsed = _sql.engine.make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    query = dict(parsed.query)
+    if drivername == "postgresql+asyncpg" and "sslmode" in query:
+        # asyncpg does not understand libpq's `sslmode`, it takes `ssl` (same values)
+        query["ssl"] = query.pop("sslmode")
+    return parsed.set(drivername=drivername, query=query).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or get_async_database_url(DATABASE_URL)
+
+async_engine = _asyncio.create_async_engine(
+    ASYNC_DATABASE_URL,
+    **engine_options(ASYNC_DATABASE_URL, is_async=True),
+)
+
+# Per-request statement count / DB time, N+1 and slow-query logging
+_query_stats.instrument(engine)
+_query_stats.instrument(async_engine.sync_engine)
+# Pool gauges and checkout timing for /metrics
+_metrics.instrument_engine(engine, "sync")
+_metrics.instrument_engine(async_engine.sync_engine, "async")
+
+AsyncSessionLocal = _asyncio.async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False  # objects are serialized after commit, never lazy-refreshed
+)
+
 Base = _declarative.declarative_base()
+
+def dialect_insert(model, dialect_name: str):
+    """INSERT construct with on_conflict_do_nothing/do_update for the given dialect."""
+    if dialect_name == "postgresql":
+        return _postgresql.insert(model)
+    if dialect_name == "sqlite":
+        return _sqlite.insert(model)
+    raise NotImplementedError(f"No ON CONFLICT insert for dialect '{dialect_name}'")
+
+# --- Request-scoped sessions ---
+# Every module depends on these two (directly or through a `get_db = ...`
+# alias), never on a copy: FastAPI resolves a dependency once per request,
+# so an endpoint and its sub-dependencies share one session of each kind.
+# The two kinds cannot be merged, as a sync Session cannot drive the async
+# engine's connections. get_current_user looks users up through the async
+# session, so a sync endpoint that misses the user cache (app/user/cache.py)
+# holds a connection from each pool for that request; on a cache hit only
+# its own session is used. Reads routed to a replica (replicas.get_read_db /
+# get_async_read_db) are a separate session again. Sessions are lazy: no
+# connection is checked out until the first statement, so requests that
+# never query (cache hits, auth-only paths) never touch a pool.
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# --- Pool warm-up and status ---
+
+def _warm_up_sync(count: int):
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(engine.connect())
+    finally:
+        for connection in connections:
+            connection.close()
+
+async def warm_up_pools(count: int = DB_POOL_WARMUP):
+    """
+    Opens `count` connections on each engine and returns them to the pool,
+    so the first requests after a deploy do not pay for TCP/TLS/auth.
+    Failures are logged, not raised: /api/readyz reports the database state.
+    """
+    count = min(count, DB_POOL_SIZE)
+    if count <= 0 or engine.dialect.name == "sqlite":
+        return
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(_warm_up_sync, count)
+        connections = await asyncio.gather(*(async_engine.connect() for _ in range(count)), return_exceptions=True)
+        for connection in connections:
+            if not isinstance(connection, BaseException):
+                await connection.close()
+        errors = [c for c in connections if isinstance(c, BaseException)]
+        if errors:
+            raise errors[0]
+    except Exception as e:
+        logger.warning(f"DB pool warm-up failed ({type(e).__name__}: {e}); connections will be opened on demand")
+        return
+    logger.info(f"Warmed up {count} DB connections per engine in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+def pool_status(target) -> dict:
+    """Checked-out connections against the pool's capacity (Engine or AsyncEngine)."""
+    pool = target.pool
+    if not hasattr(pool, "checkedout"):
+        return {"pool": type(pool).__name__}
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    capacity = pool.size() + max_overflow if max_overflow >= 0 else None  # -1: unbounded overflow
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "overflow": max(pool.overflow(), 0),
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3) if capacity else None,
+    }
+
+async def ping_database() -> float:
+    """SELECT 1 through the async pool; returns the round trip in milliseconds."""
+    started = time.perf_counter()
+    async with async_engine.connect() as conn:
+        await conn.execute(_sql.text("SELECT 1"))
+    return (time.perf_counter() - started) * 1000
@@ -0,0 +1,39 @@
+# app/core/http.py
+"""
+Shared outbound HTTP client.
+
+One httpx.AsyncClient per process, so calls to third-party sites reuse
+pooled keep-alive connections instead of opening a new one per request.
+Closed from the app lifespan.
+"""
+import os
+from typing import Optional
+
+import httpx
+
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "3"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_USER_AGENT = "Mozilla/5.0 (compatible; GCHLinkPreview/1.0)"
+
+_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS // 2,
+            ),
+            follow_redirects=True,
+            max_redirects=5,
+            headers={"User-Agent": HTTP_USER_AGENT},
+        )
+    return _client
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,32 +1,129 @@
+# app/core/logger.py
+"""
+Logging pipeline.
+
+init_logging() routes stdlib logging (uvicorn, SQLAlchemy, and the
+`logging.getLogger(...)` calls in app code) into loguru. Every sink is
+added with `enqueue=True`: a request thread only formats the record and
+puts it on a queue; a background thread does the actual write, so slow
+stdout or disk never adds request latency.
+
+Configuration (environment):
+- LOG_LEVEL       default level (INFO)
+- LOG_LEVELS      per-module overrides, e.g.
+                  "app.task=DEBUG,sqlalchemy.engine=WARNING,uvicorn.access=WARNING".
+                  App code is matched by module path (app.task.service), libraries by
+                  logger name; the longest matching prefix wins.
+- LOG_FORMAT      stdout format: text (default) | json
+- LOG_FILE        optional JSON-lines file sink; unset by default, so logs go
+                  to stdout only (what Vercel and container runtimes collect,
+                  and their filesystem may be read-only). Every process rotates
+                  its own file, so with several workers put {pid} in the path,
+                  e.g. "logs/app-{pid}.log".
+- LOG_ROTATION / LOG_RETENTION / LOG_COMPRESSION   passed to loguru for LOG_FILE
+- LOG_SAMPLE_SECONDS   window used by log_sampled()
+"""
+import json
 import logging
+import os
 import sys
+import threading
+import time
+import traceback
+from functools import lru_cache
 from pprint import pformat
+from typing import Dict, Tuple
+
 from loguru import logger
 from loguru._defaults import LOGURU_FORMAT
 
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text | json
+LOG_FILE = os.getenv("LOG_FILE", "")  # opt-in; see above
+LOG_ROTATION = os.getenv("LOG_ROTATION", "50 MB")
+LOG_RETENTION = os.getenv("LOG_RETENTION", "14 days")
+LOG_COMPRESSION = os.getenv("LOG_COMPRESSION", "gz") or None
+LOG_SAMPLE_SECONDS = float(os.getenv("LOG_SAMPLE_SECONDS", "10"))
+
+INTERCEPTED_FORMAT = (
+    LOGURU_FORMAT.replace("{name}", "{extra[source]}")
+    .replace("{function}", "{extra[function]}")
+    .replace("{line}", "{extra[line]}")
+)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_STDLIB_LEVELS = {
+    logging.CRITICAL: "CRITICAL",
+    logging.ERROR: "ERROR",
+    logging.WARNING: "WARNING",
+    logging.INFO: "INFO",
+    logging.DEBUG: "DEBUG",
+}
+
+
+@lru_cache(maxsize=1024)
+def _module_path(pathname: str) -> str:
+    """/srv/app/task/service.py -> app.task.service (None outside the project)."""
+    path = os.path.abspath(pathname)
+    if not path.startswith(PROJECT_ROOT + os.sep):
+        return None
+    relative = os.path.splitext(os.path.relpath(path, PROJECT_ROOT))[0]
+    return relative.replace(os.sep, ".")
+
 
 class InterceptHandler(logging.Handler):
     """
-    Default handler from examples in loguru documentaion.
-    See https://loguru.readthedocs.io/en/stable/overview.html#entirely-compatible-with-standard-logging
+    Forwards stdlib records to loguru.
+
+    Unlike the loguru docs example, it does not walk the stack to find the
+    caller: the LogRecord already carries the logger name, module path and
+    line, which are bound as `extra` instead, along with any
+    `extra={"fields": {...}}` passed to the stdlib call.
     """
 
     def emit(self, record: logging.LogRecord):
-        # Get corresponding Loguru level if it exists
-        try:
-            level = logger.level(record.levelname).name
-        except ValueError:
-            level = record.levelno
-
-        # Find caller from where originated the logged message
-        frame, depth = logging.currentframe(), 2
-        while frame.f_code.co_filename == logging.__file__:
-            frame = frame.f_back
-            depth += 1
-
-        logger.opt(depth=depth, exception=record.exc_info).log(
-            level, record.getMessage()
-        )
+        level = _STDLIB_LEVELS.get(record.levelno, record.levelno)
+        source = _module_path(record.pathname) or record.name
+        # logger.info(..., extra={"fields": {...}}) becomes top-level JSON keys
+        fields = getattr(record, "fields", None) or {}
+        logger.bind(
+            logger=record.name, source=source, function=record.funcName, line=record.lineno, **fields
+        ).opt(exception=record.exc_info).log(level, record.getMessage())
+
+
+class LevelFilter:
+    """Per-module minimum levels; lookups are cached per source name."""
+
+    def __init__(self, default: str, overrides: Dict[str, str]):
+        self.default = logger.level(default).no
+        self.overrides = {name: logger.level(level.upper()).no for name, level in overrides.items()}
+        self._minimum = lru_cache(maxsize=2048)(self._resolve)
+
+    def _resolve(self, source: str) -> int:
+        best, level = -1, self.default
+        for prefix, prefix_level in self.overrides.items():
+            if (source == prefix or source.startswith(prefix + ".")) and len(prefix) > best:
+                best, level = len(prefix), prefix_level
+        return level
+
+    def __call__(self, record: dict) -> bool:
+        source = record["extra"].get("source") or record["name"] or ""
+        return record["level"].no >= self._minimum(source)
+
+    @property
+    def lowest(self) -> int:
+        return min([self.default, *self.overrides.values()])
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
 
 
 def format_record(record: dict) -> str:
@@ -43,6 +140,9 @@ def format_record(record: dict) -> str:
     """
 
     format_string = LOGURU_FORMAT
+    if record["extra"].get("source"):
+        # Intercepted stdlib record: show where it was logged, not this module
+        format_string = INTERCEPTED_FORMAT
     if record["extra"].get("payload") is not None:
         record["extra"]["payload"] = pformat(
             record["extra"]["payload"], indent=4, compact=True, width=88
@@ -53,6 +153,26 @@ def format_record(record: dict) -> str:
     return format_string
 
 
+def format_json(record: dict) -> str:
+    """One JSON object per line: time, level, source, message, extras, exception."""
+    extra = record["extra"]
+    entry = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "source": extra.get("source") or record["name"],
+        "function": extra.get("function", record["function"]),
+        "line": extra.get("line", record["line"]),
+        "message": record["message"],
+    }
+    for key, value in extra.items():
+        if key not in ("source", "function", "line", "logger", "_json"):
+            entry[key] = value
+    if record["exception"]:
+        entry["exception"] = "".join(traceback.format_exception(*record["exception"]))
+    extra["_json"] = json.dumps(entry, default=str)
+    return "{extra[_json]}\n"
+
+
 def init_logging():
     """
     Replaces logging handlers with a handler for using the custom handler.
@@ -69,24 +189,74 @@ def init_logging():
     2020-07-25 02:19:21.357 | INFO     | uvicorn.lifespan.on:startup:34 - Application startup complete.
 
     """
+    overrides = parse_levels(LOG_LEVELS)
+    level_filter = LevelFilter(LOG_LEVEL, overrides)
 
-    # disable handlers for specific uvicorn loggers
-    # to redirect their output to the default uvicorn logger
-    # works with uvicorn==0.11.6
-    loggers = (
-        logging.getLogger(name)
-        for name in logging.root.manager.loggerDict
-        if name.startswith("uvicorn.")
-    )
-    for uvicorn_logger in loggers:
-        uvicorn_logger.handlers = []
-
-    # change handler for default uvicorn logger
+    # Everything goes through the root logger into loguru; records below every
+    # configured level are dropped by stdlib before a LogRecord is even built
     intercept_handler = InterceptHandler()
-    logging.getLogger("uvicorn").handlers = [intercept_handler]
+    logging.basicConfig(handlers=[intercept_handler], level=level_filter.lowest, force=True)
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("uvicorn"):
+            named_logger = logging.getLogger(name)
+            named_logger.handlers = []
+            named_logger.propagate = True
+            named_logger.setLevel(logging.NOTSET)  # app code logs on uvicorn.error too
+    for name, level in overrides.items():
+        if not name.startswith("app."):
+            logging.getLogger(name).setLevel(level)
+
+    stdout_format = format_json if LOG_FORMAT == "json" else format_record
+    handlers = [{
+        "sink": sys.stdout, "level": 0, "format": stdout_format,
+        "filter": level_filter, "enqueue": True,
+    }]
+    if LOG_FILE:
+        handlers.append({
+            "sink": LOG_FILE.replace("{pid}", str(os.getpid())), "level": 0, "format": format_json, "filter": level_filter,
+            "enqueue": True, "rotation": LOG_ROTATION, "retention": LOG_RETENTION,
+            "compression": LOG_COMPRESSION,
+        })
+    logger.configure(handlers=handlers)
+
+
+# --- Sampling ---
+
+class LogSampler:
+    """
+    Lets one record per key through every `interval` seconds and counts the
+    rest, so a hot path (e.g. failed logins during credential stuffing)
+    cannot flood the log.
+    """
+
+    def __init__(self, interval: float = LOG_SAMPLE_SECONDS, max_keys: int = 1024):
+        self.interval = interval
+        self.max_keys = max_keys
+        self._state: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key: str):
+        """None to drop this record, else how many were dropped since the last one."""
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._state.get(key, (0.0, 0))
+            if now - last < self.interval:
+                self._state[key] = (last, suppressed + 1)
+                return None
+            if len(self._state) >= self.max_keys and key not in self._state:
+                self._state.clear()
+            self._state[key] = (now, 0)
+            return suppressed
+
+log_sampler = LogSampler()
 
-    # set logs output, level and format
-    logger.configure(
-        handlers=[{"sink": sys.stdout, "level": logging.INFO, "format": format_record}]
-    )
-    logger.add("app.log")
\ No newline at end of file
+def log_sampled(target: logging.Logger, level: int, key: str, message: str):
+    """Logs `message` at most once per LOG_SAMPLE_SECONDS for `key`."""
+    if not target.isEnabledFor(level):
+        return
+    suppressed = log_sampler.allow(key)
+    if suppressed is None:
+        return
+    if suppressed:
+        message = f"{message} (+{suppressed} similar in the last {log_sampler.interval:g}s)"
+    target.log(level, message, stacklevel=2)
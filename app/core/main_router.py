@@ -1,46 +1,83 @@
 # app/core/main_router.py
-from datetime import datetime, timedelta
 from typing import List, Optional
+import asyncio
 import logging
+import os
 
 # Added 'Response' to imports
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Response
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
 import app.Shared.helpers as _helpers
 from app.Shared import schema as _shared_schemas
 from app.Shared import service as _services
+import app.core.db.session as _database
+import app.core.rate_limit as _rate_limit
+from app.core.rate_limit import login_limiter
+from app.core.logger import log_sampled
+import app.mail.outbox as _email_outbox
+import app.user.user as _user_auth
+from app.user.models import UserRole
 
 logger = logging.getLogger("uvicorn.error")
 router = APIRouter(prefix="/api")
 
-# Rate Limiting
-login_attempts = {}
-LOCKOUT_THRESHOLD = 5
-LOCKOUT_DURATION_SECONDS = 30 * 60
+READYZ_MAX_SATURATION = float(os.getenv("READYZ_MAX_SATURATION", "0.9"))
+READYZ_DB_TIMEOUT_SECONDS = float(os.getenv("READYZ_DB_TIMEOUT_SECONDS", "2"))
 
 @router.get("/healthcheck", status_code=200)
 def healthcheck():
     return {"status": "healthy"}
 
+@router.get("/readyz")
+async def readyz(response: Response):
+    """
+    Readiness for the load balancer: 503 while either DB pool is nearly
+    exhausted or the database does not answer within READYZ_DB_TIMEOUT_SECONDS.
+    async so that a saturated threadpool cannot hold the probe itself.
+    """
+    pools = {
+        "sync": _database.pool_status(_database.engine),
+        "async": _database.pool_status(_database.async_engine),
+    }
+    result = {"status": "ready", "pools": pools, "db_latency_ms": None}
+
+    saturated = [name for name, pool in pools.items() if (pool.get("saturation") or 0) >= READYZ_MAX_SATURATION]
+    if saturated:
+        # Skip the round trip: it would queue behind the requests holding the pool
+        result.update(status="not_ready", reason=f"DB pool saturated: {', '.join(saturated)}")
+    else:
+        try:
+            latency_ms = await asyncio.wait_for(_database.ping_database(), READYZ_DB_TIMEOUT_SECONDS)
+            result["db_latency_ms"] = round(latency_ms, 2)
+        except asyncio.TimeoutError:
+            result.update(status="not_ready", reason="DB round trip timed out")
+        except Exception as e:
+            result.update(status="not_ready", reason=f"DB unreachable: {type(e).__name__}")
+
+    if result["status"] != "ready":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return result
+
 # --- AUTHENTICATION ---
 
 @router.post("/auth/login", response_model=_shared_schemas.AuthLoginResp, tags=["Auth"])
 def login(
+    request: Request,
     response: Response,  # <--- INJECT RESPONSE OBJECT
     payload: _shared_schemas.LoginReq, 
     db: Session = Depends(_services.get_db)
 ):
-    # 1. Lockout Check
-    attempts = login_attempts.get(payload.email, {"count": 0, "locked_until": None})
-    if attempts.get("locked_until") and attempts["locked_until"] > datetime.utcnow():
-        raise HTTPException(status_code=403, detail="Account locked due to multiple failed attempts")
+    # 1. Lockout Check (per email and per client IP, shared across workers)
+    # (client_ip is None unless LOGIN_LIMITER_CLIENT_IP is configured; see rate_limit.py)
+    client_ip = _rate_limit.client_ip(request)
+    login_limiter.check(payload.email, client_ip)
 
     try:
         # 2. Perform Login
         user, access_token, refresh_token = _services.login_with_email(db, payload.email, payload.password)
         
         # 3. Success - Reset attempts
-        login_attempts.pop(payload.email, None)
+        login_limiter.record_success(payload.email)
         
         # --- NEW: SET COOKIE FOR WEB DASHBOARD ---
         # app/core/main_router.py
@@ -63,19 +100,27 @@ def login(
             "user": user
         }
     except HTTPException as e:
-        print(f"Login failed for {payload.email}: {e.detail}")
-        # 4. Failure - Increment attempts
-        attempts = login_attempts.setdefault(payload.email, {"count": 0, "locked_until": None})
-        attempts["count"] += 1
-        if attempts["count"] >= LOCKOUT_THRESHOLD:
-            attempts["locked_until"] = datetime.utcnow() + timedelta(seconds=LOCKOUT_DURATION_SECONDS)
+        # Sampled: credential stuffing must not turn into a log flood
+        log_sampled(logger, logging.INFO, "auth.login_failed", f"Login failed for {payload.email}: {e.detail}")
+        # 4. Failure - Increment attempts, for wrong credentials only: a busy
+        # password pool (503) or an inactive account (403) says nothing about
+        # the password and must not lock anyone out
+        if e.status_code == status.HTTP_400_BAD_REQUEST:
+            login_limiter.record_failure(payload.email, client_ip)
         raise e
 
+@router.get("/auth/limiter/metrics", tags=["Auth"])
+async def login_limiter_metrics(current_user = Depends(_user_auth.get_current_user)):
+    if current_user.role != UserRole.admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return login_limiter.metrics()
+
 @router.post("/auth/refresh", tags=["Auth"])
 def refresh(payload: _shared_schemas.RefreshReq, db: Session = Depends(_services.get_db)):
     try:
-        new_access = _services.refresh_access_token(db, payload.refresh_token)
-        return {"access_token": new_access}
+        new_access, new_refresh = _services.refresh_access_token(db, payload.refresh_token)
+        # Refresh tokens are single-use: clients must keep the new one
+        return {"access_token": new_access, "refresh_token": new_refresh}
     except Exception as e:
         raise HTTPException(status_code=401, detail="Invalid token")
 
@@ -97,7 +142,6 @@ def logout(
 @router.post("/auth/forgot-password", tags=["Auth"])
 def forgot_password(
     payload: _shared_schemas.ForgotPasswordReq, 
-    background_tasks: BackgroundTasks, 
     db: Session = Depends(_services.get_db)):
     user = _services.get_user_by_email(db, payload.email)
     
@@ -113,7 +157,8 @@ def forgot_password(
     
     subject = "Password Reset Request"
     html_text = f"Your OTP for password reset is: <strong>{otp}</strong>. Valid for 5 minutes."
-    background_tasks.add_task(_helpers.send_email, payload.email, subject, html_text, otp)
+    # Delivered by the email outbox worker (app/mail/outbox.py)
+    _email_outbox.queue_otp_email(db, payload.email, subject, html_text, otp)
     
     return {"message": "OTP sent successfully"}
 
@@ -0,0 +1,224 @@
+# app/core/metrics.py
+"""
+Prometheus metrics, served as text by GET /metrics.
+
+Per request (PrometheusMiddleware), labelled by route template
+(`/api/tasks/{task_id}/chat`, never the raw path, so label cardinality stays
+bounded; unknown paths are counted as `<unmatched>`):
+
+- http_requests_total{method, route, status}
+- http_request_duration_seconds{method, route}   histogram
+- http_requests_in_progress{method, route}
+
+Read at scrape time from what registered itself here:
+
+- db_pool_size / db_pool_checked_out / db_pool_checked_in / db_pool_overflow{engine}
+- db_pool_checkout_seconds{engine} histogram and db_pool_checkout_timeouts_total{engine}
+  (recorded on every checkout by instrument_engine)
+- threadpool_tokens_total / threadpool_tokens_in_use: anyio's limiter that
+  runs sync endpoints and dependencies
+- websocket_connections{channel}
+- login_limiter_* from LoginLimiter.metrics()
+
+With several workers, set PROMETHEUS_MULTIPROC_DIR (an empty directory,
+cleared at deploy) so the request metrics are summed across processes; the
+scrape-time gauges then describe the worker that answered the scrape.
+"""
+import os
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+
+import anyio.to_thread
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event, exc as _sql_exc
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")  # if set, /metrics requires "Authorization: Bearer <token>"
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+
+UNMATCHED_ROUTE = "<unmatched>"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to the end of the response body",
+    ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being handled",
+    ["method", "route"], multiprocess_mode="livesum",
+)
+POOL_CHECKOUT = Histogram(
+    "db_pool_checkout_seconds", "Time to get a connection from the pool (queue wait and new connections)",
+    ["engine"], buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+POOL_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up after pool_timeout", ["engine"]
+)
+
+# --- Route templates ---
+
+@lru_cache(maxsize=4096)
+def _route_template(app, method: str, root_path: str, path: str) -> str:
+    probe = {"type": "http", "method": method, "root_path": root_path, "path": path}
+    partial = None
+    for route in app.router.routes:
+        match, _ = route.matches(probe)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path  # right path, wrong method (405)
+    return partial or UNMATCHED_ROUTE
+
+def route_template(scope) -> str:
+    """Resolved before routing runs, so the in-progress gauge has its label up front."""
+    app = scope.get("app")
+    if app is None or not hasattr(app, "router"):
+        return UNMATCHED_ROUTE
+    return _route_template(app, scope["method"], scope.get("root_path", ""), scope["path"])
+
+# --- Middleware ---
+
+class PrometheusMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        status_code = 500
+        in_progress = IN_PROGRESS.labels(method, route)
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - started)
+            REQUESTS.labels(method, route, str(status_code)).inc()
+            in_progress.dec()
+
+# --- Scrape-time sources ---
+
+_engines: Dict[str, Engine] = {}
+_websockets: Dict[str, Callable[[], int]] = {}
+_login_limiter = None
+
+def _time_checkouts(pool, name: str):
+    if getattr(pool, "_checkout_timed", False) or not hasattr(pool, "_do_get"):
+        return
+    do_get = pool._do_get
+
+    def timed_do_get():
+        started = time.perf_counter()
+        try:
+            return do_get()
+        except _sql_exc.TimeoutError:
+            POOL_TIMEOUTS.labels(name).inc()
+            raise
+        finally:
+            POOL_CHECKOUT.labels(name).observe(time.perf_counter() - started)
+
+    pool._do_get = timed_do_get
+    pool._checkout_timed = True
+
+def instrument_engine(engine: Engine, name: str):
+    """Pool gauges and checkout timing for a sync Engine (async: pass `.sync_engine`)."""
+    _engines[name] = engine
+    _time_checkouts(engine.pool, name)
+    if not event.contains(engine, "engine_disposed", _on_engine_disposed):
+        event.listen(engine, "engine_disposed", _on_engine_disposed)
+
+def _on_engine_disposed(engine: Engine):
+    # dispose() swaps in a fresh pool
+    for name, registered in _engines.items():
+        if registered is engine:
+            _time_checkouts(engine.pool, name)
+
+def watch_websockets(channel: str, count: Callable[[], int]):
+    _websockets[channel] = count
+
+def watch_login_limiter(limiter):
+    global _login_limiter
+    _login_limiter = limiter
+
+def _threadpool_tokens() -> Optional[Tuple[float, float]]:
+    """(total, borrowed) for anyio's default thread limiter; needs the event loop."""
+    try:
+        limiter = anyio.to_thread.current_default_thread_limiter()
+    except Exception:
+        return None
+    return limiter.total_tokens, limiter.borrowed_tokens
+
+class AppCollector:
+    def collect(self):
+        size = GaugeMetricFamily("db_pool_size", "Configured pool size", labels=["engine"])
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "Connections in use", labels=["engine"])
+        checked_in = GaugeMetricFamily("db_pool_checked_in", "Idle connections in the pool", labels=["engine"])
+        overflow = GaugeMetricFamily("db_pool_overflow", "Connections open beyond pool_size", labels=["engine"])
+        for name, engine in _engines.items():
+            pool = engine.pool
+            if not hasattr(pool, "checkedout"):
+                continue  # NullPool / StaticPool / SingletonThreadPool
+            size.add_metric([name], pool.size())
+            checked_out.add_metric([name], pool.checkedout())
+            checked_in.add_metric([name], pool.checkedin())
+            overflow.add_metric([name], max(pool.overflow(), 0))
+        yield from (size, checked_out, checked_in, overflow)
+
+        tokens = _threadpool_tokens()
+        if tokens is not None:
+            yield GaugeMetricFamily("threadpool_tokens_total", "Threads available to sync endpoints", value=tokens[0])
+            yield GaugeMetricFamily("threadpool_tokens_in_use", "Threads running sync endpoints", value=tokens[1])
+
+        websockets = GaugeMetricFamily("websocket_connections", "Open WebSocket connections", labels=["channel"])
+        for channel, count in _websockets.items():
+            websockets.add_metric([channel], count())
+        yield websockets
+
+        if _login_limiter is not None:
+            stats = _login_limiter.metrics()
+            events = CounterMetricFamily("login_limiter_events", "Login limiter checks and outcomes", labels=["event"])
+            for name in ("hits", "misses", "failures", "backend_errors", "evictions"):
+                events.add_metric([name], stats[name])
+            yield events
+            if stats["tracked_keys"] is not None:
+                yield GaugeMetricFamily("login_limiter_tracked_keys", "Keys tracked by the limiter backend", value=stats["tracked_keys"])
+
+_app_collector = AppCollector()
+REGISTRY.register(_app_collector)
+
+def render() -> Tuple[bytes, str]:
+    """(body, content type) for the /metrics response."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_app_collector)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
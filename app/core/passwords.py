@@ -0,0 +1,141 @@
+# app/core/passwords.py
+"""
+Password hashing off the request path.
+
+bcrypt is CPU-bound by design, so it runs in a dedicated process pool of
+PASSWORD_WORKERS processes: a login burst uses at most that many cores and
+never holds the GIL of the web worker. At most PASSWORD_QUEUE_SIZE hash /
+verify calls may be pending; beyond that callers get a 503 instead of
+piling up.
+
+BCRYPT_ROUNDS sets the cost for new hashes. Hashes made with a different
+cost are upgraded on the next successful login (verify_and_update).
+
+This module is imported by pool processes, so it must stay free of app/DB
+imports.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_QUEUE_SIZE = int(os.getenv("PASSWORD_QUEUE_SIZE", str(PASSWORD_WORKERS * 16)))
+# process (default) | thread (e.g. serverless runtimes without multiprocessing)
+PASSWORD_EXECUTOR = os.getenv("PASSWORD_EXECUTOR", "process")
+
+BCRYPT_MAX_LENGTH = 72
+
+logger = logging.getLogger("uvicorn.error")
+
+pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# --- Work functions (run inside the pool) ---
+
+def _hash(password: str) -> str:
+    return pwd_ctx.hash(password[:BCRYPT_MAX_LENGTH])
+
+def _verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    try:
+        return pwd_ctx.verify_and_update(password[:BCRYPT_MAX_LENGTH], hashed)
+    except Exception:
+        return False, None
+
+# --- Pool ---
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_QUEUE_SIZE)
+
+def get_executor() -> Executor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            if PASSWORD_EXECUTOR == "thread":
+                _executor = ThreadPoolExecutor(PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+            else:
+                # spawn: never fork a process that already runs threads and an event loop
+                _executor = ProcessPoolExecutor(
+                    PASSWORD_WORKERS, mp_context=multiprocessing.get_context("spawn")
+                )
+        return _executor
+
+def _fall_back_to_threads(broken: Executor):
+    """Processes cannot be started here (e.g. sandboxed runtime); keep serving from threads."""
+    global _executor, PASSWORD_EXECUTOR
+    with _executor_lock:
+        if _executor is broken:
+            logger.warning("Password process pool unavailable; falling back to threads")
+            PASSWORD_EXECUTOR = "thread"
+            _executor = None
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def _acquire_slot():
+    if not _slots.acquire(blocking=False):
+        raise HTTPException(status_code=503, detail="Server busy, please try again shortly")
+
+# --- Sync API (threadpool endpoints / sync services) ---
+
+def _run(fn, *args):
+    _acquire_slot()
+    try:
+        executor = get_executor()
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            _fall_back_to_threads(executor)
+            return get_executor().submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+def hash_password(password: str) -> str:
+    return _run(_hash, password)
+
+def verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """(valid, new_hash). new_hash is set when the stored cost is outdated."""
+    if not hashed:
+        return False, None
+    return _run(_verify_and_update, password, hashed)
+
+def verify_password(password: str, hashed: str) -> bool:
+    return verify_and_update(password, hashed)[0]
+
+# --- Async API (async def services) ---
+
+async def _run_async(fn, *args):
+    _acquire_slot()
+    loop = asyncio.get_running_loop()
+    try:
+        executor = get_executor()
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            _fall_back_to_threads(executor)
+            return await loop.run_in_executor(get_executor(), fn, *args)
+    finally:
+        _slots.release()
+
+async def hash_password_async(password: str) -> str:
+    return await _run_async(_hash, password)
+
+async def verify_and_update_async(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    if not hashed:
+        return False, None
+    return await _run_async(_verify_and_update, password, hashed)
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    return (await verify_and_update_async(password, hashed))[0]
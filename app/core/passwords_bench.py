@@ -0,0 +1,57 @@
+# app/core/passwords_bench.py
+"""
+Login throughput of the password pool.
+
+    python -m app.core.passwords_bench [--logins 64] [--rounds 12]
+
+Runs concurrent bcrypt verifications (what a login costs) through the same
+executor the app uses, once per worker count from 1 to PASSWORD_WORKERS,
+and reports logins/sec overall and per core. Set BCRYPT_ROUNDS /
+PASSWORD_WORKERS in the environment to try other settings.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import app.core.passwords as _passwords
+
+async def run(workers: int, logins: int, hashed: str) -> float:
+    _passwords.shutdown_executor()
+    _passwords.PASSWORD_WORKERS = workers
+    # Start the processes before timing
+    await asyncio.gather(*[_passwords.verify_password_async("warm-up", hashed) for _ in range(workers)])
+
+    start = time.perf_counter()
+    pending = []
+    for _ in range(logins):
+        pending.append(_passwords.verify_password_async("correct horse", hashed))
+    results = await asyncio.gather(*pending)
+    elapsed = time.perf_counter() - start
+
+    assert all(results)
+    return logins / elapsed
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=_passwords.BCRYPT_ROUNDS)
+    args = parser.parse_args()
+
+    # Pool processes read the cost at import; a differing cost would make
+    # every verification a rehash as well
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    _passwords.pwd_ctx.update(bcrypt__rounds=args.rounds)  # thread executor
+    hashed = _passwords.pwd_ctx.hash("correct horse", rounds=args.rounds)
+    max_workers = _passwords.PASSWORD_WORKERS
+    _passwords._slots = _passwords.threading.BoundedSemaphore(max(args.logins, 1) + 1)
+
+    print(f"bcrypt cost {args.rounds}, {args.logins} logins, {os.cpu_count()} CPUs, executor={_passwords.PASSWORD_EXECUTOR}")
+    print(f"  {'workers':>7} {'logins/s':>10} {'per core':>10}")
+    for workers in range(1, max_workers + 1):
+        rate = await run(workers, args.logins, hashed)
+        print(f"  {workers:>7} {rate:>10.1f} {rate / workers:>10.1f}")
+    _passwords.shutdown_executor()
+
+if __name__ == "__main__":
+    asyncio.run(main())
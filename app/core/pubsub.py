@@ -0,0 +1,182 @@
+# app/core/pubsub.py
+"""
+Cross-worker fan-out for WebSocket broadcasts.
+
+Each uvicorn worker keeps its own ConnectionManager, so an event raised on
+one worker has to travel through a shared backend before every worker can
+push it to the sockets it holds:
+
+    publisher -> pubsub.publish(channel, msg) -> backend -> every worker's
+    subscribe(channel, handler) handlers -> manager.broadcast(msg)
+
+Backends (PUBSUB_BACKEND):
+    postgres  LISTEN/NOTIFY on a dedicated asyncpg connection (default on Postgres)
+    memory    in-process only, for tests and single-worker / SQLite setups
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+import app.core.db.session as _database
+
+logger = logging.getLogger("uvicorn.error")
+
+Handler = Callable[[dict], Awaitable[None]]
+
+PUBSUB_BACKEND = os.getenv(
+    "PUBSUB_BACKEND",
+    "postgres" if _database.async_engine.dialect.name == "postgresql" else "memory"
+)
+PUBSUB_RECONNECT_SECONDS = float(os.getenv("PUBSUB_RECONNECT_SECONDS", "2"))
+PUBSUB_KEEPALIVE_SECONDS = float(os.getenv("PUBSUB_KEEPALIVE_SECONDS", "30"))
+PUBSUB_READY_TIMEOUT_SECONDS = 5.0
+PG_NOTIFY_MAX_BYTES = 7999  # Postgres rejects NOTIFY payloads of 8000 bytes or more
+
+class PubSubBackend:
+    def __init__(self):
+        self.handlers: Dict[str, List[Handler]] = {}
+
+    def subscribe(self, channel: str, handler: Handler):
+        """Registers a handler; call at import time, before start()."""
+        self.handlers.setdefault(channel, []).append(handler)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, channel: str, message: dict):
+        raise NotImplementedError
+
+    async def _dispatch(self, channel: str, message: dict):
+        for handler in self.handlers.get(channel, []):
+            try:
+                await handler(message)
+            except Exception:
+                logger.exception(f"PubSub handler failed on channel '{channel}'")
+
+class InProcessBackend(PubSubBackend):
+    """Delivers straight to this process's handlers."""
+    async def publish(self, channel: str, message: dict):
+        await self._dispatch(channel, message)
+
+def listen_dsn(url) -> str:
+    """
+    libpq-style DSN for asyncpg.connect(). Its DSN parser reads `sslmode`;
+    the `ssl` key get_async_database_url writes for SQLAlchemy would be sent
+    to the server as a setting instead of enabling TLS.
+    """
+    url = make_url(url)
+    query = dict(url.query)
+    if "ssl" in query:
+        query.setdefault("sslmode", query.pop("ssl"))
+    return url.set(drivername="postgresql", query=query).render_as_string(hide_password=False)
+
+class PostgresBackend(PubSubBackend):
+    """
+    NOTIFY goes through the regular async pool; LISTEN holds one dedicated
+    connection per worker that is re-established if it drops. The publishing
+    worker receives its own notifications, so every worker delivers the same
+    way and in the same order.
+    """
+    def __init__(self, engine, listen_url: Optional[str] = None):
+        super().__init__()
+        self.engine = engine
+        # LISTEN holds a session, which PgBouncer's transaction mode cannot give:
+        # listen_url (DIRECT_DATABASE_URL) can point straight at Postgres
+        self.dsn = listen_dsn(listen_url or engine.url)
+        self._listener: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+        self._dispatching: Set[asyncio.Task] = set()
+
+    async def start(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+        try:
+            await asyncio.wait_for(self._ready.wait(), PUBSUB_READY_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning("PubSub listener not connected yet; retrying in background")
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def publish(self, channel: str, message: dict):
+        if self._listener is None:
+            await self.start()
+
+        payload = json.dumps(message, default=str)
+        if len(payload.encode("utf-8")) > PG_NOTIFY_MAX_BYTES:
+            logger.warning(f"PubSub message on '{channel}' too large for NOTIFY; delivering to this worker only")
+            await self._dispatch(channel, message)
+            return
+
+        try:
+            async with self.engine.begin() as conn:
+                await conn.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": channel, "payload": payload}
+                )
+        except Exception:
+            logger.exception(f"PubSub NOTIFY failed on '{channel}'; delivering to this worker only")
+            await self._dispatch(channel, message)
+
+    async def _listen(self):
+        import asyncpg
+
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(self.dsn)
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _conn: lost.set())
+                for channel in self.handlers:
+                    await conn.add_listener(channel, self._on_notify)
+                self._ready.set()
+
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), PUBSUB_KEEPALIVE_SECONDS)
+                    except asyncio.TimeoutError:
+                        # Detects half-open connections that never report termination
+                        await conn.fetchval("SELECT 1", timeout=PUBSUB_KEEPALIVE_SECONDS)
+                logger.warning("PubSub listener connection lost; reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"PubSub listener error: {e}; reconnecting")
+            finally:
+                self._ready.clear()
+                if conn is not None and not conn.is_closed():
+                    conn.terminate()
+            await asyncio.sleep(PUBSUB_RECONNECT_SECONDS)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning(f"PubSub dropped malformed payload on '{channel}'")
+            return
+        task = asyncio.create_task(self._dispatch(channel, message))
+        self._dispatching.add(task)
+        task.add_done_callback(self._dispatching.discard)
+
+def create_backend(name: str = PUBSUB_BACKEND) -> PubSubBackend:
+    if name == "postgres":
+        return PostgresBackend(_database.async_engine, _database.DIRECT_DATABASE_URL or _database.DATABASE_URL)
+    if name == "memory":
+        return InProcessBackend()
+    raise ValueError(f"Unknown PUBSUB_BACKEND '{name}'")
+
+pubsub = create_backend()
@@ -0,0 +1,259 @@
+# app/core/rate_limit.py
+"""
+Sliding-window login limiter.
+
+Failed logins are counted per email and per client IP with the sliding
+window counter approximation: each key keeps the count of the current fixed
+window and of the previous one, and the effective count is
+
+    prev_count * (1 - elapsed / window) + count
+
+so a burst straddling a window boundary is still seen in full.
+
+Backends (LOGIN_LIMITER_BACKEND):
+- memory:   per-process OrderedDict, bounded by LOGIN_LIMITER_MAX_KEYS with
+            LRU eviction, so credential stuffing cannot grow it forever.
+- database: the `auth_login_attempts` table, shared by every worker. One
+            atomic upsert per failure; expired rows are purged periodically.
+Defaults to database on Postgres and memory otherwise. If the database is
+unreachable the limiter keeps counting in memory rather than failing logins.
+
+Per-IP limiting needs the real client address, which behind Vercel or a load
+balancer is not the socket peer (every request would share the proxy's
+address, and 20 failures from anyone would lock everyone out). It is off
+unless LOGIN_LIMITER_CLIENT_IP says where the address comes from:
+- "" (default): no per-IP limiting, per-email only;
+- peer:         the socket address, when clients connect directly;
+- a header set by the trusted proxy, e.g. x-forwarded-for or x-real-ip.
+  For a comma-separated list the address LOGIN_LIMITER_PROXY_HOPS entries
+  from the right is used: the ones before it are whatever the client sent.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import sqlalchemy as _sql
+from fastapi import HTTPException, Request
+
+import app.core.db.session as _database
+from app.core import metrics as _metrics
+from app.user.models import LoginAttempt
+
+LOGIN_LIMITER_BACKEND = os.getenv("LOGIN_LIMITER_BACKEND")  # memory | database
+LOGIN_LIMITER_WINDOW_SECONDS = int(os.getenv("LOGIN_LIMITER_WINDOW_SECONDS", str(30 * 60)))
+LOGIN_LIMITER_EMAIL_LIMIT = int(os.getenv("LOGIN_LIMITER_EMAIL_LIMIT", "5"))
+LOGIN_LIMITER_IP_LIMIT = int(os.getenv("LOGIN_LIMITER_IP_LIMIT", "20"))
+LOGIN_LIMITER_MAX_KEYS = int(os.getenv("LOGIN_LIMITER_MAX_KEYS", "10000"))
+LOGIN_LIMITER_PURGE_SECONDS = int(os.getenv("LOGIN_LIMITER_PURGE_SECONDS", "300"))
+LOGIN_LIMITER_CLIENT_IP = os.getenv("LOGIN_LIMITER_CLIENT_IP", "").strip().lower()  # "" | peer | <header>
+LOGIN_LIMITER_PROXY_HOPS = int(os.getenv("LOGIN_LIMITER_PROXY_HOPS", "1"))
+
+logger = logging.getLogger("uvicorn.error")
+
+# --- Sliding window ---
+
+def _window_start(now: float, window: int) -> int:
+    return int(now) - int(now) % window
+
+def _estimate(window_start: int, count: int, prev_count: int, now: float, window: int) -> float:
+    current = _window_start(now, window)
+    if window_start == current:
+        elapsed = (now - current) / window
+        return prev_count * (1 - elapsed) + count
+    if window_start == current - window:
+        # Nothing counted yet in this window; the old `count` is now `prev`
+        return count * (1 - (now - current) / window)
+    return 0.0
+
+# --- Backends ---
+
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, window: int, max_keys: int = LOGIN_LIMITER_MAX_KEYS):
+        self.window = window
+        self.max_keys = max_keys
+        self.entries: "OrderedDict[str, Tuple[int, int, int]]" = OrderedDict()
+        self.evictions = 0
+        self._lock = threading.Lock()  # login runs in the threadpool
+
+    def get(self, key: str, now: float) -> float:
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry is None:
+            return 0.0
+        return _estimate(*entry, now, self.window)
+
+    def incr(self, key: str, now: float):
+        current = _window_start(now, self.window)
+        with self._lock:
+            window_start, count, prev_count = self.entries.pop(key, (current, 0, 0))
+            if window_start != current:
+                prev_count = count if window_start == current - self.window else 0
+                count = 0
+            self.entries[key] = (current, count + 1, prev_count)
+            while len(self.entries) > self.max_keys:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def reset(self, key: str):
+        with self._lock:
+            self.entries.pop(key, None)
+
+    def size(self) -> Optional[int]:
+        return len(self.entries)
+
+class DatabaseBackend:
+    name = "database"
+
+    def __init__(self, engine, window: int, purge_interval: int = LOGIN_LIMITER_PURGE_SECONDS):
+        self.engine = engine
+        self.window = window
+        self.purge_interval = purge_interval
+        self.evictions = 0
+        self._next_purge = 0.0
+
+    def get(self, key: str, now: float) -> float:
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                _sql.select(LoginAttempt.window_start, LoginAttempt.count, LoginAttempt.prev_count)
+                .where(LoginAttempt.key == key)
+            ).first()
+        if row is None:
+            return 0.0
+        return _estimate(row.window_start, row.count, row.prev_count, now, self.window)
+
+    def incr(self, key: str, now: float):
+        current = _window_start(now, self.window)
+        table = LoginAttempt.__table__
+        # Rolls the window and counts the failure in one statement, so
+        # concurrent workers never lose an increment.
+        stmt = _database.dialect_insert(LoginAttempt, self.engine.dialect.name).values(
+            key=key, window_start=current, count=1, prev_count=0
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={
+                "count": _sql.case(
+                    (table.c.window_start == current, table.c.count + 1), else_=1
+                ),
+                "prev_count": _sql.case(
+                    (table.c.window_start == current, table.c.prev_count),
+                    (table.c.window_start == current - self.window, table.c.count),
+                    else_=0,
+                ),
+                "window_start": current,
+            },
+        )
+        with self.engine.begin() as conn:
+            conn.execute(stmt)
+            if now >= self._next_purge:
+                self._next_purge = now + self.purge_interval
+                result = conn.execute(
+                    _sql.delete(LoginAttempt).where(LoginAttempt.window_start < current - self.window)
+                )
+                self.evictions += result.rowcount or 0
+
+    def reset(self, key: str):
+        with self.engine.begin() as conn:
+            conn.execute(_sql.delete(LoginAttempt).where(LoginAttempt.key == key))
+
+    def size(self) -> Optional[int]:
+        return None  # not worth a COUNT(*) per scrape
+
+def create_backend(window: int = LOGIN_LIMITER_WINDOW_SECONDS):
+    kind = LOGIN_LIMITER_BACKEND
+    if kind is None:
+        kind = "database" if _database.engine.dialect.name == "postgresql" else "memory"
+    if kind == "database":
+        return DatabaseBackend(_database.engine, window)
+    if kind == "memory":
+        return MemoryBackend(window)
+    raise ValueError(f"Unknown LOGIN_LIMITER_BACKEND '{kind}'")
+
+# --- Limiter ---
+
+def client_ip(request: Request) -> Optional[str]:
+    """Client address for per-IP limiting, None when it is off or unknown."""
+    if not LOGIN_LIMITER_CLIENT_IP:
+        return None
+    if LOGIN_LIMITER_CLIENT_IP == "peer":
+        return request.client.host if request.client else None
+    hops = [hop.strip() for hop in request.headers.get(LOGIN_LIMITER_CLIENT_IP, "").split(",") if hop.strip()]
+    if len(hops) < LOGIN_LIMITER_PROXY_HOPS:
+        return None
+    return hops[-LOGIN_LIMITER_PROXY_HOPS]
+
+class LoginLimiter:
+    def __init__(self, backend, email_limit: int = LOGIN_LIMITER_EMAIL_LIMIT, ip_limit: int = LOGIN_LIMITER_IP_LIMIT):
+        self.backend = backend
+        self.fallback = backend if isinstance(backend, MemoryBackend) else MemoryBackend(backend.window)
+        self.email_limit = email_limit
+        self.ip_limit = ip_limit
+        self.counters: Dict[str, int] = {"hits": 0, "misses": 0, "failures": 0, "backend_errors": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def email_key(email: str) -> str:
+        return f"email:{email.strip().lower()}"
+
+    @staticmethod
+    def ip_key(ip: Optional[str]) -> Optional[str]:
+        return f"ip:{ip}" if ip else None
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _call(self, method: str, *args):
+        """Runs on the configured backend, or in memory if it is failing."""
+        if self.backend is not self.fallback:
+            try:
+                return getattr(self.backend, method)(*args)
+            except Exception:
+                self._count("backend_errors")
+                logger.exception(f"Login limiter backend '{self.backend.name}' failed; counting in memory")
+        return getattr(self.fallback, method)(*args)
+
+    def check(self, email: str, ip: Optional[str] = None):
+        """Raises 403 for a locked email and 429 for a throttled client IP."""
+        now = time.time()
+        if self._call("get", self.email_key(email), now) >= self.email_limit:
+            self._count("hits")
+            raise HTTPException(status_code=403, detail="Account locked due to multiple failed attempts")
+        ip_key = self.ip_key(ip)
+        if ip_key and self._call("get", ip_key, now) >= self.ip_limit:
+            self._count("hits")
+            raise HTTPException(status_code=429, detail="Too many login attempts, please try again later")
+        self._count("misses")
+
+    def record_failure(self, email: str, ip: Optional[str] = None):
+        now = time.time()
+        self._count("failures")
+        self._call("incr", self.email_key(email), now)
+        ip_key = self.ip_key(ip)
+        if ip_key:
+            self._call("incr", ip_key, now)
+
+    def record_success(self, email: str):
+        # The IP counter is kept: stuffing spreads failures over many emails
+        self._call("reset", self.email_key(email))
+
+    def metrics(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "backend": self.backend.name,
+            **counters,
+            "evictions": self.backend.evictions + (self.fallback.evictions if self.fallback is not self.backend else 0),
+            "tracked_keys": self.backend.size(),
+            "window_seconds": self.backend.window,
+            "email_limit": self.email_limit,
+            "ip_limit": self.ip_limit,
+        }
+
+login_limiter = LoginLimiter(create_backend())
+_metrics.watch_login_limiter(login_limiter)
@@ -0,0 +1,124 @@
+# app/core/websocket.py
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, Set
+
+from fastapi import WebSocket, WebSocketDisconnect, status
+
+logger = logging.getLogger("uvicorn.error")
+
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "64"))
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "5"))
+WS_CLOSE_TIMEOUT_SECONDS = 1.0
+# Server sends {"type": "ping"} when a client has been quiet for a heartbeat;
+# clients answer "pong". Nothing received for the idle timeout -> closed.
+WS_HEARTBEAT_SECONDS = float(os.getenv("WS_HEARTBEAT_SECONDS", "25"))
+WS_IDLE_TIMEOUT_SECONDS = float(os.getenv("WS_IDLE_TIMEOUT_SECONDS", "60"))
+
+class ClientConnection:
+    """
+    One subscriber: a bounded queue of pre-encoded payloads drained by its
+    own sender task, so a slow socket only ever delays itself.
+    """
+    def __init__(self, websocket: WebSocket, max_queue: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.sender: asyncio.Task = None
+
+    def offer(self, payload: str) -> bool:
+        """Non-blocking enqueue. False means the client is too far behind."""
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+class ConnectionManager:
+    def __init__(
+        self,
+        max_queue: int = WS_SEND_QUEUE_SIZE,
+        send_timeout: float = WS_SEND_TIMEOUT_SECONDS,
+        heartbeat: float = WS_HEARTBEAT_SECONDS,
+        idle_timeout: float = WS_IDLE_TIMEOUT_SECONDS,
+    ):
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.heartbeat = heartbeat
+        self.idle_timeout = idle_timeout
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+        self._closing: Set[asyncio.Task] = set()  # keeps close tasks referenced
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        conn = ClientConnection(websocket, self.max_queue)
+        conn.sender = asyncio.create_task(self._send_loop(conn))
+        self.active_connections[websocket] = conn
+
+    def disconnect(self, websocket: WebSocket):
+        conn = self.active_connections.pop(websocket, None)
+        if conn and conn.sender and conn.sender is not asyncio.current_task():
+            conn.sender.cancel()
+
+    async def serve(self, websocket: WebSocket):
+        """
+        Holds an accepted socket open until the client leaves, goes idle or
+        is evicted. Endpoints must release any DB session before calling this.
+        """
+        loop = asyncio.get_running_loop()
+        last_seen = loop.time()
+        try:
+            while websocket in self.active_connections:
+                try:
+                    await asyncio.wait_for(websocket.receive_text(), self.heartbeat)
+                    last_seen = loop.time()
+                except asyncio.TimeoutError:
+                    if loop.time() - last_seen >= self.idle_timeout:
+                        self._evict(websocket, code=status.WS_1001_GOING_AWAY)
+                        return
+                    self.send(websocket, {"type": "ping"})
+        except (WebSocketDisconnect, RuntimeError):
+            pass # Client went away (or we already closed it)
+        finally:
+            self.disconnect(websocket)
+
+    def send(self, websocket: WebSocket, message: dict):
+        """Queues a message for one subscriber."""
+        conn = self.active_connections.get(websocket)
+        if conn and not conn.offer(json.dumps(message, default=str)):
+            self._evict(websocket)
+
+    async def broadcast(self, message: dict):
+        """
+        Encodes the message once and enqueues it for every subscriber.
+        Never awaits a socket; subscribers whose queue is full are evicted.
+        """
+        payload = json.dumps(message, default=str)
+        for websocket, conn in list(self.active_connections.items()):
+            if not conn.offer(payload):
+                logger.warning("Evicting slow WebSocket consumer (send queue full)")
+                self._evict(websocket)
+
+    async def _send_loop(self, conn: ClientConnection):
+        try:
+            while True:
+                payload = await conn.queue.get()
+                await asyncio.wait_for(conn.websocket.send_text(payload), self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Timed out or socket already gone
+            self._evict(conn.websocket)
+
+    def _evict(self, websocket: WebSocket, code: int = status.WS_1013_TRY_AGAIN_LATER):
+        self.disconnect(websocket)
+        task = asyncio.create_task(self._close(websocket, code))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket, code: int):
+        try:
+            await asyncio.wait_for(websocket.close(code=code), WS_CLOSE_TIMEOUT_SECONDS)
+        except Exception:
+            pass
@@ -0,0 +1,4 @@
+# app/jobs/__init__.py
+# Background jobs: register handlers with @job in app/<module>/jobs.py and
+# enqueue them from services with app.jobs.outbox.enqueue(db, name, **payload).
+from app.jobs.registry import job
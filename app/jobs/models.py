@@ -0,0 +1,26 @@
+# app/jobs/models.py
+import datetime as _dt
+import sqlalchemy as _sql
+import app.core.db.session as _database
+
+class JobOutbox(_database.Base):
+    """
+    A job written in the same transaction as the change that caused it.
+    With the database broker this table is the queue; with RabbitMQ rows
+    only live here until the worker has published them.
+    """
+    __tablename__ = "job_outbox"
+    __table_args__ = (
+        _sql.Index("ix_job_outbox_status_available_at", "status", "available_at"),
+    )
+
+    id = _sql.Column(_sql.Integer, primary_key=True, index=True)
+    name = _sql.Column(_sql.String(100), nullable=False)
+    payload = _sql.Column(_sql.JSON, nullable=False)
+
+    status = _sql.Column(_sql.String(20), nullable=False, default="pending")  # pending | failed
+    attempts = _sql.Column(_sql.Integer, nullable=False, default=0)
+    available_at = _sql.Column(_sql.DateTime, nullable=False, default=_dt.datetime.utcnow)
+    locked_until = _sql.Column(_sql.DateTime, nullable=True)  # claimed by a worker until then
+    last_error = _sql.Column(_sql.Text, nullable=True)
+    created_at = _sql.Column(_sql.DateTime, default=_dt.datetime.utcnow)
@@ -0,0 +1,95 @@
+# app/jobs/outbox.py
+"""
+Transactional job outbox.
+
+Services call enqueue(db, "module.job_name", **payload) before their
+commit: the job row is written in the same transaction as the data it is
+about, so a rolled-back request never leaves a job behind and a committed
+one never loses it, even if the process dies right after responding.
+
+JobWorker, a LeasedOutboxWorker (app/core/db/outbox.py, shared with the
+email outbox), claims due rows in leased batches (`FOR UPDATE SKIP LOCKED`
+on Postgres) and hands them to the broker (app/jobs/brokers.py): the database
+broker runs them in place, RabbitMQ receives them for its consumers. Rows
+are deleted once handled, rescheduled with backoff after a failure, and
+left `failed` after JOB_MAX_ATTEMPTS. A commit that enqueued something
+wakes the worker in this process immediately; otherwise it polls every
+JOB_POLL_SECONDS.
+"""
+import logging
+import os
+from typing import List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.db import outbox as _outbox
+from app.jobs import registry
+from app.jobs.brokers import (
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BASE_SECONDS,
+    JOB_RETRY_MAX_SECONDS,
+    DispatchResult,
+    create_broker,
+)
+from app.jobs.models import JobOutbox
+
+logger = logging.getLogger("uvicorn.error")
+
+JOB_WORKER = os.getenv("JOB_WORKER", "inline")  # inline | off
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", "50"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "5"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+
+# --- Enqueue (request path) ---
+
+def enqueue(db, name: str, **payload) -> JobOutbox:
+    """
+    Adds a job to the caller's transaction (sync Session or AsyncSession);
+    it becomes visible to workers when the caller commits.
+    """
+    record = JobOutbox(name=name, payload=payload)
+    db.add(record)
+    session = db.sync_session if isinstance(db, AsyncSession) else db
+    if not event.contains(session, "after_commit", _wake_worker):
+        event.listen(session, "after_commit", _wake_worker)
+    return record
+
+def _wake_worker(session: Session):
+    job_worker.wake()
+
+# --- Worker ---
+
+class JobWorker(_outbox.LeasedOutboxWorker):
+    model = JobOutbox
+    due_column = "available_at"
+    claim_columns = ("name", "payload")
+    lease_seconds = JOB_LEASE_SECONDS
+    max_attempts = JOB_MAX_ATTEMPTS
+    retry_base_seconds = JOB_RETRY_BASE_SECONDS
+    retry_max_seconds = JOB_RETRY_MAX_SECONDS
+    label = "Job"
+
+    def __init__(self, engine=None, broker=None, batch_size: int = JOB_BATCH_SIZE,
+                 poll_interval: float = JOB_POLL_SECONDS):
+        super().__init__(engine, batch_size, poll_interval)
+        self.broker = broker or create_broker()
+
+    async def start(self):
+        if not self.running:
+            registry.load_handlers()
+            await self.broker.start(registry.run)
+            self._start_loop()
+
+    async def close(self):
+        await self.broker.stop()
+
+    async def deliver(self, rows: list) -> List[DispatchResult]:
+        return await self.broker.dispatch(rows)
+
+    def gives_up(self, attempts: int) -> bool:
+        # Failed publishes (broker down) are retried for as long as it takes
+        return self.broker.runs_jobs and super().gives_up(attempts)
+
+job_worker = JobWorker()
@@ -0,0 +1,49 @@
+# app/jobs/registry.py
+"""
+Job handlers by name.
+
+    @job("announcement.fill_link_preview")
+    async def fill_link_preview(announcement_id: int, url: str): ...
+
+Handlers live in `app/<module>/jobs.py` and get keyword arguments from the
+JSON payload. Async handlers run on the worker's event loop, plain functions
+in a thread. Delivery is at-least-once, so handlers must be idempotent.
+"""
+import asyncio
+import importlib
+import pkgutil
+from typing import Callable, Dict
+
+import app as _app
+
+_handlers: Dict[str, Callable] = {}
+
+class UnknownJob(Exception):
+    pass
+
+def job(name: str):
+    def register(fn: Callable) -> Callable:
+        if name in _handlers and _handlers[name] is not fn:
+            raise ValueError(f"Job '{name}' is already registered")
+        _handlers[name] = fn
+        return fn
+    return register
+
+def load_handlers():
+    """Imports every app/<module>/jobs.py so their @job decorators run."""
+    for module in pkgutil.iter_modules(_app.__path__):
+        if module.ispkg:
+            try:
+                importlib.import_module(f"app.{module.name}.jobs")
+            except ModuleNotFoundError as e:
+                if e.name != f"app.{module.name}.jobs":
+                    raise
+
+async def run(name: str, payload: dict):
+    handler = _handlers.get(name)
+    if handler is None:
+        raise UnknownJob(f"No handler registered for job '{name}'")
+    if asyncio.iscoroutinefunction(handler):
+        await handler(**payload)
+    else:
+        await asyncio.to_thread(handler, **payload)
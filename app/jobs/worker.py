@@ -0,0 +1,41 @@
+# app/jobs/worker.py
+"""
+Standalone job worker.
+
+    JOB_WORKER=off uvicorn main:app ...   # web processes only enqueue
+    python -m app.jobs.worker             # one or more of these run the jobs
+
+With JOB_BROKER=rabbitmq each worker relays the outbox to RabbitMQ and
+consumes the queue; with the database broker they share the outbox table.
+"""
+import asyncio
+import logging
+import signal
+
+from app.core.http import close_http_client
+from app.core.logger import init_logging
+from app.core.pubsub import pubsub
+from app.jobs.outbox import job_worker
+
+logger = logging.getLogger("uvicorn.error")
+
+async def main():
+    init_logging()
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    # Jobs publish feed updates to web workers over pubsub (Postgres NOTIFY)
+    await pubsub.start()
+    await job_worker.start()
+    logger.info(f"Job worker running with the {job_worker.broker.name} broker")
+    try:
+        await stopping.wait()
+    finally:
+        await job_worker.stop()
+        await pubsub.stop()
+        await close_http_client()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,4 @@
+# app/mail/__init__.py
+# Outbound email: persisted outbox (models.py), worker with a pooled SMTP
+# connection (outbox.py), pre-rendered templates (templates.py) and a local
+# SMTP stand-in for development and tests (dev_smtp.py).
@@ -0,0 +1,99 @@
+# app/mail/dev_smtp.py
+"""
+Local SMTP stand-in (aiosmtpd) for development and tests.
+
+    python -m app.mail.dev_smtp --port 1025
+
+then run the app with SMTP_SERVER=localhost SMTP_PORT=1025
+SMTP_STARTTLS=false SENDER_PASSWORD= and every queued email is printed
+here instead of leaving the machine. In tests, `with LocalSMTPServer() as
+smtp:` starts it on a free port and collects messages in `smtp.messages`; set
+`smtp.reply = "451 ..."` (or a 5xx) to make it reject messages instead.
+
+aiosmtpd is a development dependency only (pip install aiosmtpd).
+"""
+import argparse
+import socket
+import threading
+import time
+from email import message_from_bytes
+from email.message import Message
+from typing import List, Optional
+
+from aiosmtpd.controller import Controller
+
+class CollectingHandler:
+    def __init__(self, echo: bool = False):
+        self.echo = echo
+        self.messages: List[Message] = []
+        self.sessions = 0
+        self.reply: Optional[str] = None  # answer to DATA instead of accepting
+        self._lock = threading.Lock()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        with self._lock:
+            self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.reply is not None:
+            return self.reply
+        message = message_from_bytes(envelope.content)
+        with self._lock:
+            self.messages.append(message)
+        if self.echo:
+            print(f"--- {message['Subject']!r} -> {', '.join(envelope.rcpt_tos)}")
+        return "250 Message accepted for delivery"
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class LocalSMTPServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, echo: bool = False):
+        self.host = host
+        self.port = port or _free_port()
+        self.handler = CollectingHandler(echo=echo)
+        self.controller = Controller(self.handler, hostname=self.host, port=self.port)
+
+    @property
+    def messages(self) -> List[Message]:
+        return self.handler.messages
+
+    @property
+    def reply(self) -> Optional[str]:
+        return self.handler.reply
+
+    @reply.setter
+    def reply(self, value: Optional[str]):
+        self.handler.reply = value
+
+    @property
+    def sessions(self) -> int:
+        """EHLOs seen, i.e. SMTP sessions opened by clients."""
+        return self.handler.sessions
+
+    def __enter__(self) -> "LocalSMTPServer":
+        self.controller.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.controller.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Print outgoing emails instead of sending them")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+    with LocalSMTPServer(args.host, args.port, echo=True):
+        print(f"SMTP stand-in listening on {args.host}:{args.port}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+# app/mail/models.py
+import datetime as _dt
+import sqlalchemy as _sql
+import app.core.db.session as _database
+
+class EmailOutbox(_database.Base):
+    """One queued email. Rows are deleted once sent; `failed` rows stay for inspection."""
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # The worker's claim query: pending rows that are due
+        _sql.Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id = _sql.Column(_sql.Integer, primary_key=True, index=True)
+    recipient = _sql.Column(_sql.String(320), nullable=False)
+    subject = _sql.Column(_sql.String(255), nullable=False)
+    html_body = _sql.Column(_sql.Text, nullable=False)
+
+    status = _sql.Column(_sql.String(20), nullable=False, default="pending")  # pending | failed
+    attempts = _sql.Column(_sql.Integer, nullable=False, default=0)
+    next_attempt_at = _sql.Column(_sql.DateTime, nullable=False, default=_dt.datetime.utcnow)
+    locked_until = _sql.Column(_sql.DateTime, nullable=True)  # claimed by a worker until then
+    last_error = _sql.Column(_sql.Text, nullable=True)
+    created_at = _sql.Column(_sql.DateTime, default=_dt.datetime.utcnow)
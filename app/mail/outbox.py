@@ -0,0 +1,208 @@
+# app/mail/outbox.py
+"""
+Email outbox.
+
+Request handlers never talk to SMTP. They add a row to `email_outbox` in
+their own transaction (enqueue_email / queue_otp_email), and EmailWorker
+delivers it (the claim / lease / retry loop is LeasedOutboxWorker in
+app/core/db/outbox.py, shared with the job outbox):
+
+- claims up to EMAIL_BATCH_SIZE due rows at a time with a lease
+  (`FOR UPDATE SKIP LOCKED` on Postgres, so several workers never send the
+  same email, and a crashed worker's rows come back after the lease);
+- sends the batch over one kept-open, authenticated SMTP connection,
+  reconnecting only after errors or EMAIL_SMTP_IDLE_SECONDS of idleness;
+- deletes sent rows, and reschedules failures with exponential backoff up
+  to EMAIL_MAX_ATTEMPTS (5xx rejections fail at once) before marking them
+  `failed`.
+
+The worker runs inside the app lifespan (EMAIL_WORKER=inline, the default)
+or as its own process with EMAIL_WORKER=off on the web workers:
+
+    python -m app.mail.outbox
+"""
+import asyncio
+import logging
+import os
+import smtplib
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.db import outbox as _outbox
+from app.core.logger import init_logging
+from app.mail.models import EmailOutbox
+from app.mail.templates import render_otp_email
+from app.Shared.helpers import SENDER_EMAIL, SENDER_PASSWORD, SMTP_PORT, SMTP_SERVER
+
+logger = logging.getLogger("uvicorn.error")
+
+EMAIL_WORKER = os.getenv("EMAIL_WORKER", "inline")  # inline | off
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+EMAIL_POLL_SECONDS = float(os.getenv("EMAIL_POLL_SECONDS", "10"))
+EMAIL_LEASE_SECONDS = int(os.getenv("EMAIL_LEASE_SECONDS", "120"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "3600"))
+EMAIL_SMTP_IDLE_SECONDS = float(os.getenv("EMAIL_SMTP_IDLE_SECONDS", "60"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "10"))
+
+# (id, error or None, permanent)
+SendResult = _outbox.DeliveryResult
+
+# --- Enqueue (request path) ---
+
+def enqueue_email(db: Session, recipient: str, subject: str, html_body: str) -> EmailOutbox:
+    """Adds the email to the caller's transaction; it goes out after the commit."""
+    record = EmailOutbox(recipient=recipient, subject=subject, html_body=html_body)
+    db.add(record)
+    return record
+
+def queue_otp_email(db: Session, recipient: str, subject: str, message: str, otp: str) -> EmailOutbox:
+    record = enqueue_email(db, recipient, subject, render_otp_email(otp, message))
+    db.commit()
+    email_worker.wake()
+    return record
+
+# --- SMTP ---
+
+class SMTPConnection:
+    """One authenticated SMTP session, reused across sends. Not thread-safe."""
+
+    def __init__(
+        self,
+        host: str = SMTP_SERVER,
+        port: int = SMTP_PORT,
+        username: Optional[str] = SENDER_EMAIL,
+        password: Optional[str] = SENDER_PASSWORD,
+        starttls: bool = SMTP_STARTTLS,
+        idle_timeout: float = EMAIL_SMTP_IDLE_SECONDS,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.idle_timeout = idle_timeout
+        self.server: Optional[smtplib.SMTP] = None
+        self.last_used = 0.0
+        self.connects = 0
+
+    def _open(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT_SECONDS)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+        self.connects += 1
+        self.last_used = time.monotonic()
+
+    def send(self, sender: str, recipient: str, message: str):
+        if self.server is not None and time.monotonic() - self.last_used > self.idle_timeout:
+            # Servers drop idle sessions; reconnecting is cheaper than a failed send
+            self.close()
+        if self.server is None:
+            self._open()
+        try:
+            self.server.sendmail(sender, recipient, message)
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            self._open()
+            self.server.sendmail(sender, recipient, message)
+        finally:
+            self.last_used = time.monotonic()
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                self.server.close()
+            self.server = None
+
+def build_message(recipient: str, subject: str, html_body: str) -> str:
+    message = MIMEMultipart("alternative")
+    message["From"] = SENDER_EMAIL
+    message["To"] = recipient
+    message["Subject"] = subject
+    message.attach(MIMEText(html_body, "html", "utf-8"))
+    return message.as_string()
+
+def _is_permanent(error: Exception) -> bool:
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException) and not isinstance(error, smtplib.SMTPAuthenticationError):
+        return error.smtp_code >= 500
+    return False
+
+# --- Worker ---
+
+class EmailWorker(_outbox.LeasedOutboxWorker):
+    model = EmailOutbox
+    due_column = "next_attempt_at"
+    claim_columns = ("recipient", "subject", "html_body")
+    lease_seconds = EMAIL_LEASE_SECONDS
+    max_attempts = EMAIL_MAX_ATTEMPTS
+    retry_base_seconds = EMAIL_RETRY_BASE_SECONDS
+    retry_max_seconds = EMAIL_RETRY_MAX_SECONDS
+    label = "Email"
+
+    def __init__(self, engine=None, connection: Optional[SMTPConnection] = None,
+                 batch_size: int = EMAIL_BATCH_SIZE, poll_interval: float = EMAIL_POLL_SECONDS):
+        super().__init__(engine, batch_size, poll_interval)
+        self.connection = connection or SMTPConnection()
+
+    def start(self):
+        if not self.running:
+            self._start_loop()
+
+    async def close(self):
+        await asyncio.to_thread(self.connection.close)
+
+    async def deliver(self, rows: list) -> List[SendResult]:
+        return await asyncio.to_thread(self._send_batch, rows)
+
+    def _send_batch(self, rows: list) -> List[SendResult]:
+        """Runs in a thread: smtplib is blocking."""
+        results: List[SendResult] = []
+        for index, row in enumerate(rows):
+            try:
+                self.connection.send(SENDER_EMAIL, row.recipient, build_message(row.recipient, row.subject, row.html_body))
+                results.append((row.id, None, False))
+            except Exception as e:
+                permanent = _is_permanent(e)
+                results.append((row.id, f"{type(e).__name__}: {e}"[:1000], permanent))
+                if not permanent:
+                    # Server unreachable / session broken: the rest would fail the
+                    # same way. They are left out of the results, i.e. not tried.
+                    self.connection.close()
+                    break
+        return results
+
+    async def _settle(self, rows: list, results: List[SendResult]):
+        await super()._settle(rows, results)
+        sent = sum(1 for _, error, _ in results if error is None)
+        if sent < len(rows):
+            logger.warning(f"Sent {sent}/{len(rows)} emails; the rest will be retried")
+
+email_worker = EmailWorker()
+
+async def _main():
+    init_logging()
+    email_worker.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await email_worker.stop()
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,65 @@
+# app/mail/templates.py
+"""
+Email bodies, rendered once at import.
+
+The OTP layout is stripped of indentation and comments and split around its two
+placeholders up front, so rendering an email is a single join of five
+strings instead of re-building the whole f-string block per send.
+"""
+import re
+
+DEFAULT_OTP_MESSAGE = (
+    "Thank you for choosing <strong>GCH App</strong>. "
+    "Use the following OTP to complete your sign-up procedure. "
+    "This OTP is valid for <strong>5 minutes</strong>."
+)
+
+_OTP_LAYOUT = """
+    <div style="font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif; min-width: 1000px; overflow: auto; line-height: 1.6; background-color: #f9f9f9; padding: 40px 0;">
+      <div style="margin: 0 auto; width: 600px; background-color: #ffffff; border-radius: 10px; box-shadow: 0 4px 20px rgba(0,0,0,0.05); overflow: hidden;">
+        
+        <!-- Header -->
+        <div style="background-color: #1a73e8; padding: 20px; text-align: center;">
+          <a href="#" style="font-size: 1.6em; color: #ffffff; text-decoration: none; font-weight: 700;">Link Nest</a>
+        </div>
+        
+        <!-- Body -->
+        <div style="padding: 30px 40px; text-align: center;">
+          
+          <p style="font-size: 1em; color: #555555; margin-bottom: 30px;">
+            {message}
+          </p>
+          
+          <!-- OTP -->
+          <div style="display: inline-block; background-color: #1a73e8; color: #ffffff; font-size: 1.5em; font-weight: 700; padding: 15px 25px; border-radius: 8px; letter-spacing: 3px;">
+            {otp}
+          </div>
+          
+          <p style="font-size: 0.9em; color: #777777; margin-top: 30px;">
+            Regards,<br>
+            <strong>GCH Team</strong>
+          </p>
+        </div>
+        
+      </div>
+    </div>
+    """
+
+def _compile(layout: str, *fields: str) -> list:
+    """Drops comments, indentation and blank lines, then splits around `{field}` in order."""
+    layout = re.sub(r"<!--.*?-->", "", layout, flags=re.DOTALL)
+    # One tag per line: SMTP caps lines at 1000 characters (RFC 5321)
+    layout = re.sub(r">\s+<", ">\n<", layout)
+    layout = re.sub(r"[ \t]*\n\s*", "\n", layout).strip()
+    parts = []
+    for field in fields:
+        head, layout = layout.split("{%s}" % field, 1)
+        parts.append(head.rstrip())
+    parts.append(layout.lstrip())
+    return parts
+
+_OTP_PARTS = _compile(_OTP_LAYOUT, "message", "otp")
+
+def render_otp_email(otp: str, message: str = None) -> str:
+    before_message, before_otp, rest = _OTP_PARTS
+    return "".join((before_message, message or DEFAULT_OTP_MESSAGE, before_otp, otp, rest))
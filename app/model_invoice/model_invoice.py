@@ -4,7 +4,8 @@ from sqlalchemy.orm import Session
 from typing import Optional, List
 from datetime import date
 
-from app.core.db.session import SessionLocal
+import app.core.db.session as _database
+import app.core.db.replicas as _replicas
 import app.user.user as _user_auth
 from app.user.models import User, UserRole
 
@@ -14,10 +15,7 @@ import app.model_invoice.service as _services
 router = APIRouter()
 
 # --- Dependencies ---
-def get_db():
-    db = SessionLocal()
-    try: yield db
-    finally: db.close()
+get_db = _database.get_db
 
 def require_manager_or_admin(current_user: User = Depends(_user_auth.get_current_user)):
     if current_user.role not in [UserRole.admin, UserRole.manager]:
@@ -111,7 +109,7 @@ def get_model_report(
     user_id: int,
     date_from: date,
     date_to: date,
-    db: Session = Depends(get_db),
+    db: Session = Depends(_replicas.get_read_db),
     current_user: User = Depends(_user_auth.get_current_user)
 ):
     """
@@ -7,6 +7,9 @@ from app.user.models import User
 
 class ModelInvoice(_database.Base):
     __tablename__ = "model_invoice"
+    __table_args__ = (
+        _sql.Index("ix_model_invoice_user_id_invoice_date", "user_id", "invoice_date"),
+    )
 
     id = _sql.Column(_sql.Integer, primary_key=True, index=True)
     user_id = _sql.Column(_sql.Integer, _sql.ForeignKey("user.id"), nullable=False)
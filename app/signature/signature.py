@@ -10,10 +10,7 @@ import app.signature.service as _services
 
 router = APIRouter()
 
-def get_db():
-    db = _database.SessionLocal()
-    try: yield db
-    finally: db.close()
+get_db = _database.get_db
 
 # --- Signature CRUD ---
 
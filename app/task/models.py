@@ -31,6 +31,10 @@ class ContentStatus(str, _PyEnum):
 # --- Models ---
 class Task(_database.Base):
     __tablename__ = "task"
+    __table_args__ = (
+        _sql.Index("ix_task_assignee_id_created_at", "assignee_id", "created_at"),
+        _sql.Index("ix_task_created_at_id", "created_at", "id"),
+    )
     id = _sql.Column(_sql.Integer, primary_key=True, index=True)
     assigner_id = _sql.Column(_sql.Integer, _sql.ForeignKey("user.id"), nullable=False)
     assignee_id = _sql.Column(_sql.Integer, _sql.ForeignKey("user.id"), nullable=False)
@@ -61,6 +65,9 @@ class Task(_database.Base):
 
 class TaskChat(_database.Base):
     __tablename__ = "task_chat"
+    __table_args__ = (
+        _sql.Index("ix_task_chat_task_id_id", "task_id", "id"),
+    )
     id = _sql.Column(_sql.Integer, primary_key=True, index=True)
     task_id = _sql.Column(_sql.Integer, _sql.ForeignKey("task.id"), nullable=False)
     user_id = _sql.Column(_sql.Integer, _sql.ForeignKey("user.id"), nullable=False)
@@ -72,6 +79,9 @@ class TaskChat(_database.Base):
 
 class ContentVault(_database.Base):
     __tablename__ = "content_vault"
+    __table_args__ = (
+        _sql.Index("ix_content_vault_uploader_id_created_at", "uploader_id", "created_at"),
+    )
     id = _sql.Column(_sql.Integer, primary_key=True, index=True)
     uploader_id = _sql.Column(_sql.Integer, _sql.ForeignKey("user.id"), nullable=False)
     task_id = _sql.Column(_sql.Integer, _sql.ForeignKey("task.id"), nullable=True)
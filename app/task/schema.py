@@ -121,7 +121,8 @@ class TaskOut(BaseModel):
 
 # --- Pagination Response ---
 class PaginatedTaskResponse(BaseModel):
-    total: int
+    total: Optional[int] = None  # None when count="none"
     skip: int
     limit: int
-    tasks: List[TaskOut]
\ No newline at end of file
+    tasks: List[TaskOut]
+    next_cursor: Optional[str] = None
\ No newline at end of file
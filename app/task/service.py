@@ -1,29 +1,42 @@
 # app/task/service.py
+import base64
 import datetime
-from sqlalchemy import desc, or_
-from sqlalchemy.orm import Session, joinedload, aliased
+import json
+import logging
+from sqlalchemy import desc, or_, select, func, text, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload, noload, aliased
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi import HTTPException, status
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 import app.task.models as _models
 import app.user.models as _user_models
 import app.task.schema as _schemas
 
-def get_task_or_404(db: Session, task_id: int):
-    task = db.query(_models.Task).options(
-        joinedload(_models.Task.assigner),
-        joinedload(_models.Task.assignee),
-        joinedload(_models.Task.attachments)
-    ).filter(_models.Task.id == task_id).first()
+logger = logging.getLogger("uvicorn.error")
+
+async def get_task_or_404(db: AsyncSession, task_id: int):
+    # populate_existing: also used to reload a task after commit, when its
+    # server-side columns are expired and relationships are not loaded yet
+    result = await db.execute(
+        select(_models.Task).options(
+            joinedload(_models.Task.assigner),
+            joinedload(_models.Task.assignee),
+            selectinload(_models.Task.attachments)
+        ).filter(_models.Task.id == task_id)
+        .execution_options(populate_existing=True)
+    )
+    task = result.scalars().first()
     
     if not task:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
     return task
 
-def get_my_assignees(db: Session, current_user: _user_models.User):
+async def get_my_assignees(db: AsyncSession, current_user: _user_models.User):
     try:
-        query = db.query(_user_models.User).filter(
+        query = select(_user_models.User).filter(
             _user_models.User.role == _user_models.UserRole.digital_creator,
             _user_models.User.is_deleted == False
         )
@@ -34,18 +47,20 @@ def get_my_assignees(db: Session, current_user: _user_models.User):
                 query = query.filter(_user_models.User.id == current_user.assigned_model_id)
             else:
                 return []
-        return query.all()
+        result = await db.execute(query)
+        return result.scalars().all()
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"DB Error: {str(e)}")
 
 # --- 1. Create Task ---
-def create_task(db: Session, task_in: _schemas.TaskCreate, current_user: _user_models.User):
+async def create_task(db: AsyncSession, task_in: _schemas.TaskCreate, current_user: _user_models.User):
     try:
-        assignee = db.query(_user_models.User).filter(
+        result = await db.execute(select(_user_models.User).filter(
             _user_models.User.id == task_in.assignee_id,
             _user_models.User.role == _user_models.UserRole.digital_creator,
             _user_models.User.is_deleted == False
-        ).first()
+        ))
+        assignee = result.scalars().first()
         
         if not assignee:
             raise HTTPException(status_code=400, detail="Invalid or Deleted Assignee.")
@@ -75,7 +90,7 @@ def create_task(db: Session, task_in: _schemas.TaskCreate, current_user: _user_m
         new_task.req_content_type = task_in.req_content_type.value
 
         db.add(new_task)
-        db.flush()
+        await db.flush()
 
         for file_data in attachments_data:
             vault_item = _models.ContentVault(
@@ -92,17 +107,16 @@ def create_task(db: Session, task_in: _schemas.TaskCreate, current_user: _user_m
             )
             db.add(vault_item)
 
-        db.commit()
-        db.refresh(new_task)
-        return new_task
+        await db.commit()
+        return await get_task_or_404(db, new_task.id)
 
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"DB Error: {str(e)}")
 
 # --- 2. Update Task ---
-def update_task(db: Session, task_id: int, updates: _schemas.TaskUpdate, current_user: _user_models.User):
-    task = get_task_or_404(db, task_id)
+async def update_task(db: AsyncSession, task_id: int, updates: _schemas.TaskUpdate, current_user: _user_models.User):
+    task = await get_task_or_404(db, task_id)
 
     if current_user.role == _user_models.UserRole.digital_creator:
         allowed_fields = ['status']
@@ -122,16 +136,15 @@ def update_task(db: Session, task_id: int, updates: _schemas.TaskUpdate, current
                 value = value.value
             setattr(task, key, value)
             
-        db.commit()
-        db.refresh(task)
-        return task
+        await db.commit()
+        return await get_task_or_404(db, task.id)
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Update failed: {str(e)}")
 
 # --- 3. Delete Task ---
-def delete_task(db: Session, task_id: int, current_user: _user_models.User):
-    task = get_task_or_404(db, task_id)
+async def delete_task(db: AsyncSession, task_id: int, current_user: _user_models.User):
+    task = await get_task_or_404(db, task_id)
     can_delete = False
     if current_user.role == _user_models.UserRole.admin:
         can_delete = True
@@ -142,16 +155,16 @@ def delete_task(db: Session, task_id: int, current_user: _user_models.User):
         raise HTTPException(status_code=403, detail="You can only delete tasks you created.")
 
     try:
-        db.delete(task)
-        db.commit()
+        await db.delete(task)
+        await db.commit()
         return {"message": "Task deleted successfully"}
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Delete failed: {str(e)}")
 
 # --- 4. Submit Task ---
-def submit_task_work(db: Session, task_id: int, submission: _schemas.TaskSubmission, current_user: _user_models.User):
-    task = get_task_or_404(db, task_id)
+async def submit_task_work(db: AsyncSession, task_id: int, submission: _schemas.TaskSubmission, current_user: _user_models.User):
+    task = await get_task_or_404(db, task_id)
 
     if task.assignee_id != current_user.id:
         raise HTTPException(status_code=403, detail="Only the assigned creator can submit work.")
@@ -183,31 +196,73 @@ def submit_task_work(db: Session, task_id: int, submission: _schemas.TaskSubmiss
             is_system_log=True
         )
         db.add(sys_msg)
-        db.commit()
-        db.refresh(task)
-        return task
+        await db.commit()
+        return await get_task_or_404(db, task.id)
 
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Submission failed: {str(e)}")
 
 # --- 5. Get All Tasks ---
-def get_all_tasks(
-    db: Session, 
+def encode_task_cursor(task: _models.Task) -> str:
+    """Opaque keyset cursor for the (created_at, id) position of a task."""
+    raw = f"{task.created_at.isoformat()}|{task.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_task_cursor(cursor: str):
+    try:
+        created_at, task_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.datetime.fromisoformat(created_at), int(task_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def count_tasks(db: AsyncSession, query, mode: str = "exact") -> Optional[int]:
+    """
+    mode 'exact' runs COUNT(*), 'estimated' reads the planner's row estimate
+    (Postgres only, falls back to exact elsewhere), 'none' skips counting.
+    """
+    if mode == "none":
+        return None
+    if mode == "estimated" and db.bind.dialect.name == "postgresql":
+        compiled = query.compile(dialect=postgresql.dialect(paramstyle="named"))
+        plan = await db.scalar(text(f"EXPLAIN (FORMAT JSON) {compiled}"), compiled.params)
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    return await db.scalar(select(func.count()).select_from(query.subquery()))
+
+async def count_by_task(db: AsyncSession, column, task_ids: List[int]) -> Dict[int, int]:
+    """
+    Grouped COUNT(*) of child rows (chat, attachments) per task, restricted
+    to the given page of task ids. Returns {task_id: count}.
+    """
+    if not task_ids:
+        return {}
+    result = await db.execute(
+        select(column, func.count()).filter(column.in_(task_ids)).group_by(column)
+    )
+    return dict(result.all())
+
+async def get_all_tasks(
+    db: AsyncSession, 
     current_user: _user_models.User, 
     skip: int = 1,
     limit: int = 10,
     search: Optional[str] = None,
     status: Optional[str] = None,
-    assignee_id: Optional[int] = None
+    assignee_id: Optional[int] = None,
+    include_attachments: bool = False,
+    cursor: Optional[str] = None,
+    count: str = "exact"
 ):
+    """
+    Two paging modes, both ordered by (created_at, id) DESC:
+    - offset: `skip` is the 1-based page number.
+    - keyset: pass the `next_cursor` of the previous page as `cursor`;
+      cost per page is constant however deep the page is.
+    """
     try:
-        query = db.query(_models.Task).options(
-            joinedload(_models.Task.assigner),
-            joinedload(_models.Task.assignee),
-            joinedload(_models.Task.chat_messages),
-            joinedload(_models.Task.attachments)
-        )
+        query = select(_models.Task)
 
         if current_user.role == _user_models.UserRole.digital_creator:
             query = query.filter(_models.Task.assignee_id == current_user.id)
@@ -221,7 +276,7 @@ def get_all_tasks(
             if current_user.assigned_model_id:
                 query = query.filter(_models.Task.assignee_id == current_user.assigned_model_id)
             else:
-                return {"total": 0, "skip": skip, "limit": limit, "tasks": []}
+                return {"total": 0, "skip": skip, "limit": limit, "tasks": [], "next_cursor": None}
 
         # [SAFE] Compare strings. 
         # Since 'status' in DB is string "To Do", and input 'status' is string "To Do", this works.
@@ -241,40 +296,67 @@ def get_all_tasks(
                 )
             )
 
-        total_records = query.count()
-        offset = (skip - 1) * limit
+        total_records = await count_tasks(db, query, count)
+
+        if cursor:
+            cursor_created_at, cursor_id = decode_task_cursor(cursor)
+            query = query.filter(
+                tuple_(_models.Task.created_at, _models.Task.id) < tuple_(cursor_created_at, cursor_id)
+            )
+            offset = 0
+        else:
+            offset = (skip - 1) * limit
         
-        tasks = query.order_by(desc(_models.Task.created_at))\
-                    .offset(offset)\
-                    .limit(limit)\
-                    .all()
+        # Chat rows are never loaded here; attachments only when asked for
+        attachments_loader = selectinload if include_attachments else noload
+        result = await db.execute(
+            query.options(
+                joinedload(_models.Task.assigner),
+                joinedload(_models.Task.assignee),
+                attachments_loader(_models.Task.attachments)
+            ).order_by(desc(_models.Task.created_at), desc(_models.Task.id))
+            .offset(offset)
+            .limit(limit + 1)  # one extra row tells us whether a next page exists
+        )
+        tasks = result.scalars().all()
+        has_more = len(tasks) > limit
+        tasks = tasks[:limit]
+
+        task_ids = [task.id for task in tasks]
+        chat_counts = await count_by_task(db, _models.TaskChat.task_id, task_ids)
+        if not include_attachments:
+            attachment_counts = await count_by_task(db, _models.ContentVault.task_id, task_ids)
 
         for task in tasks:
-            task.chat_count = len(task.chat_messages)
-            task.attachments_count = len(task.attachments)
+            task.chat_count = chat_counts.get(task.id, 0)
+            if include_attachments:
+                task.attachments_count = len(task.attachments)
+            else:
+                task.attachments_count = attachment_counts.get(task.id, 0)
             task.is_created_by_me = (task.assigner_id == current_user.id)
 
         return {
             "total": total_records,
             "skip": skip,
             "limit": limit,
-            "tasks": tasks
+            "tasks": tasks,
+            "next_cursor": encode_task_cursor(tasks[-1]) if has_more else None
         }
     except SQLAlchemyError as e:
-        print(f"Database error in get_all_tasks: {str(e)}")
+        logger.exception("Database error in get_all_tasks")
         raise HTTPException(status_code=500, detail=f"DB Error: {str(e)}")
 
 # --- 6. Chat & Content ---
 # app/task/service.py
 
-def get_chat_history(db: Session, task_id: int, direction: int = 0, last_message_id: int = 0, limit: int = 10):
+async def get_chat_history(db: AsyncSession, task_id: int, direction: int = 0, last_message_id: int = 0, limit: int = 10):
     """
     Fetches chat messages with pagination.
     direction 1: Load Older (Scroll Up) -> IDs < last_message_id
     direction 2: Load Newer (Refresh/Scroll Down) -> IDs > last_message_id
     Default: Load Latest (Initial Load)
     """
-    query = db.query(_models.TaskChat)\
+    query = select(_models.TaskChat)\
         .options(joinedload(_models.TaskChat.author))\
         .filter(_models.TaskChat.task_id == task_id)
 
@@ -292,7 +374,8 @@ def get_chat_history(db: Session, task_id: int, direction: int = 0, last_message
         # Default: Fetch latest messages (newest first)
         query = query.order_by(_models.TaskChat.id.desc())
 
-    messages = query.limit(limit).all()
+    result = await db.execute(query.limit(limit))
+    messages = list(result.scalars().all())
 
     # If we fetched using DESC order (Older or Default), reverse list to return in Chronological ASC order
     if direction != 2:
@@ -300,34 +383,41 @@ def get_chat_history(db: Session, task_id: int, direction: int = 0, last_message
 
     return messages
 
-def send_chat_message(db: Session, task_id: int, message: str, current_user: _user_models.User):
-    task = get_task_or_404(db, task_id)
-    
-    can_chat = False
+def can_chat(task: _models.Task, current_user: _user_models.User) -> bool:
+    """Chat RBAC, shared by the REST endpoint and the chat WebSocket."""
     if current_user.role == _user_models.UserRole.admin:
-        can_chat = True
+        return True
     elif task.assigner_id == current_user.id or task.assignee_id == current_user.id:
-        can_chat = True
+        return True
     elif task.assignee.manager_id == current_user.id:
-        can_chat = True
+        return True
     elif current_user.role == _user_models.UserRole.team_member and task.assignee.id == current_user.assigned_model_id:
-        can_chat = True
+        return True
+    return False
+
+async def send_chat_message(db: AsyncSession, task_id: int, message: str, current_user: _user_models.User):
+    task = await get_task_or_404(db, task_id)
 
-    if not can_chat:
+    if not can_chat(task, current_user):
         raise HTTPException(status_code=403, detail="You do not have permission to chat in this task.")
 
     try:
         chat_msg = _models.TaskChat(task_id=task_id, user_id=current_user.id, message=message)
         db.add(chat_msg)
-        db.commit()
-        db.refresh(chat_msg)
+        await db.commit()
+        await db.refresh(chat_msg, attribute_names=["created_at", "author"])
         return chat_msg
     except Exception:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to send message.")
 
-def delete_content_item(db: Session, content_id: int, current_user: _user_models.User):
-    item = db.query(_models.ContentVault).filter(_models.ContentVault.id == content_id).first()
+async def delete_content_item(db: AsyncSession, content_id: int, current_user: _user_models.User):
+    result = await db.execute(
+        select(_models.ContentVault)
+        .options(joinedload(_models.ContentVault.task))
+        .filter(_models.ContentVault.id == content_id)
+    )
+    item = result.scalars().first()
     if not item:
         raise HTTPException(status_code=404, detail="File not found")
     if item.uploader_id != current_user.id:
@@ -335,9 +425,9 @@ def delete_content_item(db: Session, content_id: int, current_user: _user_models
     if item.task and item.task.status == _models.TaskStatus.completed.value:
          raise HTTPException(status_code=400, detail="Cannot edit submission for a completed task.")
     try:
-        db.delete(item)
-        db.commit()
+        await db.delete(item)
+        await db.commit()
         return {"message": "File removed"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Delete failed: {str(e)}")
\ No newline at end of file
@@ -1,139 +1,248 @@
 # app/task/task.py
-from fastapi import APIRouter, Depends, HTTPException, status,Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status,Query, WebSocket
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
 
 import app.core.db.session as _database
+import app.core.db.replicas as _replicas
 import app.user.user as _user_auth
 import app.user.models as _user_models
 import app.task.schema as _schemas
 import app.task.service as _services
-
+from app.Shared.auth_context import get_auth_context
+from app.core.websocket import ConnectionManager
+from app.core.pubsub import pubsub
+from app.core import metrics as _metrics
+
+# --- WebSocket Chat Rooms ---
+class ChatRoomManager:
+    """One ConnectionManager per task chat, keyed by task id."""
+    def __init__(self):
+        self.rooms: Dict[int, ConnectionManager] = {}
+        self._joining: Dict[int, int] = {}  # task id -> sockets still being accepted
+
+    async def connect(self, task_id: int, websocket: WebSocket):
+        room = self.rooms.setdefault(task_id, ConnectionManager())
+        # The room must outlive the accept below even if its last member
+        # leaves meanwhile, or this socket would join an orphaned room
+        self._joining[task_id] = self._joining.get(task_id, 0) + 1
+        try:
+            await room.connect(websocket)
+        finally:
+            self._joining[task_id] -= 1
+            if not self._joining[task_id]:
+                del self._joining[task_id]
+            self._drop_if_empty(task_id)
+
+    async def serve(self, task_id: int, websocket: WebSocket):
+        room = self.rooms.get(task_id)
+        if room is None:
+            return
+        try:
+            await room.serve(websocket)
+        finally:
+            self.disconnect(task_id, websocket)
+
+    def disconnect(self, task_id: int, websocket: WebSocket):
+        room = self.rooms.get(task_id)
+        if room is None:
+            return
+        room.disconnect(websocket)
+        self._drop_if_empty(task_id)
+
+    def _drop_if_empty(self, task_id: int):
+        room = self.rooms.get(task_id)
+        if room is not None and not room.active_connections and task_id not in self._joining:
+            self.rooms.pop(task_id, None)
+
+    async def broadcast(self, task_id: int, message: dict):
+        room = self.rooms.get(task_id)
+        if room:
+            await room.broadcast(message)
+
+    def connection_count(self) -> int:
+        return sum(len(room.active_connections) for room in list(self.rooms.values()))
+
+chat_manager = ChatRoomManager()
+_metrics.watch_websockets("task_chat", chat_manager.connection_count)
+
+# Chat events go through the shared pub/sub backend, like the announcement
+# feed, so sockets held by every worker receive them, not only the sender's.
+TASK_CHAT_CHANNEL = "task_chat"
+
+async def _on_chat_event(message: dict):
+    await chat_manager.broadcast(message["task_id"], message["event"])
+
+pubsub.subscribe(TASK_CHAT_CHANNEL, _on_chat_event)
+
+ws_router = APIRouter()
 router = APIRouter()
 
-def get_db():
-    db = _database.SessionLocal()
-    try: yield db
-    finally: db.close()
+# Same callable as get_current_user's dependency, so both share one AsyncSession
+# (list_tasks reads from a replica and uses get_current_reader to the same end)
+get_db = _database.get_async_db
+
+# --- WebSocket: Live Task Chat ---
+@ws_router.websocket("/{task_id}/chat/ws")
+async def chat_websocket(websocket: WebSocket, task_id: int):
+    """
+    Pushes messages posted via POST /{task_id}/chat to everyone allowed to
+    chat in the task (same RBAC as sending). Authenticated from the cookie,
+    like the announcement feed socket.
+    """
+    allowed = False
+    user_id = get_auth_context(websocket).user_id
+
+    if user_id:
+        try:
+            # Short-lived session: released before the socket starts listening
+            async with _database.AsyncSessionLocal() as db:
+                user = await _user_auth.get_user_record(db, user_id)
+                task = await _services.get_task_or_404(db, task_id)
+                allowed = user is not None and _services.can_chat(task, user)
+        except Exception:
+            pass # Unknown task
+
+    if not allowed:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await chat_manager.connect(task_id, websocket)
+    await chat_manager.serve(task_id, websocket)
 
 # --- Utility: Get Assignees ---
 @router.get("/assignees", response_model=List[_schemas.UserMinimal], tags=["TASK API"])
-def get_available_creators(
+async def get_available_creators(
     current_user: _user_models.User = Depends(_user_auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Returns valid models for the logged-in user (Manager or Team Member)
     based on the strict hierarchy rules.
     """
-    return _services.get_my_assignees(db, current_user)
+    return await _services.get_my_assignees(db, current_user)
 
 # --- Task CRUD ---
 
 @router.get("/", response_model=_schemas.PaginatedTaskResponse, tags=["TASK API"])
-def list_tasks(
+async def list_tasks(
     skip: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
     search: Optional[str] = None,
     status: Optional[str] = None,
     assignee_id: Optional[int] = Query(None, description="Filter by assignee ID"),
-    current_user: _user_models.User = Depends(_user_auth.get_current_user),
-    db: Session = Depends(get_db)
+    include_attachments: bool = Query(False, description="Embed attachment rows in each task"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (keyset mode)"),
+    count: str = Query("exact", enum=["exact", "estimated", "none"], description="How to compute total"),
+    # Authenticates through the same read session, so the request holds one connection
+    current_user: _user_models.User = Depends(_user_auth.get_current_reader),
+    db: AsyncSession = Depends(_replicas.get_async_read_db)
 ):
     """
     Get all tasks with Pagination, Search, and Filtering.
+    Deep pages should follow `next_cursor` instead of increasing `skip`.
     """
-    return _services.get_all_tasks(
+    return await _services.get_all_tasks(
         db=db, 
         current_user=current_user,
         skip=skip, 
         limit=limit, 
         search=search, 
         status=status,
-        assignee_id=assignee_id
+        assignee_id=assignee_id,
+        include_attachments=include_attachments,
+        cursor=cursor,
+        count=count
     )
 
 @router.post("/", response_model=_schemas.TaskOut, status_code=status.HTTP_201_CREATED, tags=["TASK API"])
-def create_task(
+async def create_task(
     task_in: _schemas.TaskCreate,
     current_user: _user_models.User = Depends(_user_auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Admin/Manager/Team Member creates task."""
     if current_user.role == _user_models.UserRole.digital_creator:
         raise HTTPException(status_code=403, detail="Creators cannot assign tasks.")
-    return _services.create_task(db, task_in, current_user)
+    return await _services.create_task(db, task_in, current_user)
 
 @router.get("/{task_id}", response_model=_schemas.TaskOut, tags=["TASK API"])
-def get_task(
+async def get_task(
     task_id: int,
     current_user: _user_models.User = Depends(_user_auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    return _services.get_task_or_404(db, task_id)
+    return await _services.get_task_or_404(db, task_id)
 
 @router.put("/{task_id}", response_model=_schemas.TaskOut, tags=["TASK API"])
-def update_task(
+async def update_task(
     task_id: int,
     updates: _schemas.TaskUpdate,
     current_user: _user_models.User = Depends(_user_auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    return _services.update_task(db, task_id, updates, current_user)
+    return await _services.update_task(db, task_id, updates, current_user)
 
 @router.delete("/{task_id}", status_code=status.HTTP_200_OK, tags=["TASK API"])
-def delete_task(
+async def delete_task(
     task_id: int,
     current_user: _user_models.User = Depends(_user_auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete task. Allowed for Admin or the original Assigner."""
-    return _services.delete_task(db, task_id, current_user)
+    return await _services.delete_task(db, task_id, current_user)
 
 # --- WORK SUBMISSION (For Creators) ---
 
 @router.post("/{task_id}/submit", response_model=_schemas.TaskOut, tags=["TASK API"])
-def submit_work(
+async def submit_work(
     task_id: int,
     submission: _schemas.TaskSubmission,
     current_user: _user_models.User = Depends(_user_auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Creator uploads proof of work (Deliverables).
     - Saves files to ContentVault.
     - Updates Status to 'In Review'.
     """
-    return _services.submit_task_work(db, task_id, submission, current_user)
+    return await _services.submit_task_work(db, task_id, submission, current_user)
 
 # --- Chat ---
 
 @router.get("/{task_id}/chat", response_model=List[_schemas.ChatMsgOut], tags=["TASK API"])
-def get_chat(
+async def get_chat(
     task_id: int,
     direction: Optional[int] = Query(0, description="1=Older, 2=Newer"),
     last_message_id: Optional[int] = Query(0, description="Reference Message ID"),
     current_user: _user_models.User = Depends(_user_auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    return _services.get_chat_history(db, task_id, direction, last_message_id)
+    return await _services.get_chat_history(db, task_id, direction, last_message_id)
 
 @router.post("/{task_id}/chat", response_model=_schemas.ChatMsgOut, tags=["TASK API"])
-def send_chat(
+async def send_chat(
     task_id: int,
     chat_in: _schemas.ChatMsgCreate,
     current_user: _user_models.User = Depends(_user_auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    return _services.send_chat_message(db, task_id, chat_in.message, current_user)
+    chat_msg = await _services.send_chat_message(db, task_id, chat_in.message, current_user)
+
+    # Push to everyone watching this task's chat, on every worker
+    msg_data = jsonable_encoder(_schemas.ChatMsgOut.model_validate(chat_msg, from_attributes=True))
+    await pubsub.publish(TASK_CHAT_CHANNEL, {"task_id": task_id, "event": {"type": "chat_message", "data": msg_data}})
+
+    return chat_msg
 
 # app/task/task.py (Add this endpoint)
 
 @router.delete("/content/{content_id}", status_code=status.HTTP_200_OK, tags=["TASK API"])
-def remove_attachment(
+async def remove_attachment(
     content_id: int,
     current_user: _user_models.User = Depends(_user_auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a specific file attachment (Used for editing submissions)."""
-    return _services.delete_content_item(db, content_id, current_user)
\ No newline at end of file
+    return await _services.delete_content_item(db, content_id, current_user)
\ No newline at end of file
@@ -1,5 +1,6 @@
 # app/upload/service.py
 import boto3
+import logging
 import os
 import uuid
 from botocore.config import Config
@@ -13,6 +14,8 @@ SECRET_KEY = os.getenv("R2_SECRET_ACCESS_KEY")
 BUCKET_NAME = os.getenv("R2_BUCKET_NAME")
 PUBLIC_DOMAIN = os.getenv("R2_PUBLIC_DOMAIN")
 
+logger = logging.getLogger("uvicorn.error")
+
 # --- Initialize R2 Client (S3 Compatible) ---
 # We use signature_version='s3v4' which is required for Presigned URLs
 s3_client = boto3.client(
@@ -52,10 +55,10 @@ async def upload_file_stream(file: UploadFile, folder: str) -> str:
         return f"{PUBLIC_DOMAIN}/{object_name}" if PUBLIC_DOMAIN else object_name
 
     except ClientError as e:
-        print(f"R2 Client Error: {e}")
+        logger.error(f"R2 Client Error: {e}")
         raise HTTPException(status_code=500, detail="Storage service error")
     except Exception as e:
-        print(f"Upload Error: {e}")
+        logger.exception("Upload Error")
         raise HTTPException(status_code=500, detail="Failed to upload file")
 
 # --- 2. Presigned URL (For Large Files) ---
@@ -85,5 +88,5 @@ def generate_presigned_url(filename: str, content_type: str, folder: str) -> dic
         }
 
     except ClientError as e:
-        print(f"R2 Presign Error: {e}")
+        logger.error(f"R2 Presign Error: {e}")
         raise HTTPException(status_code=500, detail="Could not generate upload ticket")
\ No newline at end of file
@@ -0,0 +1,73 @@
+# app/user/cache.py
+"""
+TTL + LRU cache of the slim user record (schema.CurrentUser) that
+get_current_user hands to every authenticated endpoint for RBAC.
+
+Writes in app/user/service.py call invalidate_users() after committing.
+The ids are dropped locally and published on USER_CHANNEL, so every other
+worker drops them too. The TTL bounds staleness if a notification is lost.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.user.models as _models
+import app.user.schema as _schemas
+from app.core.pubsub import pubsub
+
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "4096"))
+USER_CHANNEL = "user_invalidate"
+
+class UserCache:
+    def __init__(self, ttl: float = USER_CACHE_TTL_SECONDS, max_size: int = USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries: "OrderedDict[int, Tuple[_schemas.CurrentUser, float]]" = OrderedDict()
+
+    def get(self, user_id: int) -> Optional[_schemas.CurrentUser]:
+        entry = self.entries.get(user_id)
+        if entry is None:
+            return None
+        user, expires = entry
+        if expires <= time.monotonic():
+            del self.entries[user_id]
+            return None
+        self.entries.move_to_end(user_id)
+        return user
+
+    def put(self, db_user: _models.User) -> _schemas.CurrentUser:
+        user = _schemas.CurrentUser.model_validate(db_user)
+        self.entries[user.id] = (user, time.monotonic() + self.ttl)
+        self.entries.move_to_end(user.id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return user
+
+    def discard(self, user_ids: Iterable[int]):
+        for user_id in user_ids:
+            self.entries.pop(user_id, None)
+
+user_cache = UserCache()
+
+def changed_user_ids(db: AsyncSession) -> Set[int]:
+    """Ids of users modified in this session; call before commit."""
+    return {
+        obj.id for obj in list(db.dirty) + list(db.deleted)
+        if isinstance(obj, _models.User) and obj.id is not None
+    }
+
+async def invalidate_users(user_ids: Iterable[int]):
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    user_cache.discard(user_ids)
+    await pubsub.publish(USER_CHANNEL, {"user_ids": user_ids})
+
+async def _on_invalidate(message: dict):
+    user_cache.discard(message.get("user_ids", []))
+
+pubsub.subscribe(USER_CHANNEL, _on_invalidate)
@@ -5,9 +5,7 @@ import sqlalchemy as _sql
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import app.core.db.session as _database
-from passlib.context import CryptContext
-
-pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
+import app.core.passwords as _passwords
 
 class UserRole(str, _PyEnum):
     admin = "admin"
@@ -27,6 +25,11 @@ class Gender(str, _PyEnum):
 
 class User(_database.Base):
     __tablename__ = "user"
+    __table_args__ = (
+        # Partial: every hot query filters out soft-deleted users
+        _sql.Index("ix_user_manager_id_active", "manager_id", postgresql_where=_sql.text("is_deleted = false")),
+        _sql.Index("ix_user_role_active", "role", postgresql_where=_sql.text("is_deleted = false")),
+    )
 
     id = _sql.Column(_sql.Integer, primary_key=True, index=True, autoincrement=True)
     username = _sql.Column(_sql.String(50), unique=True, nullable=True, index=True)
@@ -90,17 +93,11 @@ class User(_database.Base):
         ]
 
     def set_password(self, password: str) -> None:
-        try:
-            safe_pass = password[:72]
-            self.password_hash = pwd_ctx.hash(safe_pass)
-        except Exception as e:
-            raise e
+        # Sync callers only; async code uses _passwords.hash_password_async
+        self.password_hash = _passwords.hash_password(password)
 
     def verify_password(self, plain_password: str) -> bool:
-        try:
-            return pwd_ctx.verify(plain_password[:72], self.password_hash)
-        except Exception:
-            return False
+        return _passwords.verify_password(plain_password, self.password_hash)
 
 # ... (Keep Country, Source, OTP, RefreshToken classes exactly as they were to avoid migration issues)
 class Country(_database.Base):
@@ -129,6 +126,17 @@ class RefreshToken(_database.Base):
     __tablename__ = "auth_refresh_tokens"
     id = _sql.Column(_sql.Integer, primary_key=True, index=True)
     user_id = _sql.Column(_sql.Integer, nullable=False)
-    token = _sql.Column(_sql.Text, nullable=False)
+    # SHA-256 hex of the JWT (helpers.hash_token); the token itself is never stored
+    token_hash = _sql.Column(_sql.String(64), nullable=False, unique=True, index=True)
     created_at = _sql.Column(_sql.DateTime, default=_dt.datetime.utcnow)
-    revoked = _sql.Column(_sql.Boolean, default=False)
\ No newline at end of file
+    # Revoking also sets this to now, so the purge job only needs this index
+    expires_at = _sql.Column(_sql.DateTime, nullable=False, index=True)
+    revoked = _sql.Column(_sql.Boolean, default=False)
+
+# Sliding-window counters for the shared login limiter (app/core/rate_limit.py)
+class LoginAttempt(_database.Base):
+    __tablename__ = "auth_login_attempts"
+    key = _sql.Column(_sql.String(320), primary_key=True)  # "email:..." / "ip:..."
+    window_start = _sql.Column(_sql.BigInteger, nullable=False)  # epoch seconds
+    count = _sql.Column(_sql.Integer, nullable=False, default=0)
+    prev_count = _sql.Column(_sql.Integer, nullable=False, default=0)
@@ -3,6 +3,7 @@ from typing import Optional, List
 from pydantic import BaseModel, EmailStr, validator
 from datetime import datetime, date
 from enum import Enum
+from app.user.models import UserRole, AccountStatus
 
 class UserRoleEnum(str, Enum):
     admin = "admin"
@@ -117,4 +118,16 @@ class ChangePassword(BaseModel):
     def passwords_match(cls, v, values):
         if 'new_password' in values and v != values['new_password']:
             raise ValueError('Passwords do not match')
-        return v
\ No newline at end of file
+        return v
+# Slim, read-only record returned by get_current_user (cached, see user/cache.py)
+class CurrentUser(BaseModel):
+    id: int
+    role: UserRole
+    manager_id: Optional[int] = None
+    assigned_model_id: Optional[int] = None
+    is_deleted: bool = False
+    account_status: Optional[AccountStatus] = None
+
+    class Config:
+        from_attributes = True
+        frozen = True
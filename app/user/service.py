@@ -1,47 +1,83 @@
 # app/user/service.py
+import logging
 from typing import Optional, List
 from datetime import datetime
 from fastapi import HTTPException, status
-import sqlalchemy.orm as _orm
-from sqlalchemy import or_
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 import app.user.models as _models
 import app.user.schema as _schemas
 import app.core.db.session as _database
+import app.user.cache as _cache
+import app.core.passwords as _passwords
+
+logger = logging.getLogger("uvicorn.error")
 
 # --- DB Dependency ---
-def get_db():
-    db = _database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Shared with get_current_user so a request reuses one AsyncSession
+get_db = _database.get_async_db
 
 # --- Helpers ---
-def check_email_exists(db: _orm.Session, email: str) -> bool:
-    return db.query(_models.User).filter(
+def user_out_options():
+    """
+    Relationships rendered by UserOut. An AsyncSession cannot lazy-load,
+    so anything returned as UserOut must be loaded with these options.
+    """
+    return (
+        selectinload(_models.User.manager),
+        selectinload(_models.User.assigned_model_rel),
+        selectinload(_models.User.managed_staff),
+    )
+
+def user_list_options():
+    """
+    Batched loading for user lists: one SELECT per relationship for the whole
+    page (constant query count), projected down to the UserInList columns.
+    managed_staff is narrowed to the rows models_under_manager keeps.
+    """
+    User = _models.User
+    nested_cols = (User.id, User.full_name, User.profile_picture_url, User.role)
+    return (
+        selectinload(User.manager).load_only(*nested_cols),
+        selectinload(User.assigned_model_rel).load_only(*nested_cols),
+        selectinload(User.managed_staff.and_(
+            User.role == _models.UserRole.digital_creator,
+            User.is_deleted == False
+        )).load_only(*nested_cols, User.is_deleted),
+    )
+
+async def check_email_exists(db: AsyncSession, email: str) -> bool:
+    result = await db.execute(select(_models.User.id).filter(
         _models.User.email == email, 
         _models.User.is_deleted == False
-    ).first() is not None
+    ))
+    return result.first() is not None
 
-def check_username_available(db: _orm.Session, username: str) -> bool:
-    return db.query(_models.User).filter(
+async def check_username_available(db: AsyncSession, username: str) -> bool:
+    result = await db.execute(select(_models.User.id).filter(
         _models.User.username == username, 
         _models.User.is_deleted == False
-    ).first() is None
+    ))
+    return result.first() is None
 
-def get_user_by_id(db: _orm.Session, user_id: int) -> Optional[_models.User]:
-    return db.query(_models.User).filter(
+async def get_user_by_id(db: AsyncSession, user_id: int, with_relations: bool = False) -> Optional[_models.User]:
+    query = select(_models.User).filter(
         _models.User.id == user_id, 
         _models.User.is_deleted == False
-    ).first()
+    )
+    if with_relations:
+        query = query.options(*user_out_options()).execution_options(populate_existing=True)
+    result = await db.execute(query)
+    return result.scalars().first()
 
-def get_available_users(db: _orm.Session, role: str, manager_id: Optional[int] = None) -> List[_models.User]:
+async def get_available_users(db: AsyncSession, role: str, manager_id: Optional[int] = None) -> List[_models.User]:
     """
     Returns users of a specific role who are not assigned to anyone yet.
     """
-    query = db.query(_models.User).filter(
+    query = select(_models.User).filter(
         _models.User.role == role,
         _models.User.assigned_model_id == None,
         _models.User.is_deleted == False
@@ -50,22 +86,23 @@ def get_available_users(db: _orm.Session, role: str, manager_id: Optional[int] =
     if manager_id:
         query = query.filter(_models.User.manager_id == manager_id)
         
-    return query.all()
+    result = await db.execute(query)
+    return result.scalars().all()
 
 # --- CRUD Operations ---
 
-def create_user(db: _orm.Session, user_in: _schemas.UserCreate, creator: _models.User) -> _models.User:
-    if check_email_exists(db, user_in.email):
+async def create_user(db: AsyncSession, user_in: _schemas.UserCreate, creator: _models.User) -> _models.User:
+    if await check_email_exists(db, user_in.email):
         raise HTTPException(status_code=400, detail="Email already exists")
     
-    if not check_username_available(db, user_in.username):
+    if not await check_username_available(db, user_in.username):
         raise HTTPException(status_code=400, detail="Username already taken")
 
     try:
         # Exclude rels fields for now
         user_data = user_in.dict(exclude={"password", "manager_id", "assigned_model_id", "assign_model_ids"})
         db_user = _models.User(**user_data, created_at=datetime.utcnow(), is_onboarded=True)
-        db_user.set_password(user_in.password)
+        db_user.password_hash = await _passwords.hash_password_async(user_in.password)
 
         # Set Manager ID
         if creator.role == _models.UserRole.manager:
@@ -74,25 +111,25 @@ def create_user(db: _orm.Session, user_in: _schemas.UserCreate, creator: _models
             db_user.manager_id = user_in.manager_id
 
         db.add(db_user)
-        db.flush() # IMPORTANT: Generate ID before setting relationships
+        await db.flush() # IMPORTANT: Generate ID before setting relationships
 
         # 1. Bulk Assignment (Admin assigns Models -> Manager)
         if user_in.assign_model_ids and db_user.role == _models.UserRole.manager:
             if creator.role != _models.UserRole.admin:
                  raise HTTPException(status_code=403, detail="Only Admins can bulk assign models to managers.")
             
-            models_to_assign = db.query(_models.User).filter(
+            models_to_assign = (await db.execute(select(_models.User).filter(
                 _models.User.id.in_(user_in.assign_model_ids),
                 _models.User.role == _models.UserRole.digital_creator,
                 _models.User.is_deleted == False
-            ).all()
+            ))).scalars().all()
 
             for model in models_to_assign:
                 model.manager_id = db_user.id
 
         # 2. 1:1 Assignment (Manager assigns Staff -> Model)
         if user_in.assigned_model_id and user_in.role in [_models.UserRole.team_member, _models.UserRole.digital_creator]:
-            target = get_user_by_id(db, user_in.assigned_model_id)
+            target = await get_user_by_id(db, user_in.assigned_model_id)
             if target:
                 if creator.role == _models.UserRole.manager:
                     # Security: Manager must own the target
@@ -105,20 +142,21 @@ def create_user(db: _orm.Session, user_in: _schemas.UserCreate, creator: _models
                 db_user.assigned_model_id = target.id
                 target.assigned_model_id = db_user.id
 
-        db.commit()
-        db.refresh(db_user)
-        return db_user
+        changed = _cache.changed_user_ids(db) | {db_user.id}
+        await db.commit()
+        await _cache.invalidate_users(changed)
+        return await get_user_by_id(db, db_user.id, with_relations=True)
 
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="User creation failed due to database constraint.")
     except Exception as e:
-        db.rollback()
-        print(f"Error in create_user: {e}")
+        await db.rollback()
+        logger.exception("Error in create_user")
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
-def update_user(db: _orm.Session, user_id: int, user_in: _schemas.UserUpdate, current_user: _models.User) -> _models.User:
-    user = get_user_by_id(db, user_id)
+async def update_user(db: AsyncSession, user_id: int, user_in: _schemas.UserUpdate, current_user: _models.User) -> _models.User:
+    user = await get_user_by_id(db, user_id)
     if not user: 
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -136,7 +174,9 @@ def update_user(db: _orm.Session, user_id: int, user_in: _schemas.UserUpdate, cu
             if "assign_model_ids" in update_data:
                 model_ids = update_data.pop("assign_model_ids")
                 if user.role == _models.UserRole.manager and model_ids is not None:
-                    models = db.query(_models.User).filter(_models.User.id.in_(model_ids)).all()
+                    models = (await db.execute(
+                        select(_models.User).filter(_models.User.id.in_(model_ids))
+                    )).scalars().all()
                     for m in models:
                         m.manager_id = user.id
 
@@ -146,12 +186,12 @@ def update_user(db: _orm.Session, user_id: int, user_in: _schemas.UserUpdate, cu
                 
                 # Unlink current partner if exists
                 if user.assigned_model_id:
-                    old_target = get_user_by_id(db, user.assigned_model_id)
+                    old_target = await get_user_by_id(db, user.assigned_model_id)
                     if old_target: old_target.assigned_model_id = None
                 
                 # Link new partner
                 if new_target_id:
-                    new_target = get_user_by_id(db, new_target_id)
+                    new_target = await get_user_by_id(db, new_target_id)
                     if new_target:
                         if current_user.role == _models.UserRole.manager:
                             is_target_model = new_target.role == _models.UserRole.digital_creator
@@ -160,7 +200,7 @@ def update_user(db: _orm.Session, user_id: int, user_in: _schemas.UserUpdate, cu
 
                         # If new target has a partner, unlink them to avoid conflicts
                         if new_target.assigned_model_id:
-                            prev_owner = get_user_by_id(db, new_target.assigned_model_id)
+                            prev_owner = await get_user_by_id(db, new_target.assigned_model_id)
                             if prev_owner: prev_owner.assigned_model_id = None
                         
                         user.assigned_model_id = new_target.id
@@ -177,7 +217,7 @@ def update_user(db: _orm.Session, user_id: int, user_in: _schemas.UserUpdate, cu
 
         # PROFILE UPDATES
         if "password" in update_data:
-            user.set_password(update_data.pop("password"))
+            user.password_hash = await _passwords.hash_password_async(update_data.pop("password"))
         
         # Only Admins can change roles
         if "role" in update_data:
@@ -188,20 +228,22 @@ def update_user(db: _orm.Session, user_id: int, user_in: _schemas.UserUpdate, cu
             if hasattr(user, key):
                 setattr(user, key, value)
 
-        db.commit()
-        db.refresh(user)
-        return user
+        # The user plus anyone re-linked above (partners, managed models)
+        changed = _cache.changed_user_ids(db) | {user.id}
+        await db.commit()
+        await _cache.invalidate_users(changed)
+        return await get_user_by_id(db, user.id, with_relations=True)
 
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Update failed. Username or Email may already exist.")
     except Exception as e:
-        db.rollback()
-        print(f"Update Error: {e}")
+        await db.rollback()
+        logger.exception("Update Error")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
-def soft_delete_user(db: _orm.Session, user_id: int) -> bool:
-    user = get_user_by_id(db, user_id)
+async def soft_delete_user(db: AsyncSession, user_id: int) -> bool:
+    user = await get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -212,7 +254,7 @@ def soft_delete_user(db: _orm.Session, user_id: int) -> bool:
             user.username = f"{user.username}_del_{timestamp}"
         
         if user.assigned_model_id:
-            partner = get_user_by_id(db, user.assigned_model_id)
+            partner = await get_user_by_id(db, user.assigned_model_id)
             if partner:
                 partner.assigned_model_id = None
             user.assigned_model_id = None
@@ -221,14 +263,16 @@ def soft_delete_user(db: _orm.Session, user_id: int) -> bool:
         user.account_status = _models.AccountStatus.deleted
         
         db.add(user)
-        db.commit()
+        changed = _cache.changed_user_ids(db) | {user.id}
+        await db.commit()
+        await _cache.invalidate_users(changed)
         return True
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete user: {str(e)}")
 
-def get_all_users(db: _orm.Session, current_user: _models.User, role=None, search=None, skip=0, limit=100):
-    query = db.query(_models.User).filter(_models.User.is_deleted == False)
+async def get_all_users(db: AsyncSession, current_user: _models.User, role=None, search=None, skip=0, limit=100):
+    query = select(_models.User).options(*user_list_options()).filter(_models.User.is_deleted == False)
     
     if current_user.role == _models.UserRole.manager:
         query = query.filter(_models.User.manager_id == current_user.id)
@@ -240,23 +284,24 @@ def get_all_users(db: _orm.Session, current_user: _models.User, role=None, searc
         s = f"%{search}%"
         query = query.filter(or_(_models.User.full_name.ilike(s), _models.User.email.ilike(s)))
     
-    result = query.offset(skip).limit(limit).all()
-    return result
+    result = await db.execute(query.offset(skip).limit(limit))
+    return result.scalars().all()
 
-def change_user_password(db: _orm.Session, user_id: int, password_data: _schemas.ChangePassword):
-    user = get_user_by_id(db, user_id)
+async def change_user_password(db: AsyncSession, user_id: int, password_data: _schemas.ChangePassword):
+    user = await get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if not user.verify_password(password_data.old_password):
+    if not await _passwords.verify_password_async(password_data.old_password, user.password_hash):
         raise HTTPException(status_code=400, detail="Incorrect old password")
 
     try:
-        user.set_password(password_data.new_password)
+        user.password_hash = await _passwords.hash_password_async(password_data.new_password)
         user.updated_at = datetime.utcnow()
         db.add(user)
-        db.commit()
+        await db.commit()
+        await _cache.invalidate_users([user.id])
         return {"message": "Password updated successfully"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to update password")
\ No newline at end of file
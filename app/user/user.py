@@ -1,35 +1,59 @@
 # app/user/user.py
+import logging
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 import app.user.schema as _schemas
 import app.user.service as _services
 import app.user.models as _models
+import app.core.db.replicas as _replicas
+from app.Shared.auth_context import get_auth_context
+from app.user.cache import user_cache
 
+logger = logging.getLogger("uvicorn.error")
 router = APIRouter()
 
 # --- Dependency Injection ---
-def get_db():
-    return _services.get_db()
+get_db = _services.get_db
+
+async def get_user_record(db: AsyncSession, user_id: int) -> Optional[_schemas.CurrentUser]:
+    """Cached slim record; None if the user does not exist or is deleted."""
+    user = user_cache.get(user_id)
+    if user is None:
+        db_user = await _services.get_user_by_id(db, user_id=user_id)
+        if not db_user:
+            return None
+        user = user_cache.put(db_user)
+    return user
 
-async def get_current_user(request: Request, db: Session = Depends(_services.get_db)) -> _models.User:
-    if not hasattr(request.state, "user") or not request.state.user:
+async def get_current_user(request: Request, db: AsyncSession = Depends(_services.get_db)) -> _schemas.CurrentUser:
+    """
+    Slim user record for RBAC (id, role, manager_id, assigned_model_id, ...),
+    served from the in-process cache; the DB is only hit on a miss.
+    """
+    return await _authenticate(request, db)
+
+async def get_current_reader(request: Request, db: AsyncSession = Depends(_replicas.get_async_read_db)) -> _schemas.CurrentUser:
+    """
+    get_current_user for endpoints that read through get_async_read_db: a
+    cache miss is looked up in that same session instead of opening a second
+    one on the primary. A replica can lag a little, which the cache's TTL
+    already allows for.
+    """
+    return await _authenticate(request, db)
+
+async def _authenticate(request: Request, db: AsyncSession) -> _schemas.CurrentUser:
+    auth = get_auth_context(request)
+    if not auth.claims:
         raise HTTPException(status_code=401, detail="Authentication credentials missing")
     
-    payload = request.state.user
-    sub = payload.get("sub")
-    
-    user_id = None
-    if isinstance(sub, dict):
-        user_id = sub.get("user_id")
-    elif isinstance(sub, (str, int)):
-        user_id = sub
-        
+    user_id = auth.user_id
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
-    user = _services.get_user_by_id(db, user_id=int(user_id))
+    user = await get_user_record(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -42,20 +66,23 @@ async def get_admin_or_manager(current_user: _models.User = Depends(get_current_
 # --- Utility Endpoints ---
 
 @router.get("/available/managers", response_model=List[_schemas.UserInList], tags=["Utility"])
-def list_managers(db: Session = Depends(_services.get_db), current_user = Depends(get_admin_or_manager)):
-    return db.query(_models.User).filter(_models.User.role == "manager", _models.User.is_deleted == False).all()
+async def list_managers(db: AsyncSession = Depends(_services.get_db), current_user = Depends(get_admin_or_manager)):
+    result = await db.execute(
+        select(_models.User).filter(_models.User.role == "manager", _models.User.is_deleted == False)
+    )
+    return result.scalars().all()
 
 @router.get("/available/team-members", response_model=List[_schemas.UserInList], tags=["Utility"])
-def list_free_team_members(db: Session = Depends(_services.get_db), current_user: _models.User = Depends(get_admin_or_manager)):
+async def list_free_team_members(db: AsyncSession = Depends(_services.get_db), current_user: _models.User = Depends(get_admin_or_manager)):
     # If Manager, scope to their ID. If Admin, mgr_id is None (returns all).
     mgr_id = current_user.id if current_user.role == _models.UserRole.manager else None
-    return _services.get_available_users(db, role="team_member", manager_id=mgr_id)
+    return await _services.get_available_users(db, role="team_member", manager_id=mgr_id)
 
 @router.get("/available/models", response_model=List[_schemas.UserInList], tags=["Utility"])
-def list_free_models(db: Session = Depends(_services.get_db), current_user: _models.User = Depends(get_admin_or_manager)):
+async def list_free_models(db: AsyncSession = Depends(_services.get_db), current_user: _models.User = Depends(get_admin_or_manager)):
     # If Manager, scope to their ID.
     mgr_id = current_user.id if current_user.role == _models.UserRole.manager else None
-    return _services.get_available_users(db, role="digital_creator", manager_id=mgr_id)
+    return await _services.get_available_users(db, role="digital_creator", manager_id=mgr_id)
 
 # --- CRUD Endpoints ---
 
@@ -63,19 +90,19 @@ def list_free_models(db: Session = Depends(_services.get_db), current_user: _mod
 async def create_user(
     user_in: _schemas.UserCreate,
     current_user: _models.User = Depends(get_admin_or_manager),
-    db: Session = Depends(_services.get_db)
+    db: AsyncSession = Depends(_services.get_db)
 ):
     if current_user.role == _models.UserRole.manager and user_in.role == _schemas.UserRoleEnum.admin:
         raise HTTPException(status_code=403, detail="Managers cannot create Admins")
         
-    return _services.create_user(db, user_in, creator=current_user)
+    return await _services.create_user(db, user_in, creator=current_user)
 
 @router.put("/{user_id}", response_model=_schemas.UserOut, tags=["User CRUD API"])
 async def update_user(
     user_id: int,
     user_in: _schemas.UserUpdate,
     current_user: _models.User = Depends(get_current_user),
-    db: Session = Depends(_services.get_db)
+    db: AsyncSession = Depends(_services.get_db)
 ):
     is_admin_or_manager = current_user.role in [_models.UserRole.admin, _models.UserRole.manager]
     
@@ -83,18 +110,18 @@ async def update_user(
         raise HTTPException(status_code=403, detail="Cannot update other users")
 
     # Security: Passed to service layer which handles field filtering (role, assignments)
-    return _services.update_user(db, user_id, user_in, current_user)
+    return await _services.update_user(db, user_id, user_in, current_user)
 
 @router.delete("/{user_id}", tags=["User CRUD API"])
 async def delete_user(
     user_id: int,
     current_user: _models.User = Depends(get_admin_or_manager),
-    db: Session = Depends(_services.get_db)
+    db: AsyncSession = Depends(_services.get_db)
 ):
     if current_user.id == user_id:
         raise HTTPException(status_code=400, detail="Cannot delete your own account")
         
-    _services.soft_delete_user(db, user_id)
+    await _services.soft_delete_user(db, user_id)
     return {"message": "User deleted successfully"}
 
 @router.get("/", response_model=List[_schemas.UserOut], tags=["User CRUD API"])
@@ -104,7 +131,7 @@ async def get_all_users(
     role: Optional[str] = None, 
     search: Optional[str] = None,
     current_user: _models.User = Depends(get_admin_or_manager),
-    db: Session = Depends(_services.get_db)
+    db: AsyncSession = Depends(_services.get_db)
     ):
     try:
         if role:
@@ -115,7 +142,7 @@ async def get_all_users(
             search = search.strip("'\" ")
             if search.lower() == "null" or search == "": search = None
         
-        return _services.get_all_users(
+        return await _services.get_all_users(
             db=db, 
             current_user=current_user,
             skip=skip, 
@@ -124,16 +151,16 @@ async def get_all_users(
             search=search
         )
     except Exception as e:
-        print(f"Error processing query params: {e}")
+        logger.info(f"Error processing query params: {e}")
         raise HTTPException(status_code=400, detail="Invalid query parameters")
 
 @router.get("/{user_id}", response_model=_schemas.UserOut, tags=["User CRUD API"])
 async def get_user_by_id(
     user_id: int,
     current_user: _models.User = Depends(get_current_user),
-    db: Session = Depends(_services.get_db)
+    db: AsyncSession = Depends(_services.get_db)
 ):
-    user = _services.get_user_by_id(db, user_id)
+    user = await _services.get_user_by_id(db, user_id, with_relations=True)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -142,6 +169,6 @@ async def get_user_by_id(
 async def change_password(
     password_data: _schemas.ChangePassword,
     current_user: _models.User = Depends(get_current_user),
-    db: Session = Depends(_services.get_db)
+    db: AsyncSession = Depends(_services.get_db)
 ):
-    return _services.change_user_password(db, current_user.id, password_data)
\ No newline at end of file
+    return await _services.change_user_password(db, current_user.id, password_data)
\ No newline at end of file
@@ -1,5 +1,7 @@
 # main.py
+import logging
 import os
+from contextlib import asynccontextmanager
 from typing import Annotated
 from fastapi import (
     Depends,
@@ -9,7 +11,7 @@ from fastapi import (
     Request,
     status
 )
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles 
 from fastapi.security import (
     HTTPAuthorizationCredentials,
@@ -17,14 +19,27 @@ from fastapi.security import (
 )
 from starlette.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-import jwt
 
 # --- Import Custom Exception ---
 from app.Shared.dependencies import HTML_LoginRequired
+from app.Shared.auth_context import get_auth_context
+from app.core.pubsub import pubsub
+from app.announcement.view_buffer import view_buffer
+from app.core.http import close_http_client
+from app.core.passwords import shutdown_executor
+from app.Shared.token_purge import token_purger
+from app.mail.outbox import EMAIL_WORKER, email_worker
+from app.jobs.outbox import JOB_WORKER, job_worker
+from app.core.logger import init_logging
+from app.core.db.query_stats import QueryStatsMiddleware
+from app.core.db.session import warm_up_pools
+from app.core.db.replicas import ReadYourWritesMiddleware, replica_router
+from app.core import metrics as _metrics
 
 load_dotenv(".env")
+init_logging()
+logger = logging.getLogger("uvicorn.error")
 
-JWT_SECRET = os.getenv("JWT_SECRET", "secret")
 JWT_EXPIRY = os.getenv("JWT_EXPIRY", "")
 ROOT_PATH = os.getenv("ROOT_PATH", "") 
 
@@ -32,6 +47,7 @@ ROOT_PATH = os.getenv("ROOT_PATH", "")
 from app.core.main_router import router as main_router
 from app.user import user_router
 from app.task import task_router
+from app.task.task import ws_router as task_ws_router
 from app.signature import signature_router
 from app.upload import upload_router
 from app.content_vault import content_vault_router
@@ -52,45 +68,62 @@ async def authorization(
     request: Request,
     credentials: Annotated[HTTPAuthorizationCredentials, Depends(bearer_scheme)] = None,
 ):
-    token = None
-    
-    # Priority 1: Check Authorization Header (For Mobile App / Postman)
-    if credentials:
-        token = credentials.credentials
-    
-    # Priority 2: Check Cookie (For Web Dashboard)
-    if not token:
-        token = request.cookies.get("access_token")
+    # Header first (Mobile App / Postman), then Cookie (Web Dashboard).
+    # Decoded once per request; user.py and the views reuse the result.
+    auth = get_auth_context(request)
 
     # If no token is found, we continue. 
     # (Public pages load fine; Protected pages fail later via dependencies)
-    if not token:
+    if not auth.token or auth.claims:
         return
 
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        # Inject user data for user.py
-        request.state.user = payload 
-
-    except jwt.ExpiredSignatureError:
-        print("Token has expired.")
+    if auth.error == "expired":
+        logger.debug("Token has expired.")
         # Only strict API calls need immediate 401
-        if credentials:
+        if auth.from_header:
              raise HTTPException(status_code=401, detail="Token Expired")
-    except jwt.InvalidTokenError:
-        print("Token is invalid.")
-        if credentials:
+    elif auth.error == "invalid":
+        logger.debug("Token is invalid.")
+        if auth.from_header:
              raise HTTPException(status_code=401, detail="Invalid Token")
-    except Exception as e:
-        print(f"Token validation error: {e}")
-        if credentials:
+    else:
+        logger.debug("Token validation error")
+        if auth.from_header:
              raise HTTPException(status_code=401, detail="Authentication Error")
 
 root_router = APIRouter(dependencies=[Depends(authorization)])
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open DB connections before traffic arrives (DB_POOL_WARMUP per engine)
+    await warm_up_pools()
+    # Replica lag / health checks (only when DATABASE_REPLICA_URLS is set)
+    replica_router.start()
+    # Cross-worker WebSocket fan-out (LISTEN connection on Postgres)
+    await pubsub.start()
+    # Hourly cleanup of expired/revoked refresh tokens
+    token_purger.start()
+    # Email outbox delivery, unless a separate `python -m app.mail.outbox` runs it
+    if EMAIL_WORKER == "inline":
+        email_worker.start()
+    # Background jobs, unless separate `python -m app.jobs.worker` processes run them
+    if JOB_WORKER == "inline":
+        await job_worker.start()
+    yield
+    await job_worker.stop()
+    await email_worker.stop()
+    await token_purger.stop()
+    await pubsub.stop()
+    # Write out announcement views still waiting in memory
+    await view_buffer.stop()
+    await replica_router.stop()
+    await close_http_client()
+    shutdown_executor()
+
 app = FastAPI(
     title="GCH App APIs", 
-    root_path=ROOT_PATH
+    root_path=ROOT_PATH,
+    lifespan=lifespan
 )
 
 # --- NEW: Exception Handler for Web Redirects ---
@@ -106,6 +139,20 @@ app.add_middleware(
     allow_headers=["*"],
     allow_credentials=True,
 )
+# Server-Timing header + per-request query count/DB time, N+1 warnings
+app.add_middleware(QueryStatsMiddleware)
+# Request count / latency / in-flight per route template, served on /metrics
+app.add_middleware(_metrics.PrometheusMiddleware)
+# Primary-only reads for a few seconds after a user's own writes
+app.add_middleware(ReadYourWritesMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    # async on purpose: the threadpool gauges are read from the event loop
+    if _metrics.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {_metrics.METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    body, content_type = _metrics.render()
+    return Response(content=body, media_type=content_type)
 
 # --- STATIC FILES ---
 base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -114,7 +161,7 @@ static_dir = os.path.join(base_dir, "static")
 if os.path.isdir(static_dir):
     app.mount("/static", StaticFiles(directory=static_dir), name="static")
 else:
-    print(f"WARNING: static folder not found at {static_dir}")
+    logger.warning(f"Static folder not found at {static_dir}")
 
 # --- ROUTERS ---
 app.include_router(auth_views.auth_view)    
@@ -123,6 +170,7 @@ app.include_router(task_views.task_views)
 app.include_router(signature_views.signature_views)
 app.include_router(announcement_views.announcement_views)
 app.include_router(announcement_ws_router, prefix="/api/announcement")
+app.include_router(task_ws_router, prefix="/api/tasks")
 
 app.include_router(main_router)         
 root_router.include_router(user_router) 
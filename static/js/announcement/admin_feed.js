@@ -79,6 +79,12 @@ createApp({
             this.socket.onmessage = (event) => {
                 const msg = JSON.parse(event.data);
                 
+                // Heartbeat: server closes sockets that stay silent
+                if (msg.type === 'ping') {
+                    this.socket.send('pong');
+                    return;
+                }
+
                 if (msg.type === 'new_post') {
                     // Prevent duplicate if we just posted it ourselves via REST
                     if (!this.posts.find(p => p.id === msg.data.id)) {
@@ -89,6 +95,11 @@ createApp({
                 else if (msg.type === 'delete_post') {
                     this.posts = this.posts.filter(p => p.id !== msg.id);
                 }
+                else if (msg.type === 'link_preview') {
+                    // Preview is fetched in the background after posting
+                    const post = this.posts.find(p => p.id === msg.id);
+                    if (post) Object.assign(post, msg.data);
+                }
             };
 
             this.socket.onclose = () => {
@@ -311,14 +322,30 @@ createApp({
         openModal(type, url) { this.modal = { isOpen: true, type, url }; },
         closeModal() { this.modal.isOpen = false; setTimeout(() => { this.modal.url = ''; }, 200); },
         async toggleReaction(post) {
-            const has = this.hasLiked(post);
-            if(has) post.reactions = post.reactions.filter(r => r.user_id !== this.currentUserId);
-            else post.reactions.push({ user_id: this.currentUserId, emoji: '❤️' });
-            try { await axios.post(`/api/announcement/${post.id}/react`, { emoji: '❤️' }); } catch(e){}
+            const emoji = '❤️';
+            // Optimistic update of the aggregated counts (server toggles the same way)
+            const adjust = (e, delta) => {
+                const rc = post.reaction_counts.find(r => r.emoji === e);
+                if (rc) {
+                    rc.count += delta;
+                    if (rc.count <= 0) post.reaction_counts.splice(post.reaction_counts.indexOf(rc), 1);
+                } else if (delta > 0) {
+                    post.reaction_counts.push({ emoji: e, count: delta });
+                }
+            };
+            if (post.my_reaction) adjust(post.my_reaction, -1);
+            if (post.my_reaction === emoji) {
+                post.my_reaction = null;
+            } else {
+                adjust(emoji, 1);
+                post.my_reaction = emoji;
+            }
+            try { await axios.post(`/api/announcement/${post.id}/react`, { emoji }); } catch(e){}
         },
         async markViewed(id) { try { await axios.post(`/api/announcement/${id}/view`); } catch(e){} },
         isMe(id) { return this.currentUserId === id; },
-        hasLiked(post) { return post.reactions.some(r => r.user_id === this.currentUserId); },
+        hasLiked(post) { return !!post.my_reaction; },
+        reactionTotal(post) { return post.reaction_counts.reduce((n, r) => n + r.count, 0); },
         scrollToBottom() { const el = this.$refs.chatBody; if(el) el.scrollTop = el.scrollHeight; },
         formatTime(t) { return new Date(t).toLocaleTimeString([], {hour: '2-digit', minute:'2-digit'}); }
     }
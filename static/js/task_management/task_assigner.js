@@ -17,6 +17,7 @@ let currentReviewTask = null;
 let chatTopId = 0;    
 let chatBottomId = 0; 
 let isLoadingChat = false;
+let chatSocket = null;  // Live updates for the open chat
 
 // Pagination & Filters State
 let currentPage = 1;
@@ -57,6 +58,7 @@ $(document).ready(function() {
 
     // 5. Chat Submit
     $("#chatForm").on("submit", sendMessage);
+    $("#chatModal").on("hidden.bs.modal", closeChatSocket);
     
     // 6. Review Modal Chat Button
     $("#btnReviewChat").on("click", function() {
@@ -589,6 +591,38 @@ function openChatModal(id, title) {
     $("#chatModal").modal("show");
     enableChatInput();
     loadChat(0); // Initial Load
+    openChatSocket(id);
+}
+
+// --- Live Chat (WebSocket) ---
+function openChatSocket(taskId) {
+    closeChatSocket();
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    chatSocket = new WebSocket(`${protocol}//${window.location.host}/api/tasks/${taskId}/chat/ws`);
+
+    chatSocket.onmessage = (event) => {
+        const msg = JSON.parse(event.data);
+        // Heartbeat: server closes sockets that stay silent
+        if (msg.type === 'ping') {
+            chatSocket.send('pong');
+            return;
+        }
+        if (msg.type !== 'chat_message' || taskId !== activeChatTaskId) return;
+        // Already rendered (e.g. our own message, appended from the POST response)
+        if (msg.data.id <= chatBottomId) return;
+
+        $("#noMsgInfo").remove();
+        renderMessages([msg.data], 2);
+        chatBottomId = msg.data.id;
+    };
+}
+
+function closeChatSocket() {
+    if (chatSocket) {
+        chatSocket.onmessage = null;
+        chatSocket.close();
+        chatSocket = null;
+    }
 }
 
 function loadChat(direction) {
@@ -678,8 +712,10 @@ function sendMessage(e) {
     axios.post(`/api/tasks/${activeChatTaskId}/chat`, { message: txt })
         .then((res) => { 
             input.val(""); 
-            renderMessages([res.data], 2);
-            chatBottomId = res.data.id;
+            if (res.data.id > chatBottomId) {
+                renderMessages([res.data], 2);
+                chatBottomId = res.data.id;
+            }
         })
         .catch(err => { toastr.error("Failed to send"); console.error(err); })
         .finally(() => { isChatSending = false; enableChatInput(); setTimeout(() => input.focus(), 100); });
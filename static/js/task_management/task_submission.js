@@ -15,6 +15,7 @@ let isChatSending = false;
 // --- Chat Pagination State ---
 let chatTopId = 0;    // ID of the oldest message currently in DOM
 let chatBottomId = 0; // ID of the newest message currently in DOM
+let chatSocket = null;  // Live updates for the open chat
 let isLoadingChat = false;
 
 // Pagination & Filter State
@@ -71,6 +72,7 @@ $(document).ready(function() {
     // Chat Triggers
     $("#btnOpenChat").click(() => openChatModal(currentTask.id, currentTask.title));
     $("#chatForm").submit(sendMessage);
+    $("#chatModal").on("hidden.bs.modal", closeChatSocket);
 });
 
 // ==========================================
@@ -83,7 +85,8 @@ function loadMyTasks() {
     
     const params = {
         skip: currentPage,
-        Limit: pageSize
+        Limit: pageSize,
+        include_attachments: true // Task modal reads attachments from the list
     };
     if (activeFilters.status) params.status = activeFilters.status;
     if (activeFilters.search) params.search = activeFilters.search;
@@ -448,6 +451,38 @@ function openChatModal(id, title) {
 
     $("#chatModal").modal("show");
     loadChat(0); // Initial Load
+    openChatSocket(id);
+}
+
+// --- Live Chat (WebSocket) ---
+function openChatSocket(taskId) {
+    closeChatSocket();
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    chatSocket = new WebSocket(`${protocol}//${window.location.host}/api/tasks/${taskId}/chat/ws`);
+
+    chatSocket.onmessage = (event) => {
+        const msg = JSON.parse(event.data);
+        // Heartbeat: server closes sockets that stay silent
+        if (msg.type === 'ping') {
+            chatSocket.send('pong');
+            return;
+        }
+        if (msg.type !== 'chat_message' || taskId !== activeChatTaskId) return;
+        // Already rendered (e.g. our own message, appended from the POST response)
+        if (msg.data.id <= chatBottomId) return;
+
+        $("#noMsgInfo").remove();
+        renderMessages([msg.data], 2);
+        chatBottomId = msg.data.id;
+    };
+}
+
+function closeChatSocket() {
+    if (chatSocket) {
+        chatSocket.onmessage = null;
+        chatSocket.close();
+        chatSocket = null;
+    }
 }
 
 function loadChat(direction) {
@@ -554,10 +589,11 @@ function sendMessage(e) {
     axios.post(`/api/tasks/${activeChatTaskId}/chat`, { message: txt })
         .then((res) => { 
             input.val(""); 
-            // Append the single new message immediately
-            renderMessages([res.data], 2); 
-            // Update bottom ID
-            chatBottomId = res.data.id;
+            // Append the single new message immediately (unless the socket already did)
+            if (res.data.id > chatBottomId) {
+                renderMessages([res.data], 2); 
+                chatBottomId = res.data.id;
+            }
         })
         .catch(() => toastr.error("Failed to send"))
         .finally(() => { 
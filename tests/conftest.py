@@ -0,0 +1,100 @@
+# tests/conftest.py
+"""
+Shared fixtures. The app reads its configuration from the environment at
+import time, so everything below is set before the first `app` import:
+a throwaway SQLite database, stdout-only logging, bcrypt in threads at the
+minimum cost, and no inline background workers (tests drive them).
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="gch-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}",
+    "JWT_SECRET": "test-secret-with-at-least-32-bytes!!",
+    "LOG_FILE": "",
+    "PASSWORD_EXECUTOR": "thread",
+    "BCRYPT_ROUNDS": "4",
+    "EMAIL_WORKER": "off",
+    "JOB_WORKER": "off",
+    "LOGIN_LIMITER_BACKEND": "memory",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import sqlalchemy.ext.asyncio as _asyncio
+from fastapi.testclient import TestClient
+
+import main
+import app.core.db.session as _database
+import app.user.models as _user_models
+import app.Shared.helpers as _helpers
+from app.announcement.view_buffer import view_buffer
+from app.core.rate_limit import MemoryBackend, login_limiter
+from app.user.cache import user_cache
+
+_database.Base.metadata.create_all(_database.engine)
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    yield
+    with _database.engine.begin() as conn:
+        for table in reversed(_database.Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    # SQLite reuses ids, so nothing may outlive the rows it describes
+    user_cache.entries.clear()
+    view_buffer.pending.clear()
+    view_buffer.seen.clear()
+
+@pytest.fixture(autouse=True)
+def fresh_limiter(monkeypatch):
+    backend = MemoryBackend(login_limiter.backend.window)
+    monkeypatch.setattr(login_limiter, "backend", backend)
+    monkeypatch.setattr(login_limiter, "fallback", backend)
+    monkeypatch.setattr(login_limiter, "counters", dict.fromkeys(login_limiter.counters, 0))
+
+@pytest.fixture
+def db():
+    session = _database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def async_engine():
+    """Its own engine per test: tests drive coroutines with asyncio.run, one loop each."""
+    engine = _asyncio.create_async_engine(_database.ASYNC_DATABASE_URL)
+    yield engine
+    asyncio.run(engine.dispose())
+
+@pytest.fixture
+def make_user(db):
+    def make(email: str, role=_user_models.UserRole.team_member, password: str = "pw123456", **fields):
+        user = _user_models.User(email=email, username=email.split("@")[0], full_name=email, role=role, **fields)
+        user.set_password(password)
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user
+    return make
+
+def access_token(user) -> str:
+    return _helpers.create_access_token({
+        "sub": str(user.id), "user_id": user.id, "role": user.role.value,
+        "email": user.email, "name": user.full_name,
+    })
+
+@pytest.fixture
+def client():
+    """TestClient without the lifespan: background workers stay off."""
+    return TestClient(main.app)
+
+@pytest.fixture
+def auth_client(client):
+    def as_user(user):
+        client.headers["Authorization"] = f"Bearer {access_token(user)}"
+        return client
+    return as_user
@@ -0,0 +1,33 @@
+# tests/test_announcement.py
+import inspect
+
+from fastapi.testclient import TestClient
+
+import main
+import app.announcement.announcement as _announcement_router
+from app.announcement.models import Announcement
+from app.user.models import UserRole
+from tests.conftest import access_token
+
+def test_create_and_delete_reach_feed_sockets(db, make_user):
+    admin = make_user("admin@x.com", UserRole.admin)
+    headers = {"Authorization": f"Bearer {access_token(admin)}"}
+
+    with TestClient(main.app) as client:
+        client.cookies.set("access_token", access_token(admin))
+        with client.websocket_connect("/api/announcement/ws") as socket:
+            created = client.post("/api/announcement/", json={"content": "Hello team", "attachments": []}, headers=headers)
+            assert created.status_code == 200
+            event = socket.receive_json()
+            assert event["type"] == "new_post"
+            assert event["data"]["content"] == "Hello team"
+
+            post_id = created.json()["id"]
+            assert client.delete(f"/api/announcement/{post_id}", headers=headers).status_code == 200
+            assert socket.receive_json() == {"type": "delete_post", "id": post_id}
+
+    assert db.query(Announcement).count() == 0
+
+def test_sync_db_endpoints_run_in_the_threadpool():
+    for endpoint in (_announcement_router.create_post, _announcement_router.delete_post):
+        assert not inspect.iscoroutinefunction(endpoint)
@@ -0,0 +1,71 @@
+# tests/test_auth_context.py
+import time
+
+import jwt
+import pytest
+
+import app.Shared.auth_context as _auth_context
+from app.user.models import UserRole
+from tests.conftest import access_token
+
+@pytest.fixture(autouse=True)
+def empty_token_cache(monkeypatch):
+    monkeypatch.setattr(_auth_context, "_verified", type(_auth_context._verified)())
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Counts real signature checks."""
+    calls = []
+    decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(_auth_context.jwt, "decode", counting_decode)
+    return calls
+
+def _token(**claims) -> str:
+    claims.setdefault("exp", int(time.time()) + 600)
+    return jwt.encode({"sub": "1", **claims}, _auth_context.JWT_SECRET, algorithm="HS256")
+
+def test_repeat_token_is_verified_once(decodes):
+    token = _token()
+    assert _auth_context.verify_token(token) == _auth_context.verify_token(token)
+    assert len(decodes) == 1
+
+def test_cached_claims_are_not_served_past_exp(decodes, monkeypatch):
+    token = _token(exp=int(time.time()) + 5)
+    _auth_context.verify_token(token)
+
+    later = time.time() + 10
+    monkeypatch.setattr(_auth_context.time, "time", lambda: later)
+    _auth_context.verify_token(token)  # verified again rather than served from the cache
+    assert len(decodes) == 2
+
+def test_cache_is_bounded_least_recently_used_first(decodes, monkeypatch):
+    monkeypatch.setattr(_auth_context, "TOKEN_CACHE_SIZE", 2)
+    first, second, third = _token(n=1), _token(n=2), _token(n=3)
+    for token in (first, second, first, third):  # second is now the oldest
+        _auth_context.verify_token(token)
+    assert len(_auth_context._verified) == 2
+
+    _auth_context.verify_token(first)
+    assert len(decodes) == 3
+    _auth_context.verify_token(second)
+    assert len(decodes) == 4
+
+def test_tampered_token_is_rejected_and_not_cached(decodes):
+    token = _token()
+    header, payload, signature = token.split(".")
+    forged = f"{header}.{payload}.{signature[::-1]}"
+    with pytest.raises(jwt.InvalidTokenError):
+        _auth_context.verify_token(forged)
+    assert len(_auth_context._verified) == 0
+
+def test_request_decodes_token_once(make_user, auth_client, decodes):
+    user = make_user("member@x.com", UserRole.team_member)
+    client = auth_client(user)
+    for _ in range(3):
+        assert client.get(f"/api/users/{user.id}").status_code == 200
+    assert len(decodes) == 1
@@ -0,0 +1,14 @@
+# tests/test_database_url.py
+from app.core.db.session import get_async_database_url
+
+def test_sync_drivers_map_to_async_ones():
+    assert get_async_database_url("postgres://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+    assert get_async_database_url("postgresql+psycopg2://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+    assert get_async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+
+def test_only_the_sslmode_key_becomes_ssl():
+    url = get_async_database_url("postgresql://u:p%40ss@h:5432/db?sslmode=require&application_name=no_sslmode=1")
+    assert url == "postgresql+asyncpg://u:p%40ss@h:5432/db?application_name=no_sslmode%3D1&ssl=require"
+
+def test_sslmode_is_left_alone_for_other_drivers():
+    assert get_async_database_url("mysql://u:p@h/db?sslmode=x") == "mysql://u:p@h/db?sslmode=x"
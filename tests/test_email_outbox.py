@@ -0,0 +1,152 @@
+# tests/test_email_outbox.py
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.mail.outbox as _outbox
+
+pytest.importorskip("aiosmtpd")  # development dependency of the SMTP stand-in
+
+from app.mail.dev_smtp import LocalSMTPServer, _free_port
+from app.mail.models import EmailOutbox
+
+@pytest.fixture
+def smtp():
+    with LocalSMTPServer() as server:
+        yield server
+
+@pytest.fixture
+def make_worker(async_engine):
+    def make(port: int, batch_size: int = 10) -> _outbox.EmailWorker:
+        connection = _outbox.SMTPConnection("127.0.0.1", port, username=None, password=None, starttls=False)
+        return _outbox.EmailWorker(async_engine, connection, batch_size=batch_size)
+    return make
+
+def _queue(db, count: int) -> list:
+    records = [_outbox.enqueue_email(db, f"user{index}@x.com", f"Subject {index}", "<b>hi</b>") for index in range(count)]
+    db.commit()
+    return [record.id for record in records]
+
+def _rows(db) -> list:
+    db.expire_all()
+    return db.query(EmailOutbox).order_by(EmailOutbox.id).all()
+
+def test_delivers_batch_over_one_connection(db, smtp, make_worker):
+    worker = make_worker(smtp.port)
+    _queue(db, 3)
+
+    assert asyncio.run(worker.run_once()) == 3
+    assert sorted(message["To"] for message in smtp.messages) == ["user0@x.com", "user1@x.com", "user2@x.com"]
+    assert _rows(db) == []
+
+    # The next batch reuses the session that is still open
+    _queue(db, 2)
+    assert asyncio.run(worker.run_once()) == 2
+    assert len(smtp.messages) == 5
+    assert smtp.sessions == 1
+    assert worker.connection.connects == 1
+    worker.connection.close()
+
+def test_temporary_rejection_is_retried_with_backoff(db, smtp, make_worker):
+    worker = make_worker(smtp.port)
+    smtp.reply = "451 Try again later"
+    _queue(db, 2)
+
+    before = datetime.utcnow()
+    asyncio.run(worker.run_once())
+    rows = _rows(db)
+    assert [row.status for row in rows] == ["pending", "pending"]
+    assert all(row.locked_until is None for row in rows)
+    assert "451" in rows[0].last_error
+    # The batch stopped at the first rejection: the second email was not tried
+    assert [row.attempts for row in rows] == [1, 0]
+    assert rows[1].last_error is None
+    minimum = timedelta(seconds=_outbox.EMAIL_RETRY_BASE_SECONDS * 0.8)
+    assert all(row.next_attempt_at >= before + minimum for row in rows)
+
+    # Not due yet: nothing to claim
+    assert asyncio.run(worker.run_once()) == 0
+    worker.connection.close()
+
+def test_retry_delay_grows_and_is_capped(make_worker):
+    worker = make_worker(_free_port())
+    delays = [worker.retry_delay(attempts) for attempts in (1, 2, 3)]
+    assert delays[0] < delays[1] < delays[2]
+    assert worker.retry_delay(50) <= _outbox.EMAIL_RETRY_MAX_SECONDS * 1.2
+
+def test_connection_error_reschedules_whole_batch(db, make_worker):
+    worker = make_worker(_free_port())  # nothing listens there
+    _queue(db, 3)
+
+    assert asyncio.run(worker.run_once()) == 3
+    rows = _rows(db)
+    assert [row.status for row in rows] == ["pending"] * 3
+    assert "ConnectionRefusedError" in rows[0].last_error
+    assert [row.attempts for row in rows] == [1, 0, 0]
+    assert all(row.next_attempt_at > row.created_at for row in rows)
+
+def test_untried_emails_are_never_given_up(db, make_worker):
+    worker = make_worker(_free_port())  # nothing listens there
+    ids = _queue(db, 2)
+    db.query(EmailOutbox).update({"attempts": _outbox.EMAIL_MAX_ATTEMPTS - 1})
+    db.commit()
+
+    asyncio.run(worker.run_once())
+    first, second = _rows(db)
+    assert (first.status, first.attempts) == ("failed", _outbox.EMAIL_MAX_ATTEMPTS)
+    assert (second.status, second.attempts) == ("pending", _outbox.EMAIL_MAX_ATTEMPTS - 1)
+    assert [first.id, second.id] == ids
+
+def test_permanent_rejection_fails_at_once(db, smtp, make_worker):
+    worker = make_worker(smtp.port)
+    smtp.reply = "550 No such user"
+    _queue(db, 1)
+
+    asyncio.run(worker.run_once())
+    row, = _rows(db)
+    assert row.status == "failed"
+    assert row.attempts == 1
+    assert "550" in row.last_error
+    worker.connection.close()
+
+def test_lease_of_crashed_worker_is_recovered(db, smtp, make_worker):
+    crashed = make_worker(smtp.port)
+    (email_id,) = _queue(db, 1)
+
+    # Claimed, then the worker dies before sending or settling
+    assert len(asyncio.run(crashed._claim())) == 1
+
+    survivor = make_worker(smtp.port)
+    assert asyncio.run(survivor.run_once()) == 0  # still leased
+
+    db.query(EmailOutbox).filter(EmailOutbox.id == email_id).update(
+        {"locked_until": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+    assert asyncio.run(survivor.run_once()) == 1
+    assert len(smtp.messages) == 1
+    assert _rows(db) == []
+    survivor.connection.close()
+
+def test_settling_after_a_lost_lease_leaves_the_row_alone(db, smtp, make_worker):
+    slow = make_worker(smtp.port)
+    smtp.reply = "451 Try again later"
+    (email_id,) = _queue(db, 1)
+
+    async def scenario():
+        rows = await slow._claim()
+        # The lease runs out mid-send and another worker claims the row
+        db.query(EmailOutbox).filter(EmailOutbox.id == email_id).update(
+            {"locked_until": datetime.utcnow() + timedelta(minutes=5)}
+        )
+        db.commit()
+        await slow._settle(rows, await slow.deliver(rows))
+
+    asyncio.run(scenario())
+    row, = _rows(db)
+    assert row.attempts == 0
+    assert row.last_error is None
+    assert row.locked_until is not None
+    slow.connection.close()
+
@@ -0,0 +1,116 @@
+# tests/test_job_outbox.py
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.jobs.outbox as _outbox
+from app.jobs import job, registry
+from app.jobs.brokers import JOB_MAX_ATTEMPTS, DatabaseBroker
+from app.jobs.models import JobOutbox
+
+ran = []
+
+@job("tests.record")
+async def record(value: int):
+    ran.append(value)
+
+@job("tests.explode")
+def explode():
+    raise RuntimeError("boom")
+
+class PublishOnlyBroker:
+    """Stands in for RabbitMQ while it is unreachable."""
+    name = "down"
+    runs_jobs = False
+
+    async def dispatch(self, rows):
+        return [(row.id, "ConnectionError: broker down", False) for row in rows]
+
+@pytest.fixture(autouse=True)
+def no_runs():
+    ran.clear()
+
+@pytest.fixture
+def make_worker(async_engine):
+    def make(broker=None) -> _outbox.JobWorker:
+        broker = broker or DatabaseBroker()
+        if isinstance(broker, DatabaseBroker):
+            asyncio.run(broker.start(registry.run))
+        return _outbox.JobWorker(async_engine, broker)
+    return make
+
+def _rows(db) -> list:
+    db.expire_all()
+    return db.query(JobOutbox).order_by(JobOutbox.id).all()
+
+def test_committed_jobs_run_in_order_and_are_deleted(db, make_worker):
+    _outbox.enqueue(db, "tests.record", value=1)
+    _outbox.enqueue(db, "tests.record", value=2)
+    db.commit()
+
+    assert asyncio.run(make_worker().run_once()) == 2
+    assert ran == [1, 2]
+    assert _rows(db) == []
+
+def test_rolled_back_job_is_never_seen(db, make_worker):
+    _outbox.enqueue(db, "tests.record", value=1)
+    db.rollback()
+    assert asyncio.run(make_worker().run_once()) == 0
+    assert ran == []
+
+def test_commit_wakes_the_worker(db, monkeypatch):
+    wakes = []
+    monkeypatch.setattr(_outbox.job_worker, "wake", lambda: wakes.append(True))
+    _outbox.enqueue(db, "tests.record", value=1)
+    assert wakes == []
+    db.commit()
+    assert wakes == [True]
+
+def test_failed_job_is_retried_later_then_given_up(db, make_worker):
+    _outbox.enqueue(db, "tests.explode")
+    db.commit()
+    worker = make_worker()
+
+    asyncio.run(worker.run_once())
+    row, = _rows(db)
+    assert (row.status, row.attempts, row.locked_until) == ("pending", 1, None)
+    assert "RuntimeError: boom" in row.last_error
+    assert row.available_at > datetime.utcnow()
+    assert asyncio.run(worker.run_once()) == 0  # backing off
+
+    row.attempts = JOB_MAX_ATTEMPTS - 1
+    row.available_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    asyncio.run(worker.run_once())
+    row, = _rows(db)
+    assert (row.status, row.attempts) == ("failed", JOB_MAX_ATTEMPTS)
+
+def test_unknown_job_fails_at_once(db, make_worker):
+    _outbox.enqueue(db, "tests.nobody_handles_this")
+    db.commit()
+    asyncio.run(make_worker().run_once())
+    row, = _rows(db)
+    assert row.status == "failed"
+    assert "UnknownJob" in row.last_error
+
+def test_unpublished_jobs_are_kept_past_max_attempts(db, make_worker):
+    _outbox.enqueue(db, "tests.record", value=1)
+    db.commit()
+    row, = _rows(db)
+    row.attempts = JOB_MAX_ATTEMPTS + 3
+    db.commit()
+
+    asyncio.run(make_worker(PublishOnlyBroker()).run_once())
+    row, = _rows(db)
+    assert row.status == "pending"
+    assert "broker down" in row.last_error
+
+def test_leased_jobs_are_not_claimed_twice(db, make_worker):
+    _outbox.enqueue(db, "tests.record", value=1)
+    db.commit()
+    first, second = make_worker(), make_worker()
+
+    assert len(asyncio.run(first._claim())) == 1
+    assert asyncio.run(second.run_once()) == 0
+    assert ran == []
@@ -0,0 +1,94 @@
+# tests/test_rate_limit.py
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+import app.core.passwords as _passwords
+import app.core.rate_limit as _rate_limit
+from app.core.rate_limit import MemoryBackend, LoginLimiter, login_limiter
+from app.user.models import AccountStatus
+
+def _login(client, email, password):
+    return client.post("/api/auth/login", json={"email": email, "password": password})
+
+def test_wrong_password_locks_the_email(client, make_user):
+    make_user("user@x.com")
+    codes = [_login(client, "user@x.com", "wrong").status_code for _ in range(login_limiter.email_limit)]
+    assert codes == [400] * login_limiter.email_limit
+    # Locked even with the right password now
+    assert _login(client, "user@x.com", "pw123456").status_code == 403
+    assert login_limiter.metrics()["failures"] == login_limiter.email_limit
+
+def test_busy_password_pool_does_not_count_as_failure(client, make_user, monkeypatch):
+    make_user("user@x.com")
+    monkeypatch.setattr(_passwords, "_slots", threading.BoundedSemaphore(1))
+    _passwords._slots.acquire()  # pool saturated: every verify gets a 503
+
+    for _ in range(login_limiter.email_limit + 2):
+        assert _login(client, "user@x.com", "pw123456").status_code == 503
+    assert login_limiter.metrics()["failures"] == 0
+
+    _passwords._slots.release()
+    assert _login(client, "user@x.com", "pw123456").status_code == 200
+
+def test_inactive_account_does_not_count_as_failure(client, make_user):
+    make_user("gone@x.com", account_status=AccountStatus.suspended)
+    for _ in range(login_limiter.email_limit + 2):
+        assert _login(client, "gone@x.com", "pw123456").status_code == 403
+    assert login_limiter.metrics()["failures"] == 0
+
+def test_ip_is_throttled_across_emails():
+    limiter = LoginLimiter(MemoryBackend(window=60), email_limit=5, ip_limit=3)
+    for i in range(3):
+        limiter.check(f"u{i}@x.com", "10.0.0.1")
+        limiter.record_failure(f"u{i}@x.com", "10.0.0.1")
+    with pytest.raises(HTTPException) as exc_info:
+        limiter.check("fresh@x.com", "10.0.0.1")
+    assert exc_info.value.status_code == 429
+    limiter.check("fresh@x.com", "10.0.0.2")  # other clients are unaffected
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(window=60, max_keys=2)
+    for key in ("a", "b", "a", "c"):
+        backend.incr(key, 1000.0)
+    assert set(backend.entries) == {"a", "c"}
+    assert backend.evictions == 1
+
+def _stuff_from_proxy(client, make_user, forwarded_for):
+    """25 wrong-password logins over many emails, all through one proxy address."""
+    make_user("victim@x.com")
+    for index in range(25):
+        _login(client, f"nobody{index}@x.com", "wrong")
+    return client.post(
+        "/api/auth/login", json={"email": "victim@x.com", "password": "pw123456"},
+        headers={"X-Forwarded-For": forwarded_for},
+    )
+
+def test_proxied_clients_do_not_share_an_ip_limit_by_default(client, make_user):
+    # TestClient connects from one peer address, like a load balancer would
+    assert _stuff_from_proxy(client, make_user, "198.51.100.7").status_code == 200
+
+def test_trusted_forwarded_header_limits_each_client(client, make_user, monkeypatch):
+    monkeypatch.setattr(_rate_limit, "LOGIN_LIMITER_CLIENT_IP", "x-forwarded-for")
+    attacker = "203.0.113.9"
+    for index in range(login_limiter.ip_limit):
+        client.post(
+            "/api/auth/login", json={"email": f"nobody{index}@x.com", "password": "wrong"},
+            headers={"X-Forwarded-For": f"10.0.0.1, {attacker}"},
+        )
+    make_user("victim@x.com")
+    blocked = client.post(
+        "/api/auth/login", json={"email": "victim@x.com", "password": "pw123456"},
+        headers={"X-Forwarded-For": attacker},
+    )
+    assert blocked.status_code == 429
+    # A spoofed left-hand entry does not dodge the limit, and other clients are unaffected
+    assert client.post(
+        "/api/auth/login", json={"email": "victim@x.com", "password": "pw123456"},
+        headers={"X-Forwarded-For": f"192.0.2.1, {attacker}"},
+    ).status_code == 429
+    assert client.post(
+        "/api/auth/login", json={"email": "victim@x.com", "password": "pw123456"},
+        headers={"X-Forwarded-For": "198.51.100.7"},
+    ).status_code == 200
@@ -0,0 +1,62 @@
+# tests/test_refresh_tokens.py
+import asyncio
+from datetime import datetime, timedelta
+
+import app.Shared.helpers as _helpers
+from app.Shared.token_purge import purge_refresh_tokens
+from app.user.models import RefreshToken
+
+def _login(client, make_user) -> str:
+    make_user("user@x.com")
+    response = client.post("/api/auth/login", json={"email": "user@x.com", "password": "pw123456"})
+    assert response.status_code == 200
+    return response.json()["refresh_token"]
+
+def _refresh(client, token: str):
+    return client.post("/api/auth/refresh", json={"refresh_token": token})
+
+def test_only_the_hash_is_stored(db, client, make_user):
+    token = _login(client, make_user)
+    record, = db.query(RefreshToken).all()
+    assert record.token_hash == _helpers.hash_token(token)
+    assert record.expires_at > datetime.utcnow()
+
+def test_refresh_rotates_the_token(client, make_user):
+    first = _login(client, make_user)
+
+    response = _refresh(client, first)
+    assert response.status_code == 200
+    second = response.json()["refresh_token"]
+    assert second != first
+    assert response.json()["access_token"]
+
+    # Each refresh token works once
+    assert _refresh(client, first).status_code == 401
+    assert _refresh(client, second).status_code == 200
+
+def test_logout_revokes_the_token(db, client, make_user):
+    token = _login(client, make_user)
+    assert client.post("/api/auth/logout", json={"refresh_token": token}).status_code == 200
+    assert _refresh(client, token).status_code == 401
+
+    record, = db.query(RefreshToken).all()
+    assert record.revoked
+    assert record.expires_at <= datetime.utcnow()
+
+def test_access_token_is_not_a_refresh_token(client, make_user):
+    _login(client, make_user)
+    access = _helpers.create_access_token({"sub": "1", "user_id": 1})
+    assert _refresh(client, access).status_code == 401
+
+def test_purge_deletes_only_dead_tokens(db, client, make_user, async_engine):
+    used = _login(client, make_user)
+    live = _refresh(client, used).json()["refresh_token"]
+    expired = RefreshToken(
+        user_id=1, token_hash="0" * 64, expires_at=datetime.utcnow() - timedelta(days=1)
+    )
+    db.add(expired)
+    db.commit()
+
+    assert asyncio.run(purge_refresh_tokens(async_engine, batch_size=1)) == 2
+    db.expire_all()
+    assert [record.token_hash for record in db.query(RefreshToken)] == [_helpers.hash_token(live)]
@@ -0,0 +1,95 @@
+# tests/test_task_chat.py
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+import app.task.task as _task_router
+from app.core.pubsub import pubsub
+from app.task.models import Task
+from app.user.models import UserRole
+from tests.conftest import access_token
+
+def _task(db, assigner, assignee) -> Task:
+    task = Task(assigner_id=assigner.id, assignee_id=assignee.id, title="Shoot")
+    db.add(task)
+    db.commit()
+    return task
+
+def test_chat_message_reaches_socket_through_pubsub(db, make_user, monkeypatch):
+    manager = make_user("mgr@x.com", UserRole.manager)
+    creator = make_user("creator@x.com", UserRole.digital_creator, manager_id=manager.id)
+    task = _task(db, manager, creator)
+
+    published = []
+    publish = pubsub.publish
+
+    async def spy(channel, message):
+        published.append((channel, message))
+        await publish(channel, message)
+
+    monkeypatch.setattr(pubsub, "publish", spy)
+
+    with TestClient(main.app) as client:
+        client.cookies.set("access_token", access_token(creator))
+        with client.websocket_connect(f"/api/tasks/{task.id}/chat/ws") as socket:
+            response = client.post(
+                f"/api/tasks/{task.id}/chat",
+                json={"message": "hello"},
+                headers={"Authorization": f"Bearer {access_token(manager)}"},
+            )
+            assert response.status_code == 200
+            event = socket.receive_json()
+
+    assert event["type"] == "chat_message"
+    assert event["data"]["message"] == "hello"
+    assert published[0][0] == _task_router.TASK_CHAT_CHANNEL
+    assert published[0][1]["task_id"] == task.id
+
+def test_event_from_another_worker_is_broadcast_to_the_room(db, make_user):
+    manager = make_user("mgr@x.com", UserRole.manager)
+    creator = make_user("creator@x.com", UserRole.digital_creator, manager_id=manager.id)
+    task = _task(db, manager, creator)
+
+    with TestClient(main.app) as client:
+        client.cookies.set("access_token", access_token(creator))
+        with client.websocket_connect(f"/api/tasks/{task.id}/chat/ws") as socket:
+            # What the pub/sub listener does when another worker published
+            client.portal.call(
+                pubsub._dispatch, _task_router.TASK_CHAT_CHANNEL,
+                {"task_id": task.id, "event": {"type": "chat_message", "data": {"message": "from elsewhere"}}},
+            )
+            assert socket.receive_json()["data"]["message"] == "from elsewhere"
+
+def test_room_survives_its_last_member_leaving_during_an_accept():
+    manager = _task_router.ChatRoomManager()
+
+    class SlowSocket:
+        def __init__(self):
+            self.accepting = asyncio.Event()
+            self.release = asyncio.Event()
+
+        async def accept(self):
+            self.accepting.set()
+            await self.release.wait()
+
+        async def send_text(self, payload):
+            pass
+
+    class Socket(SlowSocket):
+        async def accept(self):
+            pass
+
+    async def scenario():
+        leaving, joining = Socket(), SlowSocket()
+        await manager.connect(7, leaving)
+        join = asyncio.create_task(manager.connect(7, joining))
+        await joining.accepting.wait()
+        manager.disconnect(7, leaving)  # the room is empty but someone is joining
+        joining.release.set()
+        await join
+        assert joining in manager.rooms[7].active_connections
+        manager.disconnect(7, joining)
+        assert 7 not in manager.rooms
+
+    asyncio.run(scenario())
@@ -0,0 +1,27 @@
+# tests/test_task_list.py
+from sqlalchemy import event
+
+import app.core.db.session as _database
+from app.user.cache import user_cache
+from app.user.models import UserRole
+
+def test_list_tasks_authenticates_through_its_read_session(make_user, auth_client):
+    manager = make_user("mgr@x.com", UserRole.manager)
+    client = auth_client(manager)
+    checkouts = []
+
+    def on_checkout(*args):
+        checkouts.append(args)
+
+    pool = _database.async_engine.sync_engine.pool
+    event.listen(pool, "checkout", on_checkout)
+    try:
+        user_cache.entries.clear()
+        response = client.get("/api/tasks/")
+    finally:
+        event.remove(pool, "checkout", on_checkout)
+
+    assert response.status_code == 200
+    assert response.json()["total"] == 0
+    # The user-cache miss and the listing share one connection
+    assert len(checkouts) == 1
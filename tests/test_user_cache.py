@@ -0,0 +1,51 @@
+# tests/test_user_cache.py
+import asyncio
+
+import app.user.cache as _cache
+from app.core.pubsub import pubsub
+from app.user.models import UserRole
+
+def test_entries_expire_after_ttl(make_user, monkeypatch):
+    user = make_user("member@x.com")
+    cache = _cache.UserCache(ttl=60, max_size=10)
+    cache.put(user)
+    assert cache.get(user.id).role == UserRole.team_member
+
+    later = _cache.time.monotonic() + 61
+    monkeypatch.setattr(_cache.time, "monotonic", lambda: later)
+    assert cache.get(user.id) is None
+    assert user.id not in cache.entries
+
+def test_least_recently_used_entry_is_evicted(make_user):
+    first, second, third = (make_user(f"user{index}@x.com") for index in range(3))
+    cache = _cache.UserCache(ttl=60, max_size=2)
+    cache.put(first)
+    cache.put(second)
+    cache.get(first.id)  # second is now the oldest
+    cache.put(third)
+    assert list(cache.entries) == [first.id, third.id]
+
+def test_requests_are_served_from_cache(make_user, auth_client):
+    user = make_user("member@x.com")
+    client = auth_client(user)
+    assert client.get(f"/api/users/{user.id}").status_code == 200
+    assert _cache.user_cache.get(user.id).role == UserRole.team_member
+
+def test_update_drops_the_cached_record(make_user, auth_client):
+    admin = make_user("admin@x.com", UserRole.admin)
+    member = make_user("member@x.com")
+    auth_client(member).get(f"/api/users/{member.id}")
+    assert _cache.user_cache.get(member.id) is not None
+
+    response = auth_client(admin).put(f"/api/users/{member.id}", json={"role": "manager"})
+    assert response.status_code == 200
+    assert _cache.user_cache.get(member.id) is None
+
+    auth_client(member).get(f"/api/users/{member.id}")
+    assert _cache.user_cache.get(member.id).role == UserRole.manager
+
+def test_invalidation_from_another_worker_is_applied(make_user):
+    user = make_user("member@x.com")
+    _cache.user_cache.put(user)
+    asyncio.run(pubsub._dispatch(_cache.USER_CHANNEL, {"user_ids": [user.id]}))
+    assert _cache.user_cache.get(user.id) is None
@@ -0,0 +1,101 @@
+# tests/test_view_buffer.py
+import asyncio
+
+from sqlalchemy import func, select
+
+import app.announcement.view_buffer as _view_buffer
+from app.announcement.models import Announcement, AnnouncementView
+
+def _post(db, author) -> Announcement:
+    post = Announcement(author_id=author.id, content="Hello")
+    db.add(post)
+    db.commit()
+    return post
+
+def _views(db) -> list:
+    db.expire_all()
+    return sorted(db.execute(select(AnnouncementView.announcement_id, AnnouncementView.user_id)).all())
+
+def test_views_are_written_once_in_a_batch(db, make_user, async_engine):
+    author = make_user("author@x.com")
+    reader = make_user("reader@x.com")
+    post = _post(db, author)
+    buffer = _view_buffer.ViewBuffer(async_engine, interval=3600)
+
+    async def scenario():
+        for user in (author, reader, reader, reader):
+            buffer.add(post.id, user.id)
+        assert len(buffer.pending) == 2
+        assert _views(db) == []  # nothing written on the request path
+        await buffer.flush()
+
+    asyncio.run(scenario())
+    assert _views(db) == [(post.id, author.id), (post.id, reader.id)]
+    assert not buffer.pending
+
+def test_flushed_pairs_are_not_buffered_again(db, make_user, async_engine):
+    reader = make_user("reader@x.com")
+    post = _post(db, reader)
+    buffer = _view_buffer.ViewBuffer(async_engine, interval=3600)
+
+    async def scenario():
+        buffer.add(post.id, reader.id)
+        await buffer.flush()
+        buffer.add(post.id, reader.id)
+        assert not buffer.pending
+        await buffer.stop()
+
+    asyncio.run(scenario())
+    assert db.scalar(select(func.count()).select_from(AnnouncementView)) == 1
+
+def test_seen_pairs_are_bounded(db, make_user, async_engine, monkeypatch):
+    reader = make_user("reader@x.com")
+    posts = [_post(db, reader) for _ in range(3)]
+    buffer = _view_buffer.ViewBuffer(async_engine, interval=3600)
+    monkeypatch.setattr(_view_buffer, "VIEW_SEEN_MAX", 2)
+
+    async def scenario():
+        for post in posts:
+            buffer.add(post.id, reader.id)
+            await buffer.flush()
+        await buffer.stop()
+
+    asyncio.run(scenario())
+    # The oldest pair was evicted; a repeat of it goes back to the table (and is ignored there)
+    assert list(buffer.seen) == [(posts[1].id, reader.id), (posts[2].id, reader.id)]
+
+def test_views_of_deleted_posts_are_dropped(db, make_user, async_engine):
+    reader = make_user("reader@x.com")
+    kept, deleted = _post(db, reader), _post(db, reader)
+    kept_id, deleted_id = kept.id, deleted.id
+    buffer = _view_buffer.ViewBuffer(async_engine, interval=3600)
+
+    async def scenario():
+        buffer.add(kept_id, reader.id)
+        buffer.add(deleted_id, reader.id)
+        db.delete(deleted)
+        db.commit()
+        await buffer.stop()
+
+    asyncio.run(scenario())
+    assert _views(db) == [(kept_id, reader.id)]
+
+def test_failed_flush_keeps_views_for_the_next_one(db, make_user, async_engine, monkeypatch):
+    reader = make_user("reader@x.com")
+    post = _post(db, reader)
+    buffer = _view_buffer.ViewBuffer(async_engine, interval=3600)
+    write = buffer._write
+
+    async def database_down(pairs):
+        raise ConnectionError("database down")
+
+    async def scenario():
+        buffer.add(post.id, reader.id)
+        monkeypatch.setattr(buffer, "_write", database_down)
+        await buffer.flush()
+        assert buffer.pending == {(post.id, reader.id)}
+        monkeypatch.setattr(buffer, "_write", write)
+        await buffer.stop()
+
+    asyncio.run(scenario())
+    assert _views(db) == [(post.id, reader.id)]